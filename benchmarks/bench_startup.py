@@ -0,0 +1,50 @@
+"""
+Benchmark: waktu startup entry point saat tidak ada pekerjaan (tick cron kosong).
+
+    uv run python benchmarks/bench_startup.py --repeat 10
+
+Menjalankan scripts/schedule_runner.py (hari biasa, INCOMING tanpa file) dan
+scripts/run_etl.py --help sebagai subprocess, mencatat wall time dan modul berat
+(pandas, numpy, scipy, sqlalchemy) yang ikut ter-import (via -X importtime).
+"""
+import argparse, json, os, re, statistics, subprocess, sys, time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+HEAVY = ("pandas", "numpy", "scipy", "sqlalchemy", "pyarrow")
+
+CASES = {
+    "schedule_runner_idle": [os.path.join(ROOT, "scripts", "schedule_runner.py"), "--today", "2024-01-10"],
+    "run_etl_help": [os.path.join(ROOT, "scripts", "run_etl.py"), "--help"],
+}
+
+def _env() -> dict:
+    # Nama file yang pasti tidak ada => INCOMING dianggap kosong
+    return {**os.environ, "WEATHER_CSV": "__bench_none__.csv", "ISPU_CSV": "__bench_none__.csv",
+            "LOG_LEVEL": "WARNING"}
+
+def _heavy_imports(argv) -> list:
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], capture_output=True, text=True,
+                          env=_env(), cwd=ROOT)
+    top = {m.group(1) for m in re.finditer(r"\|\s+(\w+)$", proc.stderr, re.M)}
+    return sorted(top & set(HEAVY))
+
+def bench(argv, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *argv], capture_output=True, env=_env(), cwd=ROOT, check=True)
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": statistics.median(times), "heavy_imports": _heavy_imports(argv)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+    baseline = bench(["-c", "pass"], args.repeat)
+    result = {"interpreter_s": baseline["best_s"]}
+    for name, argv in CASES.items():
+        result[name] = bench(argv, args.repeat)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: city-level vs per-station correlation compute (tanpa DB).
+
+    uv run python benchmarks/bench_station_vs_city.py --stations 5 --metrics 12 --days 31
+
+Membandingkan:
+- city   : rata-rata harian seluruh stasiun lalu satu compute (jalur default)
+- station: compute per location_id, serial (1 worker) dan via process pool
+"""
+import argparse, json, time
+import numpy as np
+import pandas as pd
+
+from etl.pipeline.pearson_pipeline import compute_classifications, _compute_station
+from etl.resampling import ResamplingConfig
+from concurrent.futures import ProcessPoolExecutor
+
+def synthetic_station_pairs(stations: int, metrics: int, days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    loc, corr, day = np.meshgrid(np.arange(1, stations + 1), np.arange(1, metrics + 1), np.arange(days), indexing="ij")
+    wx = rng.normal(size=loc.shape)
+    py = 0.5 * wx + rng.normal(size=loc.shape)
+    return pd.DataFrame({
+        "corrmet_id": corr.ravel(), "location_id": loc.ravel(),
+        "obs_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(day.ravel(), unit="D"),
+        "wx_val": wx.ravel(), "py_val": py.ravel(),
+    })
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--stations", type=int, default=5)
+    ap.add_argument("--metrics", type=int, default=12)
+    ap.add_argument("--days", type=int, default=31)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--resample", action="store_true", help="pakai mode permutasi/bootstrap")
+    args = ap.parse_args()
+
+    df = synthetic_station_pairs(args.stations, args.metrics, args.days)
+    resampling = ResamplingConfig(n_permutations=1000, n_bootstrap=1000, seed=1) if args.resample else None
+    period = "MONTH_202401"
+
+    def city():
+        agg = df.groupby(["corrmet_id", "obs_date"], as_index=False)[["wx_val", "py_val"]].mean()
+        compute_classifications(agg, period, resampling)
+
+    tasks = [(int(loc), g, period, resampling) for loc, g in df.groupby("location_id")]
+
+    def station_serial():
+        [_compute_station(t) for t in tasks]
+
+    def station_pool():
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(_compute_station, tasks))
+
+    result = {
+        "params": vars(args),
+        "rows": len(df),
+        "city_s": _timed(city, args.repeat),
+        "station_serial_s": _timed(station_serial, args.repeat),
+        "station_pool_s": _timed(station_pool, args.repeat),
+    }
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
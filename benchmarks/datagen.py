@@ -0,0 +1,150 @@
+"""
+Generator CSV sintetis BMKG (cuaca harian) + ISPU (kualitas udara per stasiun).
+
+    uv run python benchmarks/datagen.py --out /tmp/incoming --city jakarta --stations 5 --years 3
+
+Menghasilkan `cuaca_harian_<city>.csv` dan `ispu_harian_<city>.csv` dengan kolom sama persis
+seperti REQUIRED_WEATHER_COLS / REQUIRED_ISPU_COLS, termasuk:
+- nilai hilang (sel kosong) dengan rate `missing_rate`
+- sentinel BMKG/ISPU (8888, 9999, -999, "n/a") dengan rate `sentinel_rate`
+- tanggal rusak (format salah / tanggal mustahil) dengan rate `bad_date_rate`
+Semua acak dari `seed` sehingga hasil bisa direproduksi.
+"""
+import argparse, os
+from dataclasses import dataclass
+from datetime import date
+import numpy as np
+import pandas as pd
+
+WEATHER_COLS = ["TN", "TX", "TAVG", "RH_AVG", "RR", "SS", "FF_X", "DDD_X", "FF_AVG"]
+POLLUTANT_COLS = ["pm25", "pm10", "so2", "co", "o3", "no2"]
+COMPASS = ["N", "NE", "E", "SE", "S", "SW", "W", "NW", "C"]
+SENTINELS = ["8888", "9999", "-999", "n/a"]
+BAD_DATES = ["2024-13-01", "31/02/2024", "not-a-date", "2024-02-30", ""]
+# Batas kategori ISPU berdasarkan nilai maksimum sub-indeks
+ISPU_CATEGORIES = [(50, "BAIK"), (100, "SEDANG"), (200, "TIDAK SEHAT"), (300, "SANGAT TIDAK SEHAT"), (np.inf, "BERBAHAYA")]
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    city: str = "jakarta"
+    stations: int = 5
+    years: int = 1
+    start: date = date(2020, 1, 1)
+    missing_rate: float = 0.02
+    sentinel_rate: float = 0.01
+    bad_date_rate: float = 0.002
+    seed: int = 0
+
+    @property
+    def dates(self) -> pd.DatetimeIndex:
+        end = date(self.start.year + self.years, self.start.month, self.start.day)
+        return pd.date_range(self.start, end, inclusive="left", freq="D")
+
+    @property
+    def station_codes(self) -> list[str]:
+        return [f"DKI{i}" for i in range(1, self.stations + 1)]
+
+def _dirty(values: np.ndarray, rng: np.random.Generator, cfg: GeneratorConfig) -> np.ndarray:
+    # Kolom object agar string sentinel & sel kosong bisa bercampur dengan angka
+    out = values.astype(object)
+    u = rng.random(len(out))
+    out[u < cfg.missing_rate] = ""
+    sentinel = (u >= cfg.missing_rate) & (u < cfg.missing_rate + cfg.sentinel_rate)
+    out[sentinel] = rng.choice(SENTINELS, size=int(sentinel.sum()))
+    return out
+
+def _dates_column(dates: pd.DatetimeIndex, rng: np.random.Generator, cfg: GeneratorConfig) -> np.ndarray:
+    out = dates.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    bad = rng.random(len(out)) < cfg.bad_date_rate
+    out[bad] = rng.choice(BAD_DATES, size=int(bad.sum()))
+    return out
+
+def generate_weather(cfg: GeneratorConfig) -> pd.DataFrame:
+    """Satu baris per hari (stasiun BMKG kota), dengan musim hujan/kemarau sederhana."""
+    rng = np.random.default_rng([cfg.seed, 1])
+    dates = cfg.dates
+    n = len(dates)
+    season = np.cos(2 * np.pi * (dates.dayofyear.to_numpy() - 15) / 365.25)   # ~1 di Jan (hujan)
+    tavg = 28 - 0.8 * season + rng.normal(0, 0.8, n)
+    cols = {
+        "TN": np.round(tavg - rng.uniform(2, 4, n), 1),
+        "TX": np.round(tavg + rng.uniform(3, 6, n), 1),
+        "TAVG": np.round(tavg, 1),
+        "RH_AVG": np.round(np.clip(78 + 8 * season + rng.normal(0, 4, n), 40, 100)),
+        "RR": np.round(np.maximum(0, rng.gamma(0.6 + 0.5 * (season + 1), 8, n) - 3), 1),
+        "SS": np.round(np.clip(6 - 2.5 * season + rng.normal(0, 1.5, n), 0, 12), 1),
+        "FF_X": np.round(rng.uniform(3, 10, n)),
+        "DDD_X": np.round(rng.uniform(0, 360, n)),
+        "FF_AVG": np.round(rng.uniform(1, 4, n)),
+    }
+    df = pd.DataFrame({"TANGGAL": _dates_column(dates, rng, cfg)})
+    for c in WEATHER_COLS:
+        df[c] = _dirty(cols[c], rng, cfg)
+    df["DDD_CAR"] = rng.choice(COMPASS, size=n)
+    return df
+
+def generate_ispu(cfg: GeneratorConfig) -> pd.DataFrame:
+    """Satu baris per (hari, stasiun); polusi lebih tinggi di musim kemarau."""
+    rng = np.random.default_rng([cfg.seed, 2])
+    dates = cfg.dates
+    codes = cfg.station_codes
+    n = len(dates) * len(codes)
+    day = np.repeat(dates, len(codes))
+    season = np.cos(2 * np.pi * (day.dayofyear.to_numpy() - 15) / 365.25)
+    station_bias = np.tile(rng.uniform(0.8, 1.3, len(codes)), len(dates))
+    base = (1.0 - 0.3 * season) * station_bias
+    vals = {
+        "pm25": np.round(np.clip(55 * base + rng.normal(0, 15, n), 5, 300)),
+        "pm10": np.round(np.clip(50 * base + rng.normal(0, 12, n), 5, 300)),
+        "so2": np.round(np.clip(25 * base + rng.normal(0, 8, n), 1, 200)),
+        "co": np.round(np.clip(15 * base + rng.normal(0, 5, n), 1, 200)),
+        "o3": np.round(np.clip(30 * base + rng.normal(0, 10, n), 1, 200)),
+        "no2": np.round(np.clip(20 * base + rng.normal(0, 6, n), 1, 200)),
+    }
+    stacked = np.vstack([vals[c] for c in POLLUTANT_COLS])
+    mx = stacked.max(axis=0)
+    critical = np.array([c.upper() for c in POLLUTANT_COLS])[stacked.argmax(axis=0)]
+    bounds = np.array([b for b, _ in ISPU_CATEGORIES])
+    categori = np.array([name for _, name in ISPU_CATEGORIES])[np.searchsorted(bounds, mx)]
+
+    df = pd.DataFrame({
+        "tanggal": _dates_column(day, rng, cfg),
+        # sebagian nama stasiun memakai format panjang "DKI1 (Bunderan HI)" seperti data asli
+        "stasiun": np.where(rng.random(n) < 0.5, np.tile(codes, len(dates)),
+                            np.char.add(np.tile(np.array(codes, dtype=str), len(dates)), " (Stasiun)")),
+    })
+    for c in POLLUTANT_COLS:
+        df[c] = _dirty(vals[c], rng, cfg)
+    df["max"] = mx
+    df["critical"] = critical
+    df["categori"] = categori
+    return df
+
+def write_city_csvs(out_dir: str, cfg: GeneratorConfig) -> tuple[str, str]:
+    os.makedirs(out_dir, exist_ok=True)
+    w = os.path.join(out_dir, f"cuaca_harian_{cfg.city}.csv")
+    i = os.path.join(out_dir, f"ispu_harian_{cfg.city}.csv")
+    generate_weather(cfg).to_csv(w, index=False)
+    generate_ispu(cfg).to_csv(i, index=False)
+    return w, i
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic BMKG weather + ISPU CSVs.")
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--city", default="jakarta")
+    ap.add_argument("--stations", type=int, default=5)
+    ap.add_argument("--years", type=int, default=1)
+    ap.add_argument("--start", default="2020-01-01")
+    ap.add_argument("--missing-rate", type=float, default=0.02)
+    ap.add_argument("--sentinel-rate", type=float, default=0.01)
+    ap.add_argument("--bad-date-rate", type=float, default=0.002)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    cfg = GeneratorConfig(city=args.city, stations=args.stations, years=args.years,
+                          start=date.fromisoformat(args.start), missing_rate=args.missing_rate,
+                          sentinel_rate=args.sentinel_rate, bad_date_rate=args.bad_date_rate, seed=args.seed)
+    for path in write_city_csvs(args.out, cfg):
+        print(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark suite: transform, merge, loader dan PearsonPipeline pada beberapa ukuran data.
+clean_and_rename diukur untuk engine pandas dan (bila terpasang) polars.
+
+    uv run python benchmarks/run_benchmarks.py --sizes 1x2,3x5 --repeat 3
+    uv run python benchmarks/run_benchmarks.py --compare benchmarks/results/a.json benchmarks/results/b.json
+
+Ukuran ditulis `<tahun>x<stasiun>`. Data dibuat oleh benchmarks/datagen.py (seed tetap),
+loader & Pearson dijalankan terhadap SQLite stand-in (benchmarks/standin.py).
+Hasil disimpan sebagai JSON (default benchmarks/results/bench_<timestamp>.json).
+"""
+import argparse, datetime, json, os, platform, subprocess, sys, tempfile, time
+from datetime import date
+
+# Log per-stage pipeline tidak relevan di sini; set sebelum etl.config dibaca
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from datagen import GeneratorConfig, write_city_csvs
+from standin import create_standin
+from etl import db
+from etl.factories.transform_factory import TransformEngineFactory
+from etl.extract import extract_ispu, extract_weather, merge_outer_by_date
+from etl.load import insert_aqi_daily, insert_weather_and_pollutants
+from etl.pipeline.pearson_pipeline import PearsonPipeline
+from etl.transform import clean_and_rename
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+def _timed(fn, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"best_s": min(times), "median_s": float(np.median(times)), "repeat": repeat}
+
+def _with_location(df_clean: pd.DataFrame, stations: int) -> pd.DataFrame:
+    # Sama dengan langkah station mapping di AirWeatherPipeline (kode DKI<n> -> location_id n)
+    codes = df_clean["stasiun"].astype(str).str.upper().str.split("(").str[0].str.strip()
+    out = df_clean.assign(location_id=codes.map({f"DKI{i}": i for i in range(1, stations + 1)}))
+    return out[out["location_id"].notna()]
+
+def _polars_engine():
+    # Pembanding engine transform; dilewati bila extra [polars] tidak terpasang
+    try:
+        return TransformEngineFactory.create("polars")
+    except RuntimeError:
+        return None
+
+def bench_size(years: int, stations: int, repeat: int, workdir: str) -> dict:
+    cfg = GeneratorConfig(stations=stations, years=years)
+    w_path, i_path = write_city_csvs(os.path.join(workdir, f"{years}x{stations}"), cfg)
+    dfw, dfi = extract_weather(w_path), extract_ispu(i_path)
+    merged = merge_outer_by_date(dfw, dfi)
+    clean, bad = clean_and_rename(merged)
+    df = _with_location(clean, stations)
+
+    res = {"years": years, "stations": stations, "weather_rows": len(dfw), "ispu_rows": len(dfi),
+           "clean_rows": len(df), "bad_date_rows": len(bad)}
+    res["merge_outer_by_date"] = _timed(lambda: merge_outer_by_date(dfw, dfi), repeat)
+    res["clean_and_rename"] = _timed(lambda: clean_and_rename(merged), repeat)
+    polars_engine = _polars_engine()
+    if polars_engine is not None:
+        res["clean_and_rename[polars]"] = _timed(lambda: polars_engine.clean_and_rename(merged), repeat)
+
+    # Loader: satu kali per DB baru (insert kedua akan jadi no-op dan tidak sebanding)
+    engine = create_standin(os.path.join(workdir, f"wh_{years}x{stations}.db"), stations)
+    res["insert_weather_and_pollutants"] = _timed(lambda: insert_weather_and_pollutants(engine, df), 1)
+    res["insert_aqi_daily"] = _timed(lambda: insert_aqi_daily(engine, df), 1)
+
+    start = date(cfg.start.year, 1, 1)
+    end = date(cfg.start.year, 12, 31)
+    for granularity in ("city", "station"):
+        with Session(engine) as session:
+            p = PearsonPipeline(db_session=session, granularity=granularity, max_workers=1)
+            res[f"pearson_process_range_{granularity}"] = _timed(
+                lambda: p._process_range(start, end, f"MONTH_{start:%Y%m}", end), repeat)
+    db.dispose_engines()
+    return res
+
+def _environment() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = None
+    try:
+        import polars
+        polars_version = polars.__version__
+    except ImportError:
+        polars_version = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "pandas": pd.__version__, "numpy": np.__version__, "polars": polars_version, "git_rev": rev}
+
+def compare(old_path: str, new_path: str):
+    old, new = (json.load(open(p)) for p in (old_path, new_path))
+    index = {(r["years"], r["stations"]): r for r in old["results"]}
+    print(f"{'size':>8} {'benchmark':<36} {'old_s':>10} {'new_s':>10} {'ratio':>7}")
+    for r in new["results"]:
+        o = index.get((r["years"], r["stations"]))
+        if not o:
+            continue
+        for key, val in r.items():
+            if isinstance(val, dict) and key in o:
+                a, b = o[key]["best_s"], val["best_s"]
+                size = f"{r['years']}x{r['stations']}"
+                print(f"{size:>8} {key:<36} {a:>10.4f} {b:>10.4f} {b / a if a else float('nan'):>7.2f}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1x2,2x5", help="comma separated <years>x<stations>")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", default=None, help="result JSON path")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = ap.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [tuple(int(x) for x in s.split("x")) for s in args.sizes.split(",")]
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for years, stations in sizes:
+            print(f"benchmarking {years}y x {stations} stations ...", file=sys.stderr)
+            results.append(bench_size(years, stations, args.repeat, workdir))
+
+    doc = {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+           "environment": _environment(), "params": vars(args), "results": results}
+    out = args.out or os.path.join(RESULTS_DIR, f"bench_{datetime.datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(doc, f, indent=2)
+    print(json.dumps(doc, indent=2))
+    print(f"saved {out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+SQLite stand-in untuk warehouse MySQL (dipakai benchmark, tanpa server DB).
+
+Skema dibuat lewat etl.migrations.upgrade; loader menulis SQL SQLite native lewat etl.upsert
+(ON CONFLICT), tanpa terjemahan.
+Angka absolut tidak sama dengan MySQL, tapi perbandingan antar run tetap bermakna.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from etl.db import get_engine
+from etl.migrations import upgrade
+
+WEATHER_CODES = ["suhu_min", "suhu_max", "suhu_avg", "kelembapan_avg", "curah_hujan", "durasi_penyinaran",
+                 "kecepatan_angin_max", "arah_angin_max", "kecepatan_angin_avg"]
+POLLUTANT_CODES = ["pm25", "pm10", "so2", "co", "o3", "no2"]
+AQI_CATEGORIES = ["BAIK", "SEDANG", "TIDAK SEHAT", "SANGAT TIDAK SEHAT", "BERBAHAYA"]
+CORR_FLAGS = ["STABLE", "CONSISTENT_WEAKER", "NONLINEAR_OR_OUTLIERS", "UNRELIABLE", "INCONCLUSIVE"]
+
+def create_standin(path: str, stations: int, city: str = "jakarta") -> Engine:
+    engine = get_engine(f"sqlite:///{path}")
+    upgrade(engine)
+    with engine.begin() as c:
+        c.execute(text("INSERT INTO city (city_id, name) VALUES (1, :n)"), {"n": city})
+        c.execute(text("INSERT INTO location (location_id, city_id, station_code) VALUES (:id, 1, :code)"),
+                  [{"id": i, "code": f"DKI{i}"} for i in range(1, stations + 1)])
+        c.execute(text("INSERT INTO weather_attribute (weatherattr_code) VALUES (:c)"), [{"c": x} for x in WEATHER_CODES])
+        c.execute(text("INSERT INTO pollutant_attribute (pollutantattr_code) VALUES (:c)"), [{"c": x.upper()} for x in POLLUTANT_CODES])
+        c.execute(text("INSERT INTO aqi_category (aqicat_name) VALUES (:c)"), [{"c": x} for x in AQI_CATEGORIES])
+        c.execute(text("INSERT INTO correlation_flag (corrflag_desc) VALUES (:c)"), [{"c": x} for x in CORR_FLAGS])
+        c.execute(text("INSERT INTO correlation_metrics (weather_x, pollutant_y) VALUES (:x, :y)"),
+                  [{"x": x, "y": y} for x in range(1, len(WEATHER_CODES) + 1) for y in range(1, len(POLLUTANT_CODES) + 1)])
+    return engine
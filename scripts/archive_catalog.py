@@ -0,0 +1,36 @@
+import argparse
+from etl.archive import ArchiveCatalog
+
+def _print(entries):
+    for e in entries:
+        print(f"{e.batch_id}  {e.kind:<11} {e.date_min}..{e.date_max}  rows={e.rows:<7} {e.sha256[:12]}  {e.path}")
+    if not entries:
+        print("(no archives)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the archive catalog (ARCHIVED/catalog.sqlite).")
+    parser.add_argument("--root", default=None, help="archive root (default: ARCHIVED/)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    cov = sub.add_parser("covering", help="archives covering a month")
+    cov.add_argument("--city", required=True)
+    cov.add_argument("--month", required=True, help="YYYY-MM")
+    cov.add_argument("--kind", choices=["raw_weather", "raw_ispu", "parquet"], default=None)
+    rng = sub.add_parser("range", help="archives overlapping a date range")
+    rng.add_argument("--city", required=True)
+    rng.add_argument("--start", required=True)
+    rng.add_argument("--end", required=True)
+    rng.add_argument("--kind", choices=["raw_weather", "raw_ispu", "parquet"], default=None)
+    bat = sub.add_parser("batch", help="files archived together in one run")
+    bat.add_argument("batch_id")
+    args = parser.parse_args()
+
+    catalog = ArchiveCatalog(args.root)
+    if args.cmd == "covering":
+        _print(catalog.covering(args.city, args.month, kind=args.kind))
+    elif args.cmd == "range":
+        _print(catalog.find(args.city, args.start, args.end, kind=args.kind))
+    else:
+        _print(catalog.batch(args.batch_id))
+
+if __name__ == "__main__":
+    main()
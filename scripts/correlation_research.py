@@ -0,0 +1,48 @@
+import argparse, sys
+from datetime import date
+from etl.archive import ArchiveCatalog
+from etl.db import get_engine
+from etl.duckdb_source import DuckDBPairSource, load_metrics, metrics_from_db, save_metrics
+from etl.research import Experiment, run_experiments
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline correlation experiments over the archive (DuckDB), no DB writes.")
+    parser.add_argument("--city", default="jakarta")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--window", action="append", default=None, help="WEEK, MONTH or <N>D (repeatable; default WEEK)")
+    parser.add_argument("--lag", type=int, action="append", default=None, help="lag in days (repeatable; default 0)")
+    parser.add_argument("--alpha", type=float, action="append", default=None, help="significance threshold (repeatable)")
+    parser.add_argument("--metrics", default=None, help="metrics JSON (etl.duckdb_source.save_metrics)")
+    parser.add_argument("--save-metrics", default=None, help="write the active metrics from --url to this JSON file")
+    parser.add_argument("--url", default=None, help="database URL for metrics (default: DATABASE_URL)")
+    parser.add_argument("--root", default=None, help="archive root (default: ARCHIVED)")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--memory-limit", default=None, help="DuckDB memory limit, e.g. 2GB")
+    parser.add_argument("--out", default=None, help="write results CSV here (default: print summary)")
+    args = parser.parse_args()
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+
+    metrics = load_metrics(args.metrics) if args.metrics else metrics_from_db(get_engine(args.url))
+    if args.save_metrics:
+        save_metrics(metrics, args.save_metrics)
+    experiments = [Experiment(w, lag, alpha) for w in (args.window or ["WEEK"])
+                   for lag in (args.lag or [0]) for alpha in (args.alpha or [None])]
+
+    source = DuckDBPairSource(args.city, metrics, ArchiveCatalog(args.root),
+                              threads=args.threads, memory_limit=args.memory_limit)
+    try:
+        df = run_experiments(source, args.start, args.end, experiments)
+    finally:
+        source.close()
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"Wrote {len(df)} rows to {args.out}")
+    else:
+        summary = df.groupby(["experiment", "classification"]).size().unstack(fill_value=0) if len(df) else df
+        print(summary.to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import argparse, sys
+from etl.db import get_engine
+from etl.migrations import MIGRATIONS, applied_versions, upgrade
+from etl.logging_util import get_logger
+
+logger = get_logger("airweather.migrate")
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema/index migrations and query plan checks.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    up = sub.add_parser("upgrade", help="apply pending migrations")
+    up.add_argument("--to", type=int, default=None, help="target version (default: latest)")
+    sub.add_parser("status", help="show applied/pending migrations")
+    sub.add_parser("check-plans", help="EXPLAIN hot queries; exit 1 on full scans of observation tables")
+    parser.add_argument("--url", default=None, help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    engine = get_engine(args.url)
+
+    if args.cmd == "upgrade":
+        applied = upgrade(engine, target=args.to)
+        logger.info(f"Applied migrations: {applied or 'none (up to date)'}")
+    elif args.cmd == "status":
+        done = set(applied_versions(engine))
+        for m in MIGRATIONS:
+            print(f"{'x' if m.version in done else ' '} v{m.version:03d}  {m.description}")
+    else:
+        from etl.query_plans import check_plans
+        failed = False
+        for res in check_plans(engine):
+            print(f"[{'OK' if res.ok else 'FULL SCAN'}] {res.name}")
+            for line in res.plan:
+                print(f"    {line}")
+            failed |= not res.ok
+        sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
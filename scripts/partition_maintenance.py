@@ -0,0 +1,76 @@
+import argparse, sys
+from datetime import date
+from etl.db import get_engine
+from etl.logging_util import get_logger
+from etl.partitioning import (
+    PARTITIONED_TABLES, convert_statements, execute, existing_partitions,
+    maintenance_statements, preflight, verify_pruning,
+)
+
+logger = get_logger("airweather.partitions")
+
+def _month(s: str) -> date:
+    return date.fromisoformat(s + "-01") if len(s) == 7 else date.fromisoformat(s)
+
+def main():
+    parser = argparse.ArgumentParser(description="RANGE partitioning tools for observation tables (MySQL).")
+    parser.add_argument("--url", default=None, help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--table", choices=["all", *PARTITIONED_TABLES], default="all")
+    parser.add_argument("--execute", action="store_true", help="run the statements (default: print only)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    conv = sub.add_parser("convert", help="convert heap tables to RANGE partitioning")
+    conv.add_argument("--granularity", choices=["month", "year"], default="month")
+    conv.add_argument("--from", dest="start", required=True, help="first period, e.g. 2014-01")
+    conv.add_argument("--to", dest="end", required=True, help="last period, e.g. 2026-12")
+
+    mnt = sub.add_parser("maintain", help="pre-create future partitions, archive/drop old ones")
+    mnt.add_argument("--ahead", type=int, default=3, help="periods to pre-create after the current one")
+    mnt.add_argument("--retain", type=int, default=None, help="periods to keep (incl. current)")
+    mnt.add_argument("--mode", choices=["keep", "archive", "drop"], default="keep")
+    mnt.add_argument("--today", type=str, default=None)
+
+    ver = sub.add_parser("verify", help="EXPLAIN the hot queries for a date range and check partition pruning")
+    ver.add_argument("--start", required=True)
+    ver.add_argument("--end", required=True)
+    ver.add_argument("--city-id", type=int, default=1, help="city for the city-scoped queries (default: 1)")
+    args = parser.parse_args()
+
+    engine = get_engine(args.url)
+    if engine.dialect.name != "mysql":
+        sys.exit(f"Partitioning tools require MySQL, got {engine.dialect.name}")
+    specs = list(PARTITIONED_TABLES.values()) if args.table == "all" else [PARTITIONED_TABLES[args.table]]
+
+    if args.cmd == "verify":
+        failed = False
+        checks = verify_pruning(engine, date.fromisoformat(args.start), date.fromisoformat(args.end), args.city_id)
+        for ch in checks:
+            print(f"[{'OK' if ch.ok else 'NO PRUNING'}] {ch.query} / {ch.table}: reads {ch.used} "
+                  f"(expected subset of {ch.expected})")
+            failed |= not ch.ok
+        if not checks:
+            print("No partitioned tables found")
+        sys.exit(1 if failed else 0)
+
+    statements = []
+    with engine.connect() as conn:
+        for spec in specs:
+            if args.cmd == "convert":
+                if existing_partitions(conn, spec.table):
+                    logger.info(f"{spec.table} already partitioned, skipping")
+                    continue
+                preflight(conn, spec)
+                statements += convert_statements(spec, _month(args.start), _month(args.end), args.granularity)
+            else:
+                today = date.today() if args.today is None else date.fromisoformat(args.today)
+                statements += maintenance_statements(spec, existing_partitions(conn, spec.table), today,
+                                                     ahead=args.ahead, retain=args.retain, mode=args.mode)
+
+    for stmt in statements:
+        print(stmt + ";")
+    if args.execute and statements:
+        execute(engine, statements)
+        logger.info(f"Executed {len(statements)} partition statements")
+
+if __name__ == "__main__":
+    main()
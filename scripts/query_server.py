@@ -0,0 +1,27 @@
+import argparse, sys
+from etl.config import QUERY_HTTP_HOST, QUERY_HTTP_PORT
+from etl.db import get_engine
+from etl.logging_util import get_logger
+from etl.query_server import make_server
+
+logger = get_logger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve cached dashboard queries (etl.query) as local HTTP/JSON.")
+    parser.add_argument("--host", default=QUERY_HTTP_HOST)
+    parser.add_argument("--port", type=int, default=QUERY_HTTP_PORT)
+    parser.add_argument("--url", default=None, help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, get_engine(args.url))
+    logger.info("Serving etl.query on http://%s:%s/v1/", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
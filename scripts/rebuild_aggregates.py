@@ -0,0 +1,24 @@
+import argparse, sys
+from datetime import date
+from etl.aggregates import rebuild
+from etl.db import get_engine
+from etl.load import _get_city_id
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute weekly/monthly aggregate tables from the fact tables.")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="YYYY-MM-DD (default: earliest observation)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD (default: latest observation)")
+    parser.add_argument("--city", default=None, help="only this city (default: all cities)")
+    parser.add_argument("--url", default=None, help="database URL (default: DATABASE_URL)")
+    args = parser.parse_args()
+    if args.start and args.end and args.end < args.start:
+        parser.error("--end must not be before --start")
+
+    engine = get_engine(args.url)
+    city_ids = [_get_city_id(engine, args.city)] if args.city else None
+    report = rebuild(engine, args.start, args.end, city_ids=city_ids)
+    print(f"months={report.months} observation_rows={report.observation_rows} aqi_rows={report.aqi_rows}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
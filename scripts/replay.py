@@ -0,0 +1,27 @@
+import argparse, sys
+from datetime import date
+from etl.archive import ArchiveCatalog
+from etl.replay import replay
+
+def main():
+    parser = argparse.ArgumentParser(description="Reload archived raw CSVs (read in place) through transform + load.")
+    parser.add_argument("--city", required=True)
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", required=True, type=date.fromisoformat, help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes (one archive batch each)")
+    parser.add_argument("--chunk-rows", type=int, default=None, help="commit every N rows (default: one transaction per batch)")
+    parser.add_argument("--url", default=None, help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--root", default=None, help="archive root (default: ARCHIVED/)")
+    args = parser.parse_args()
+    if args.end < args.start:
+        parser.error("--end must not be before --start")
+
+    report = replay(args.city, args.start, args.end, workers=args.workers, chunk_rows=args.chunk_rows,
+                    url=args.url, catalog=ArchiveCatalog(args.root))
+    for b in report.batches:
+        print(f"{b.batch_id}  rows={b.rows:<8} {b.seconds:.2f}s")
+    print(report.summary())
+    return 0 if report.batches else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,54 @@
-import sys, os, traceback, argparse
+import os, traceback, argparse
+from contextlib import nullcontext
 from datetime import date
-from etl.pipeline.airweather_pipeline import AirWeatherPipeline
-from etl.pipeline.pearson_pipeline import PearsonPipeline
+from etl.claims import FileClaimer
+from etl.config import Paths
 from etl.logging_util import get_logger
+from etl.validators import has_incoming_files
+
+# Pipeline (pandas, scipy, SQLAlchemy) di-import di dalam stage yang benar-benar jalan
 
 logger = get_logger("airweather.run")
 
 
 def main():
-    #AirWeatherPipeline
-    weather_csv = os.environ.get("WEATHER_CSV", "cuaca_harian_jakarta.csv")
-    ispu_csv    = os.environ.get("ISPU_CSV", "ispu_harian_jakarta.csv")
-
-    pipeline = AirWeatherPipeline()
-    try:
-        pipeline.run(weather_csv, ispu_csv)
-    except Exception as e:
-        logger.error(f"ETL FAILED: {e}")
-        traceback.print_exc()
-        pipeline.move_failed(weather_csv, ispu_csv)
-
-    #PeasonPipeline
     parser = argparse.ArgumentParser()
     parser.add_argument('--mode', choices=['weekly','monthly'], required=True)
     parser.add_argument('--today', type=str, default=None)
+    parser.add_argument('--granularity', choices=['city','station'], default='city')
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size for --granularity station")
+    parser.add_argument('--profile', action='store_true', help="cProfile + tracemalloc per pipeline stage (output in LOG/)")
     args = parser.parse_args()
 
+    if args.profile:
+        from etl.profiling import profiling
+    with (profiling() if args.profile else nullcontext()):
+        run(args)
+
+def run(args):
+    #AirWeatherPipeline
+    weather_csv = os.environ.get("WEATHER_CSV", "cuaca_harian_jakarta.csv")
+    ispu_csv    = os.environ.get("ISPU_CSV", "ispu_harian_jakarta.csv")
+    # lease kedaluwarsa (worker crash) dikembalikan ke INCOMING dulu, juga saat tidak ada kiriman baru
+    FileClaimer().reclaim_stale()
+    has_files = has_incoming_files(Paths.INCOMING, weather_csv, ispu_csv)
+    if not has_files:
+        logger.info("No incoming CSVs in %s, skipping ETL", Paths.INCOMING)
+    else:
+        from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+        pipeline = AirWeatherPipeline()
+        try:
+            # klaim atomik: aman bila beberapa worker berbagi INCOMING; gagal => FAILED/
+            pipeline.run_claimed(weather_csv, ispu_csv)
+        except Exception as e:
+            logger.error(f"ETL FAILED: {e}")
+            traceback.print_exc()
+
+    #PeasonPipeline
+    from etl.pipeline.pearson_pipeline import PearsonPipeline
     today = date.today() if args.today is None else date.fromisoformat(args.today)
 
-    pipeline = PearsonPipeline()
+    pipeline = PearsonPipeline(granularity=args.granularity, max_workers=args.workers)
     if args.mode == 'weekly':
         pipeline.run_weekly(today)
     else:
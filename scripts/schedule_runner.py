@@ -1,54 +1,77 @@
-
-import argparse, logging, os, traceback
+import argparse, os, traceback
+from contextlib import nullcontext
+from datetime import date, timedelta
+from etl.claims import FileClaimer
+from etl.config import Paths
 from etl.logging_util import get_logger
-from datetime import date
-from etl.pipeline.pearson_pipeline import PearsonPipeline
-from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+from etl.validators import has_incoming_files
+
+# Pipeline (pandas, scipy, SQLAlchemy) di-import hanya bila ada pekerjaan:
+# tick cron tanpa file baru dan bukan Minggu/akhir bulan selesai tanpa menyentuh DB.
 
 def is_last_day_of_month(d: date) -> bool:
-    from etl.pipeline.pearson_pipeline import month_last_day as mld
-    return d == mld(d)
+    return (d + timedelta(days=1)).day == 1
 
 logger = get_logger('airweather.schedule')
 
 def main():
-    #AirWeatherPipeline
-    weather_csv = os.environ.get("WEATHER_CSV", "cuaca_harian_jakarta.csv")
-    ispu_csv    = os.environ.get("ISPU_CSV", "ispu_harian_jakarta.csv")
-
-    pipeline = AirWeatherPipeline()
-    try:
-        pipeline.run(weather_csv, ispu_csv)
-    except Exception as e:
-        logger.error(f"ETL FAILED: {e}")
-        traceback.print_exc()
-        pipeline.move_failed(weather_csv, ispu_csv)
-
-    #PearsonPipeline
     parser = argparse.ArgumentParser(description="Automatic scheduler: run weekly and monthly as required.")
     parser.add_argument('--today', type=str, default=None, help="ISO date override, e.g. 2025-10-31")
+    parser.add_argument('--granularity', choices=['city','station'], default='city', help="city average or per-station results")
+    parser.add_argument('--workers', type=int, default=None, help="Process pool size for --granularity station")
+    parser.add_argument('--profile', action='store_true', help="cProfile + tracemalloc per pipeline stage (output in LOG/)")
     args = parser.parse_args()
 
+    if args.profile:
+        from etl.profiling import profiling
+    with (profiling() if args.profile else nullcontext()):
+        run(args)
+
+def run(args):
     today = date.today() if args.today is None else date.fromisoformat(args.today)
+    weather_csv = os.environ.get("WEATHER_CSV", "cuaca_harian_jakarta.csv")
+    ispu_csv    = os.environ.get("ISPU_CSV", "ispu_harian_jakarta.csv")
+    # lease kedaluwarsa (worker crash) dikembalikan ke INCOMING dulu, juga saat tidak ada kiriman baru
+    FileClaimer().reclaim_stale()
+    has_files = has_incoming_files(Paths.INCOMING, weather_csv, ispu_csv)
+    is_sunday, is_month_end = today.weekday() == 6, is_last_day_of_month(today)
+    if not has_files and not (is_sunday or is_month_end):
+        logger.info("Nothing to do on %s (no incoming CSVs, not Sunday/month end)", today)
+        return
 
-    pipe = PearsonPipeline()
+    #AirWeatherPipeline
+    if has_files:
+        from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+        pipeline = AirWeatherPipeline()
+        try:
+            # klaim atomik: aman bila beberapa worker berbagi INCOMING; gagal => FAILED/
+            pipeline.run_claimed(weather_csv, ispu_csv)
+        except Exception as e:
+            logger.error(f"ETL FAILED: {e}")
+            traceback.print_exc()
+
+    #PearsonPipeline
+    if not (is_sunday or is_month_end):
+        return
+    from etl.pipeline.pearson_pipeline import PearsonPipeline
+    pipe = PearsonPipeline(granularity=args.granularity, max_workers=args.workers)
 
     # If Sunday -> weekly
-    if today.weekday() == 6:
-        logging.info("Today is Sunday -> running weekly window")
+    if is_sunday:
+        logger.info("Today is Sunday -> running weekly window")
         pipe.run_weekly(today)
 
     # If last day of month -> leftover weekly (if any) then monthly
-    if is_last_day_of_month(today):
-        logging.info("Today is last day of month -> checking leftover weekly range")
+    if is_month_end:
+        logger.info("Today is last day of month -> checking leftover weekly range")
         leftover = pipe.get_leftover_weekly_range_for_month_end(today)
         if leftover:
             start, end = leftover
-            logging.info(f"Running leftover weekly range {start}..{end}")
+            logger.info("Running leftover weekly range %s..%s", start, end)
             pipe.run_weekly_custom(start, end, today)
         else:
-            logging.info("No leftover weekly range this month-end")
-        logging.info("Running monthly window for full month")
+            logger.info("No leftover weekly range this month-end")
+        logger.info("Running monthly window for full month")
         pipe.run_monthly(today)
 
 if __name__ == "__main__":
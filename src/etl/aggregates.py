@@ -0,0 +1,277 @@
+"""
+Ringkasan deskriptif per periode WEEK/MONTH, dengan batas periode yang sama dengan jadwal
+PearsonPipeline (etl.periods).
+
+- agg_observation_period: n_obs, min, max, mean per (stasiun | kota, periode, atribut cuaca/polutan).
+  Level kota dihitung dari semua nilai stasiun di kota itu (bukan rata-rata dari rata-rata).
+- agg_aqi_period: jumlah hari per kategori ISPU per (stasiun | kota, periode); level kota =
+  jumlah hari-stasiun.
+
+Dipelihara oleh loader (etl.load) di dalam transaksi load: hanya periode WEEK/MONTH yang memuat
+key (location_id, tanggal) yang benar-benar disisipkan/berubah (deteksi perubahan loader)
+dihitung ulang dari tabel fakta untuk semua stasiun kotanya, lalu baris ringkasannya diganti
+(DELETE + INSERT). File multi-tahun yang dikirim ulang dengan satu hari koreksi hanya membangun
+ulang minggu & bulan hari itu; tanpa perubahan, tidak ada refresh. Karena tiap periode dihitung
+ulang utuh (bukan ditambah delta), min/max tetap benar saat nilai dikoreksi. Jumlah statement
+per load konstan, tidak tergantung jumlah periode.
+
+    uv run python scripts/rebuild_aggregates.py                       # seluruh histori
+    uv run python scripts/rebuild_aggregates.py --start 2024-01-01 --end 2024-06-30 --city jakarta
+"""
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection, Engine
+
+from .logging_util import get_logger
+from .periods import MONTH, WEEK, month_bounds
+
+logger = get_logger(__name__)
+
+WEATHER, POLLUTANT, AQI = "weather", "pollutant", "aqi"
+KINDS = (WEATHER, POLLUTANT, AQI)
+STATION, CITY = "station", "city"
+
+# kind -> (tabel fakta, kolom tanggal, kolom atribut, kolom nilai)
+_FACTS: Dict[str, Tuple[str, str, str, str]] = {
+    WEATHER: ("weather_observation", "weatherobs_date", "weatherattr_id", "weatherobs_value"),
+    POLLUTANT: ("pollutant_observation", "pollobs_date", "pollutantattr_id", "pollobs_value"),
+    AQI: ("aqi_daily", "aqidaily_date", "aqicat_id", "NULL"),       # hanya dihitung per kategori
+}
+
+@dataclass
+class AggregateReport:
+    months: int = 0
+    observation_rows: int = 0
+    aqi_rows: int = 0
+
+    def __iadd__(self, other: "AggregateReport") -> "AggregateReport":
+        self.months += other.months
+        self.observation_rows += other.observation_rows
+        self.aqi_rows += other.aqi_rows
+        return self
+
+def _in(sql: str, *names: str):
+    return text(sql).bindparams(*(bindparam(n, expanding=True) for n in names))
+
+def _scope_locations(c: Connection, location_ids: Sequence[int] | None, city_ids: Sequence[int] | None) -> pd.DataFrame:
+    """Semua stasiun dari kota yang disentuh (ringkasan kota butuh seluruh stasiunnya)."""
+    if location_ids is not None:
+        rows = c.execute(_in("SELECT location_id, city_id FROM location WHERE city_id IN "
+                             "(SELECT city_id FROM location WHERE location_id IN :locs)", "locs"),
+                         {"locs": [int(x) for x in location_ids]}).all()
+    elif city_ids is not None:
+        rows = c.execute(_in("SELECT location_id, city_id FROM location WHERE city_id IN :cities", "cities"),
+                         {"cities": [int(x) for x in city_ids]}).all()
+    else:
+        rows = c.execute(text("SELECT location_id, city_id FROM location")).all()
+    return pd.DataFrame(rows, columns=["location_id", "city_id"]).astype("int64")
+
+MonthRuns = List[Tuple[datetime.date, datetime.date]]
+
+def _month_runs(months: Iterable[datetime.date]) -> MonthRuns:
+    """Bulan (tanggal apa pun di bulan itu) -> rentang kontigu [(tanggal 1, akhir bulan)]."""
+    runs: MonthRuns = []
+    for lo, hi in sorted({month_bounds(m) for m in months}):
+        if runs and runs[-1][1] + datetime.timedelta(days=1) == lo:
+            runs[-1] = (runs[-1][0], hi)
+        else:
+            runs.append((lo, hi))
+    return runs
+
+def _ranges(col: str, runs: MonthRuns) -> Tuple[str, dict]:
+    """`(col BETWEEN :s0 AND :e0 OR ...)`: satu statement untuk beberapa rentang bulan."""
+    sql = " OR ".join(f"{col} BETWEEN :s{i} AND :e{i}" for i in range(len(runs)))
+    params = {}
+    for i, (lo, hi) in enumerate(runs):
+        params.update({f"s{i}": lo.isoformat(), f"e{i}": hi.isoformat()})
+    return f"({sql})", params
+
+def _fetch_facts(c: Connection, kind: str, locs: List[int], runs: MonthRuns) -> pd.DataFrame:
+    table, date_col, attr_col, value_col = _FACTS[kind]
+    where, params = _ranges(date_col, runs)
+    rows = c.execute(_in(f"""
+        SELECT location_id, {date_col} AS obs_date, {attr_col} AS attr_id, {value_col} AS value
+        FROM {table}
+        WHERE location_id IN :locs AND {where}
+    """, "locs"), {"locs": locs, **params}).all()
+    df = pd.DataFrame(rows, columns=["location_id", "obs_date", "attr_id", "value"])
+    return df.astype({"location_id": "int64", "attr_id": "int64", "value": "float64"}).assign(kind=kind)
+
+def _with_periods(df: pd.DataFrame) -> pd.DataFrame:
+    """Duplikasi tiap baris untuk periode WEEK dan MONTH-nya (vektor, lihat etl.periods)."""
+    d = pd.to_datetime(df["obs_date"].astype(str).str.slice(0, 10))
+    first = d - pd.to_timedelta(d.dt.day - 1, unit="D")
+    last = first + pd.offsets.MonthEnd(0)
+    monday = d - pd.to_timedelta(d.dt.weekday, unit="D")
+    week_start = monday.where(monday > first, first)
+    sunday = monday + pd.Timedelta(days=6)
+    week_end = sunday.where(sunday < last, last)
+    return pd.concat([df.assign(period_type=WEEK, period_start=week_start, period_end=week_end),
+                      df.assign(period_type=MONTH, period_start=first, period_end=last)], ignore_index=True)
+
+def _period_names(out: pd.DataFrame) -> pd.Series:
+    week = "WEEK_" + out["period_start"].dt.strftime("%Y-%m-%d") + "_" + out["period_end"].dt.strftime("%Y-%m-%d")
+    month = "MONTH_" + out["period_start"].dt.strftime("%Y%m")
+    return week.where(out["period_type"] == WEEK, month)
+
+def _by_scope(df: pd.DataFrame, keys: List[str], agg) -> pd.DataFrame:
+    """Agregasi level stasiun (scope_id = location_id) dan kota (scope_id = city_id)."""
+    period = ["period_type", "period_start", "period_end"]
+    parts = []
+    for scope, col in ((STATION, "location_id"), (CITY, "city_id")):
+        g = agg(df.groupby([col, *period, *keys], sort=False))
+        parts.append(g.reset_index().rename(columns={col: "scope_id"}).assign(scope=scope))
+    out = pd.concat(parts, ignore_index=True)
+    out["period_name"] = _period_names(out)
+    return out
+
+def _observation_aggregates(facts: pd.DataFrame) -> pd.DataFrame:
+    return _by_scope(facts, ["kind", "attr_id"], lambda g: g["value"].agg(
+        n_obs="count", min_value="min", max_value="max", mean_value="mean"))
+
+def _aqi_aggregates(facts: pd.DataFrame) -> pd.DataFrame:
+    return _by_scope(facts.rename(columns={"attr_id": "aqicat_id"}), ["aqicat_id"],
+                     lambda g: g.size().rename("n_days"))
+
+def _records(df: pd.DataFrame, cols: Iterable[str], now: datetime.datetime) -> List[dict]:
+    out = df.assign(period_start=df["period_start"].dt.strftime("%Y-%m-%d"),
+                    period_end=df["period_end"].dt.strftime("%Y-%m-%d"))[list(cols)]
+    out = out.astype(object).where(out.notna(), None)
+    return [dict(r, updated_at=now) for r in out.to_dict("records")]
+
+_OBS_COLS = ["scope", "scope_id", "period_type", "period_start", "period_end", "period_name", "kind", "attr_id",
+             "n_obs", "min_value", "max_value", "mean_value"]
+_AQI_COLS = ["scope", "scope_id", "period_type", "period_start", "period_end", "period_name", "aqicat_id", "n_days"]
+
+def _replace(c: Connection, table: str, cols: List[str], rows: List[dict], scope: dict, kinds: List[str] | None):
+    where, bind = _ranges("period_start", scope["runs"])
+    bind.update(locs=scope["locs"], cities=scope["cities"])
+    expanding = ["locs", "cities"]
+    if kinds is not None:
+        where = f"kind IN :kinds AND {where}"
+        bind["kinds"] = kinds
+        expanding.append("kinds")
+    if scope["names"] is not None:
+        where += " AND period_name IN :names"
+        bind["names"] = scope["names"]
+        expanding.append("names")
+    c.execute(_in(f"""
+        DELETE FROM {table}
+        WHERE {where}
+          AND ((scope = '{STATION}' AND scope_id IN :locs) OR (scope = '{CITY}' AND scope_id IN :cities))
+    """, *expanding), bind)
+    if rows:
+        names = cols + ["updated_at"]
+        c.execute(text(f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(':' + n for n in names)})"), rows)
+
+def _refresh(c: Connection, locations: pd.DataFrame, runs: MonthRuns, names: List[str] | None,
+             kinds: List[str], report: AggregateReport):
+    """
+    Hitung ulang ringkasan `kinds` dari fakta bulan-bulan `runs`. names=None => semua periode di
+    bulan itu; selain itu hanya periode bernama `names` yang diganti (bulan tetap dibaca utuh
+    karena MONTH butuh seluruh harinya).
+    """
+    scope = {"runs": runs, "names": names, "locs": locations["location_id"].tolist(),
+             "cities": sorted(locations["city_id"].unique().tolist())}
+    now = datetime.datetime.now().replace(microsecond=0)
+
+    def aggregate(facts: pd.DataFrame, fn, cols: List[str]) -> List[dict]:
+        if not len(facts):
+            return []
+        agg = fn(_with_periods(facts.merge(locations, on="location_id")))
+        if names is not None:
+            agg = agg[agg["period_name"].isin(names)]
+        return _records(agg, cols, now)
+
+    obs_kinds = [k for k in kinds if k != AQI]
+    if obs_kinds:
+        facts = pd.concat([_fetch_facts(c, k, scope["locs"], runs) for k in obs_kinds], ignore_index=True)
+        rows = aggregate(facts, _observation_aggregates, _OBS_COLS)
+        _replace(c, "agg_observation_period", _OBS_COLS, rows, scope, obs_kinds)
+        report.observation_rows += len(rows)
+    if AQI in kinds:
+        rows = aggregate(_fetch_facts(c, AQI, scope["locs"], runs), _aqi_aggregates, _AQI_COLS)
+        _replace(c, "agg_aqi_period", _AQI_COLS, rows, scope, None)
+        report.aqi_rows += len(rows)
+
+def refresh(c: Connection, start: datetime.date, end: datetime.date, *, location_ids: Sequence[int] | None = None,
+            city_ids: Sequence[int] | None = None, kinds: Sequence[str] = KINDS) -> AggregateReport:
+    """
+    Hitung ulang ringkasan untuk semua bulan yang memuat [start, end] (beserta minggu-minggunya)
+    untuk kota dari `location_ids` / `city_ids` (None = semua). Jalan di transaksi `c`.
+    """
+    kinds = [k for k in KINDS if k in kinds]
+    span_start, span_end = month_bounds(start)[0], month_bounds(end)[1]
+    locations = _scope_locations(c, location_ids, city_ids)
+    report = AggregateReport(months=(span_end.year - span_start.year) * 12 + span_end.month - span_start.month + 1)
+    if locations.empty or not kinds:
+        return report
+    _refresh(c, locations, [(span_start, span_end)], None, kinds, report)
+    return report
+
+def _touched_periods(keys: pd.DataFrame) -> Tuple[MonthRuns, List[str]]:
+    """Key (location_id, date) -> rentang bulan yang harus dibaca + nama periode WEEK/MONTH-nya."""
+    periods = _with_periods(keys[["date"]].drop_duplicates().rename(columns={"date": "obs_date"}))
+    names = sorted(_period_names(periods).unique().tolist())
+    return _month_runs(periods.loc[periods["period_type"] == MONTH, "period_start"].dt.date), names
+
+def refresh_for_load(c: Connection, touched: Mapping[str, pd.DataFrame]) -> AggregateReport:
+    """
+    Hook loader. `touched`: kind -> key (location_id, date) yang disisipkan/berubah. Hanya
+    minggu & bulan dari key itu yang dihitung ulang (bukan rentang tanggal batch), untuk kota
+    stasiun-stasiunnya; kind tanpa perubahan dilewati.
+    """
+    touched = {k: v for k, v in touched.items() if k in KINDS and v is not None and len(v)}
+    if not touched:
+        return AggregateReport()
+    all_keys = pd.concat(touched.values(), ignore_index=True)
+    locations = _scope_locations(c, np.unique(all_keys["location_id"].astype("int64")).tolist(), None)
+    report = AggregateReport()
+    if locations.empty:
+        return report
+    months = set()
+    # observasi (cuaca + polutan) berbagi tabel ringkasan => satu refresh untuk gabungan key-nya
+    obs_kinds = [k for k in (WEATHER, POLLUTANT) if k in touched]
+    for kinds in (obs_kinds, [AQI] if AQI in touched else []):
+        if not kinds:
+            continue
+        runs, names = _touched_periods(pd.concat([touched[k] for k in kinds], ignore_index=True))
+        months.update(m for lo, hi in runs for m in _month_starts(lo, hi))
+        _refresh(c, locations, runs, names, kinds, report)
+    report.months = len(months)
+    return report
+
+def _month_starts(start: datetime.date, end: datetime.date) -> Iterable[datetime.date]:
+    m = month_bounds(start)[0]
+    while m <= end:
+        yield m
+        m = month_bounds(m)[1] + datetime.timedelta(days=1)
+
+def history_range(engine: Engine) -> Tuple[datetime.date, datetime.date] | None:
+    with engine.connect() as c:
+        lo = hi = None
+        for table, date_col, _, _ in _FACTS.values():
+            a, b = c.execute(text(f"SELECT MIN({date_col}), MAX({date_col}) FROM {table}")).one()
+            if a is not None:
+                a, b = (datetime.date.fromisoformat(str(x)[:10]) for x in (a, b))
+                lo, hi = min(lo or a, a), max(hi or b, b)
+    return (lo, hi) if lo is not None else None
+
+def rebuild(engine: Engine, start: datetime.date | None = None, end: datetime.date | None = None,
+            city_ids: Sequence[int] | None = None) -> AggregateReport:
+    """Hitung ulang dari histori, satu transaksi per bulan (memori & lock per bulan)."""
+    if start is None or end is None:
+        span = history_range(engine)
+        if span is None:
+            return AggregateReport()
+        start, end = start or span[0], end or span[1]
+    report = AggregateReport()
+    for month in _month_starts(start, end):
+        with engine.begin() as c:
+            report += refresh(c, month, month, city_ids=city_ids)
+        logger.info("Rebuilt aggregates for %s", month.strftime("%Y-%m"))
+    return report
@@ -0,0 +1,218 @@
+"""
+Arsip kolumnar + katalog untuk file yang sudah diproses.
+
+Selain CSV mentah yang dipindah ke ARCHIVED/, frame bersih (hasil clean_and_rename +
+station mapping, sudah bertipe) ditulis sebagai Parquet terkompresi:
+
+    ARCHIVED/parquet/city=<city>/year=<YYYY>/month=<MM>/part-<batch>.parquet
+
+Setiap file (raw CSV maupun Parquet) dicatat di katalog SQLite ARCHIVED/catalog.sqlite
+(sha256, city, rentang tanggal, jumlah baris, batch). Pertanyaan seperti "arsip mana yang
+mencakup 2019-03 untuk Jakarta" dijawab dari katalog tanpa membuka file:
+
+    ArchiveCatalog().covering("jakarta", "2019-03")
+
+pyarrow opsional (`pip install airweather-etl[archive]`); tanpa pyarrow hanya raw CSV
+yang dicatat.
+"""
+import datetime, hashlib, os, sqlite3, uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Iterable, Iterator, List, Mapping, Tuple
+
+from .config import Paths, ARCHIVE_PARQUET, ARCHIVE_PARQUET_COMPRESSION
+from .logging_util import get_logger
+
+logger = get_logger(__name__)
+
+CATALOG_NAME = "catalog.sqlite"
+PARQUET_DIR = "parquet"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_file (
+    archive_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id     TEXT NOT NULL,      -- file yang diarsip bersama dalam satu run
+    kind         TEXT NOT NULL,      -- raw_weather | raw_ispu | parquet
+    path         TEXT NOT NULL UNIQUE,   -- relatif terhadap root arsip
+    sha256       TEXT NOT NULL,
+    city         TEXT NOT NULL,
+    date_min     TEXT,
+    date_max     TEXT,
+    rows         INTEGER,
+    bytes        INTEGER,
+    archived_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_archive_city_dates ON archive_file (city, date_min, date_max);
+CREATE INDEX IF NOT EXISTS ix_archive_batch ON archive_file (batch_id);
+"""
+
+@dataclass(frozen=True)
+class ArchiveEntry:
+    batch_id: str
+    kind: str
+    path: str
+    sha256: str
+    city: str
+    date_min: str | None
+    date_max: str | None
+    rows: int | None
+    bytes: int
+    archived_at: str
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _month_bounds(month: str) -> Tuple[str, str]:
+    first = datetime.date.fromisoformat(f"{month}-01")
+    nxt = datetime.date(first.year + (first.month == 12), first.month % 12 + 1, 1)
+    return first.isoformat(), (nxt - datetime.timedelta(days=1)).isoformat()
+
+class ArchiveCatalog:
+    def __init__(self, root: str | None = None):
+        self.root = root or Paths.ARCHIVED
+        os.makedirs(self.root, exist_ok=True)
+        self.path = os.path.join(self.root, CATALOG_NAME)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:          # commit / rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def abspath(self, entry: ArchiveEntry) -> str:
+        return os.path.join(self.root, entry.path)
+
+    def add(self, entries: Iterable[ArchiveEntry]):
+        cols = [f.name for f in fields(ArchiveEntry)]
+        sql = f"INSERT INTO archive_file ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+        with self._connect() as conn:   # satu transaksi per batch
+            conn.executemany(sql, [tuple(getattr(e, c) for c in cols) for e in entries])
+
+    def _select(self, where: str, params: tuple) -> List[ArchiveEntry]:
+        cols = [f.name for f in fields(ArchiveEntry)]
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {', '.join(cols)} FROM archive_file WHERE {where} "
+                                f"ORDER BY date_min, archive_id", params).fetchall()
+        return [ArchiveEntry(**dict(r)) for r in rows]
+
+    def find(self, city: str, start: str | datetime.date, end: str | datetime.date,
+             kind: str | None = None) -> List[ArchiveEntry]:
+        """Arsip `city` yang rentang tanggalnya beririsan dengan [start, end]."""
+        where = "city = ? AND date_min <= ? AND date_max >= ?"
+        params: tuple = (city.lower(), str(end), str(start))
+        if kind is not None:
+            where += " AND kind = ?"
+            params += (kind,)
+        return self._select(where, params)
+
+    def covering(self, city: str, month: str, kind: str | None = None) -> List[ArchiveEntry]:
+        """mis. covering("jakarta", "2019-03")."""
+        return self.find(city, *_month_bounds(month), kind=kind)
+
+    def batch(self, batch_id: str) -> List[ArchiveEntry]:
+        return self._select("batch_id = ?", (batch_id,))
+
+    def raw_batches(self, city: str, start: str | datetime.date,
+                    end: str | datetime.date) -> List[Tuple[ArchiveEntry, ArchiveEntry]]:
+        """
+        [(raw_weather, raw_ispu)] `city` yang beririsan dengan [start, end]. Pasangan ISPU dicari
+        per batch_id DAN kota: arsip lama (batch_id resolusi detik) bisa berbagi batch_id antar kota.
+        """
+        out = []
+        for w in self.find(city, start, end, kind="raw_weather"):
+            ispu = self._select("batch_id = ? AND city = ? AND kind = 'raw_ispu'", (w.batch_id, w.city))
+            if not ispu:
+                logger.warning("Batch %s has no raw_ispu archive for %s; skipped", w.batch_id, w.city)
+                continue
+            out.append((w, ispu[0]))
+        return out
+
+    def by_hash(self, sha256: str) -> List[ArchiveEntry]:
+        return self._select("sha256 = ?", (sha256,))
+
+def new_batch_id(now: datetime.datetime | None = None) -> str:
+    """
+    `YYYYmmdd_HHMMSS_ffffff_<hex>`: urutan string = urutan waktu (kiriman terakhir menang di
+    etl.duckdb_source), dan unik antar worker/kota yang mengarsip pada detik yang sama.
+    """
+    now = now or datetime.datetime.now()
+    return f"{now.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:8]}"
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _typed_frame(df):
+    import pandas as pd
+    out = df.copy()
+    out["tanggal"] = pd.to_datetime(out["tanggal"]).dt.date
+    if "location_id" in out.columns:
+        out["location_id"] = out["location_id"].astype("int32")
+    for c in out.columns:
+        if out[c].dtype == object and c != "tanggal":
+            out[c] = out[c].astype("string")
+    return out
+
+def write_parquet_partitions(df, city: str, batch_id: str, root: str) -> List[Tuple[str, str, str, int]]:
+    """Tulis df per (tahun, bulan). Return [(path_relatif, date_min, date_max, rows)]."""
+    import pandas as pd
+    typed = _typed_frame(df)
+    ts = pd.to_datetime(typed["tanggal"])
+    written = []
+    for (year, month), part in typed.groupby([ts.dt.year, ts.dt.month], sort=True):
+        rel = os.path.join(PARQUET_DIR, f"city={city}", f"year={year:04d}", f"month={month:02d}",
+                           f"part-{batch_id}.parquet")
+        dst = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        part.to_parquet(dst, engine="pyarrow", compression=ARCHIVE_PARQUET_COMPRESSION, index=False)
+        written.append((rel, min(part["tanggal"]).isoformat(), max(part["tanggal"]).isoformat(), len(part)))
+    return written
+
+def record_archive(city: str, raw_files: List[Tuple[str, str, int]], df_clean=None, batch_id: str | None = None,
+                   catalog: ArchiveCatalog | None = None,
+                   raw_dates: Mapping[str, Tuple[str | None, str | None]] | None = None) -> List[ArchiveEntry]:
+    """
+    Catat CSV mentah yang sudah dipindah ke arsip (`raw_files` = [(kind, path, rows_raw)]) dan,
+    bila df_clean diberikan & pyarrow tersedia, tulis Parquet per bulan. Semua entri satu batch.
+    `raw_dates` = {kind: (date_min, date_max)} cakupan file mentah; df_clean bisa hanya tail
+    (mode inkremental) sehingga rentangnya hanya dipakai sebagai fallback.
+    """
+    catalog = catalog or ArchiveCatalog()
+    city = city.lower()
+    batch_id = batch_id or new_batch_id()
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    date_min = date_max = None
+    if df_clean is not None and len(df_clean):
+        date_min, date_max = str(df_clean["tanggal"].min())[:10], str(df_clean["tanggal"].max())[:10]
+
+    entries = []
+    for kind, path, rows in raw_files:
+        dmin, dmax = (raw_dates or {}).get(kind) or (date_min, date_max)
+        entries.append(ArchiveEntry(batch_id, kind, os.path.relpath(path, catalog.root), sha256_file(path), city,
+                                    dmin, dmax, rows, os.path.getsize(path), now))
+
+    if df_clean is not None and len(df_clean) and ARCHIVE_PARQUET:
+        if parquet_available():
+            for rel, dmin, dmax, rows in write_parquet_partitions(df_clean, city, batch_id, catalog.root):
+                full = os.path.join(catalog.root, rel)
+                entries.append(ArchiveEntry(batch_id, "parquet", rel, sha256_file(full), city,
+                                            dmin, dmax, rows, os.path.getsize(full), now))
+        else:
+            logger.warning("pyarrow not installed; skipping Parquet archive (raw CSVs are still catalogued)")
+
+    catalog.add(entries)
+    logger.info("Archived batch %s: %s files for %s (%s..%s)", batch_id, len(entries), city, date_min, date_max)
+    return entries
@@ -0,0 +1,119 @@
+"""
+ObservationBatch: format long yang ringkas untuk observasi cuaca/polutan, antarmuka antara
+frame bersih (lebar, satu baris per stasiun-hari) dan loader (etl.load).
+
+Satu observasi = satu posisi di array paralel bertipe:
+
+    location_id  int32            4 byte
+    date         datetime64[D]    8 byte
+    attr_id      int16            2 byte
+    value        float64          8 byte   (0 untuk nilai kosong, perilaku loader lama)
+    valid        bool             1 byte   (False = kosong/tidak numerik di sumber)
+                                 --------
+                                 23 byte  => ~22 MiB per juta observasi
+
+Sebagai pembanding, jalur melt lama (location_id/attr_id int64, tanggal + obs_date string,
+nama kolom) mencapai ~100 byte per observasi saat konversi (~42 byte untuk frame akhirnya),
+dan ~10x lebih lambat dibangun: 1 juta observasi 1.6 s vs 0.16 s (pandas 3, laptop).
+
+value sengaja float64, bukan float32: kolom nilai di DB bertipe DOUBLE, dan float32 menggeser
+nilai ratusan (polutan s/d 1000) sekitar 1e-5, mis. 950.1 -> 950.09998. Itu melewati
+LOAD_FLOAT_TOLERANCE (1e-6), sehingga setiap kiriman ulang akan terdeteksi "berubah".
+
+Dibangun sekali per load secara vektor (tile/repeat, tanpa loop per baris). Deteksi perubahan
+memakai key int64 terkodekan (lihat `keys`) dan pd.Index.get_indexer, bukan merge frame.
+Objek Python per baris hanya dibuat di ujung, untuk parameter DBAPI (`rows`).
+"""
+from dataclasses import dataclass
+from typing import List, Mapping, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+LOCATION_DTYPE, ATTR_DTYPE, VALUE_DTYPE = np.int32, np.int16, np.float64
+DATE_DTYPE = "datetime64[D]"
+
+# key = location_id << 34 | (hari + 2^16) << 16 | attr_id  (hari sejak 1970: ~1790..2500)
+_DAY_OFFSET = 1 << 16
+
+def to_days(s: pd.Series | Sequence) -> np.ndarray:
+    """Tanggal (date, Timestamp, 'YYYY-MM-DD[ ...]') -> datetime64[D]."""
+    s = pd.Series(s) if not isinstance(s, pd.Series) else s
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s.to_numpy(dtype="datetime64[ns]").astype(DATE_DTYPE)
+    return pd.to_datetime(s.astype(str).str.slice(0, 10), format="%Y-%m-%d").to_numpy().astype(DATE_DTYPE)
+
+@dataclass(frozen=True)
+class ObservationBatch:
+    location_id: np.ndarray
+    date: np.ndarray
+    attr_id: np.ndarray
+    value: np.ndarray
+    valid: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "ObservationBatch":
+        return cls(np.empty(0, LOCATION_DTYPE), np.empty(0, DATE_DTYPE), np.empty(0, ATTR_DTYPE),
+                   np.empty(0, VALUE_DTYPE), np.empty(0, bool))
+
+    @classmethod
+    def from_wide(cls, df: pd.DataFrame, attr_ids: Mapping[str, int], columns: Sequence[str]) -> "ObservationBatch":
+        """
+        Frame bersih (location_id, tanggal, <kolom atribut>) -> batch. Kolom yang tidak ada di
+        `df` atau di `attr_ids` dilewati. (location_id, tanggal) ganda: baris pertama menang
+        (setara insert-ignore).
+        """
+        present = [c for c in columns if c in df.columns and c in attr_ids]
+        if not present or df.empty:
+            return cls.empty()
+        loc = df["location_id"].to_numpy(dtype=np.int64).astype(LOCATION_DTYPE)
+        date = to_days(df["tanggal"])
+        first = ~pd.DataFrame({"l": loc, "d": date}).duplicated().to_numpy()
+        loc, date = loc[first], date[first]
+        raw = np.column_stack([pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=VALUE_DTYPE, na_value=np.nan)
+                               for c in present])[first]
+        values = raw.T.ravel()                                  # atribut-major: semua baris kolom 1, lalu kolom 2, ...
+        valid = ~np.isnan(values)
+        n = len(loc)
+        return cls(np.tile(loc, len(present)), np.tile(date, len(present)),
+                   np.repeat(np.array([attr_ids[c] for c in present], dtype=ATTR_DTYPE), n),
+                   np.where(valid, values, 0.0), valid)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple]) -> "ObservationBatch":
+        """Baris DB (location_id, tanggal, attr_id, value) -> batch; NULL => valid False."""
+        if not rows:
+            return cls.empty()
+        loc, date, attr, value = zip(*rows)
+        values = pd.to_numeric(pd.Series(value), errors="coerce").to_numpy(dtype=VALUE_DTYPE, na_value=np.nan)
+        valid = ~np.isnan(values)
+        return cls(np.asarray(loc, dtype=LOCATION_DTYPE), to_days(pd.Series(date)),
+                   np.asarray(attr, dtype=ATTR_DTYPE), np.where(valid, values, 0.0), valid)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.location_id, self.date, self.attr_id, self.value, self.valid))
+
+    def take(self, mask_or_index: np.ndarray) -> "ObservationBatch":
+        return ObservationBatch(self.location_id[mask_or_index], self.date[mask_or_index],
+                                self.attr_id[mask_or_index], self.value[mask_or_index], self.valid[mask_or_index])
+
+    def keys(self) -> np.ndarray:
+        """Key int64 unik per (location_id, date, attr_id), untuk lookup vektor."""
+        days = self.date.astype(np.int64) + _DAY_OFFSET
+        return (self.location_id.astype(np.int64) << 34) | (days << 16) | self.attr_id.astype(np.int64)
+
+    def date_strings(self) -> np.ndarray:
+        return np.datetime_as_string(self.date, unit="D")
+
+    def scope(self) -> dict:
+        """Filter (lokasi + rentang tanggal) untuk mengambil baris yang sudah ada di DB."""
+        return {"locs": np.unique(self.location_id).astype(int).tolist(),
+                "start": str(self.date.min()), "end": str(self.date.max())}
+
+    def rows(self) -> List[Tuple]:
+        """Parameter DBAPI (location_id, 'YYYY-MM-DD', attr_id, value)."""
+        return list(zip(self.location_id.tolist(), self.date_strings().tolist(),
+                        self.attr_id.tolist(), self.value.tolist()))
@@ -0,0 +1,169 @@
+"""
+Klaim file INCOMING berbasis rename + lease, agar beberapa worker (container/node) bisa
+berbagi satu direktori INCOMING tanpa berebut `shutil.move`.
+
+Protokol:
+1. claim  : os.rename(INCOMING/<weather>, PROCESSING/<worker>/<weather>). rename di satu
+            filesystem bersifat atomik: hanya satu worker yang berhasil, sisanya dapat
+            FileNotFoundError dan melewati pasangan ini. File cuaca berfungsi sebagai kunci
+            pasangan; file ISPU menyusul (bila belum ada, file cuaca dikembalikan).
+2. lease  : PROCESSING/<worker>/lease.json (worker, host, pid, waktu klaim). Heartbeat =
+            mtime lease.json, diperbarui thread latar tiap LEASE_HEARTBEAT_S.
+3. release: setelah file dipindah ke ARCHIVED/ atau FAILED/, direktori worker dihapus.
+4. reclaim: lease yang heartbeat-nya lebih tua dari LEASE_TIMEOUT_S (worker crash) diambil
+            alih dengan rename atomik direktori worker -> .reclaim-*, lalu file-nya
+            dikembalikan ke INCOMING untuk diproses ulang.
+
+PROCESSING berada DI DALAM INCOMING (INCOMING/.processing) supaya rename tetap atomik
+walau INCOMING adalah bind mount tersendiri.
+"""
+import datetime, json, os, shutil, socket, threading, time, uuid
+from dataclasses import dataclass
+from typing import List
+
+from .config import Paths, LEASE_TIMEOUT_S, LEASE_HEARTBEAT_S, WORKER_ID
+from .logging_util import get_logger
+
+logger = get_logger(__name__)
+
+LEASE_FILE = "lease.json"
+
+def default_worker_id() -> str:
+    return WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+@dataclass
+class Claim:
+    worker_id: str
+    directory: str
+    weather_path: str
+    ispu_path: str
+
+    @property
+    def lease_path(self) -> str:
+        return os.path.join(self.directory, LEASE_FILE)
+
+class FileClaimer:
+    def __init__(self, incoming: str | None = None, processing: str | None = None,
+                 worker_id: str | None = None, timeout_s: float | None = None,
+                 heartbeat_s: float | None = None):
+        self.incoming = incoming or Paths.INCOMING
+        self.processing = processing or os.path.join(self.incoming, ".processing")
+        self.worker_id = worker_id or default_worker_id()
+        self.timeout_s = LEASE_TIMEOUT_S if timeout_s is None else timeout_s
+        self.heartbeat_s = LEASE_HEARTBEAT_S if heartbeat_s is None else heartbeat_s
+
+    # --- claim / release --------------------------------------------------------------
+    def claim(self, weather_name: str, ispu_name: str) -> Claim | None:
+        """Klaim pasangan file; None bila sudah diklaim worker lain atau belum lengkap.
+        Panggil reclaim_stale() lebih dulu (lihat AirWeatherPipeline.run_claimed)."""
+        directory = os.path.join(self.processing, self.worker_id)
+        os.makedirs(directory, exist_ok=True)
+        claim = Claim(self.worker_id, directory,
+                      os.path.join(directory, weather_name), os.path.join(directory, ispu_name))
+        # lease ditulis sebelum rename: direktori berisi file tanpa lease tidak pernah terlihat
+        self._write_lease(claim)
+        try:
+            os.rename(os.path.join(self.incoming, weather_name), claim.weather_path)
+        except FileNotFoundError:
+            self._remove_dir(directory)
+            return None
+        try:
+            os.rename(os.path.join(self.incoming, ispu_name), claim.ispu_path)
+        except FileNotFoundError:
+            logger.warning("Claimed %s but %s is missing; releasing", weather_name, ispu_name)
+            self._restore(claim.weather_path)
+            self._remove_dir(directory)
+            return None
+        logger.info("Claimed %s + %s as worker %s", weather_name, ispu_name, self.worker_id)
+        return claim
+
+    def release(self, claim: Claim):
+        left = [f for f in os.listdir(claim.directory) if f != LEASE_FILE] if os.path.isdir(claim.directory) else []
+        for name in left:
+            # Tidak diarsip/dipindah oleh pipeline: kembalikan agar tidak hilang
+            self._restore(os.path.join(claim.directory, name))
+        self._remove_dir(claim.directory)
+
+    def heartbeat(self, claim: Claim):
+        os.utime(claim.lease_path)
+
+    def _write_lease(self, claim: Claim):
+        doc = {"worker_id": claim.worker_id, "host": socket.gethostname(), "pid": os.getpid(),
+               "claimed_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        tmp = f"{claim.lease_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        os.replace(tmp, claim.lease_path)
+
+    # --- stale leases -----------------------------------------------------------------
+    def _lease_age(self, directory: str, now: float) -> float:
+        try:
+            return now - os.path.getmtime(os.path.join(directory, LEASE_FILE))
+        except FileNotFoundError:
+            # belum/tidak ada lease: pakai umur direktori
+            return now - os.path.getmtime(directory)
+
+    def reclaim_stale(self) -> List[str]:
+        """Kembalikan file dari lease kedaluwarsa ke INCOMING. Return nama file yang dikembalikan."""
+        if not os.path.isdir(self.processing):
+            return []
+        restored, now = [], time.time()
+        for name in os.listdir(self.processing):
+            directory = os.path.join(self.processing, name)
+            if name.startswith(".") or not os.path.isdir(directory):
+                continue
+            try:
+                # juga untuk worker_id sendiri: container lain dengan ETL_WORKER_ID yang sama
+                # mungkin sedang memproses klaim ini
+                if self._lease_age(directory, now) < self.timeout_s:
+                    continue
+                # rename atomik: bila dua worker mencoba reclaim bersamaan, hanya satu yang menang
+                grabbed = os.path.join(self.processing, f".reclaim-{uuid.uuid4().hex[:8]}")
+                os.rename(directory, grabbed)
+            except FileNotFoundError:
+                continue
+            for f in os.listdir(grabbed):
+                if f != LEASE_FILE:
+                    restored.append(self._restore(os.path.join(grabbed, f)))
+            self._remove_dir(grabbed)
+            logger.warning("Reclaimed stale lease of worker %s (%s files)", name, len(restored))
+        return restored
+
+    # --- helpers ----------------------------------------------------------------------
+    def _restore(self, path: str) -> str:
+        name = os.path.basename(path)
+        dst = os.path.join(self.incoming, name)
+        if os.path.exists(dst):
+            # file baru dengan nama sama sudah masuk: jangan ditimpa, simpan ke FAILED
+            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            os.makedirs(Paths.FAILED, exist_ok=True)
+            dst = os.path.join(Paths.FAILED, f"{os.path.splitext(name)[0]}_reclaimed_{ts}.csv")
+        shutil.move(path, dst)
+        return name
+
+    @staticmethod
+    def _remove_dir(directory: str):
+        shutil.rmtree(directory, ignore_errors=True)
+
+class Heartbeat:
+    """Thread latar yang memperbarui mtime lease selama pemrosesan berjalan."""
+    def __init__(self, claimer: FileClaimer, claim: Claim):
+        self._claimer, self._claim = claimer, claim
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="lease-heartbeat", daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(self._claimer.heartbeat_s):
+            try:
+                self._claimer.heartbeat(self._claim)
+            except FileNotFoundError:
+                logger.error("Lease %s disappeared (reclaimed by another worker?)", self._claim.lease_path)
+                return
+
+    def __enter__(self) -> "Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
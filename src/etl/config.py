@@ -9,14 +9,74 @@ class Paths:
     BASE_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../"))
     ARCHIVED: str = os.path.join(BASE_DIR, "ARCHIVED")
     FAILED: str = os.path.join(BASE_DIR, "FAILED")
-    LOG_DIR: str = os.path.join(BASE_DIR, "LOG")
+    LOG_DIR: str = os.getenv("ETL_LOG_DIR", os.path.join(BASE_DIR, "LOG"))
     INCOMING: str = os.path.join(BASE_DIR, "INCOMING")
+    QUARANTINE: str = os.path.join(BASE_DIR, "QUARANTINE")   # baris yang ditolak aturan kualitas
+    STATE: str = os.path.join(BASE_DIR, "STATE")             # offset baca inkremental per sumber
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     ""
 )
 
+# Optional read replica for analytical/read-only queries (empty => everything on primary)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+REPLICA_MAX_LAG_S = float(os.getenv("REPLICA_MAX_LAG_S", "30"))
+REPLICA_LAG_CHECK_INTERVAL_S = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL_S", "10"))
+
+# Connection pool (shared engine registry in etl.db)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))   # seconds
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))     # seconds to wait for a free connection
+DB_STREAM_YIELD_PER = int(os.getenv("DB_STREAM_YIELD_PER", "5000"))
+
+# Logging: satu file per run (rotasi per ukuran), JSON per baris
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")          # json | text
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Run metrics: satu record JSON per run (append) + opsional file .prom untuk node_exporter
+METRICS_JSONL = os.getenv("METRICS_JSONL", os.path.join(Paths.LOG_DIR, "metrics.jsonl"))
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR", "")
+
+# SQL statement accounting (etl.sql_stats): aktifkan dengan ETL_SQL_STATS=1
+SQL_STATS_ENABLED = os.getenv("ETL_SQL_STATS", "0").lower() in ("1", "true", "yes")
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "100"))  # eksekusi per shape per stage
+
+# Arsip Parquet (butuh pyarrow) + katalog ARCHIVED/catalog.sqlite
+ARCHIVE_PARQUET = os.getenv("ARCHIVE_PARQUET", "1").lower() in ("1", "true", "yes")
+ARCHIVE_PARQUET_COMPRESSION = os.getenv("ARCHIVE_PARQUET_COMPRESSION", "zstd")
+
+# Klaim file INCOMING oleh beberapa worker (etl.claims)
+WORKER_ID = os.getenv("ETL_WORKER_ID", "")                         # default <hostname>-<pid>; unik per container
+LEASE_TIMEOUT_S = float(os.getenv("LEASE_TIMEOUT_S", "900"))        # heartbeat lebih tua => lease dianggap mati
+LEASE_HEARTBEAT_S = float(os.getenv("LEASE_HEARTBEAT_S", "30"))
+
+# Loader change detection: selisih <= toleransi dianggap nilai yang sama (tidak di-UPDATE)
+LOAD_FLOAT_TOLERANCE = float(os.getenv("LOAD_FLOAT_TOLERANCE", "1e-6"))
+
+# Bulk insert/upsert (etl.upsert): baris per statement multi-row; PostgreSQL pakai COPY mulai N baris
+UPSERT_BATCH_ROWS = int(os.getenv("UPSERT_BATCH_ROWS", "1000"))
+PG_COPY_MIN_ROWS = int(os.getenv("PG_COPY_MIN_ROWS", "5000"))
+
+# Baca inkremental (tail-only) untuk sumber CSV yang tumbuh dengan append
+INCREMENTAL_READS = os.getenv("ETL_INCREMENTAL", "0").lower() in ("1", "true", "yes")
+
+# Read API dashboard (etl.query): cache hasil in-process + endpoint HTTP lokal
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))          # jumlah hasil query
+QUERY_CACHE_TTL_S = float(os.getenv("QUERY_CACHE_TTL_S", "300"))
+# File JSONL bersama untuk meneruskan invalidasi dari proses ETL ke proses server (kosong = hanya in-process)
+QUERY_INVALIDATION_LOG = os.getenv("QUERY_INVALIDATION_LOG", "")
+# Di atas ukuran ini penulis memadatkan file: hanya entri yang lebih muda dari QUERY_CACHE_TTL_S disimpan
+QUERY_INVALIDATION_LOG_MAX_BYTES = int(os.getenv("QUERY_INVALIDATION_LOG_MAX_BYTES", str(1024 * 1024)))
+QUERY_HTTP_HOST = os.getenv("QUERY_HTTP_HOST", "127.0.0.1")
+QUERY_HTTP_PORT = int(os.getenv("QUERY_HTTP_PORT", "8765"))
+
+# Engine DataFrame untuk clean_and_rename: pandas (default) | polars (extra [polars])
+TRANSFORM_ENGINE = os.getenv("ETL_TRANSFORM_ENGINE", "pandas").lower()
+
 # Required columns per spec
 REQUIRED_WEATHER_COLS = ["TANGGAL","TN","TX","TAVG","RH_AVG","RR","SS","FF_X","DDD_X","FF_AVG","DDD_CAR"]
 REQUIRED_ISPU_COLS    = ["tanggal","stasiun","pm25","pm10","so2","co","o3","no2","max","critical","categori"]
@@ -1,27 +1,313 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+import os, threading, time, logging
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from .config import (
+    DATABASE_URL, DATABASE_READ_URL, REPLICA_MAX_LAG_S, REPLICA_LAG_CHECK_INTERVAL_S,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT, DB_STREAM_YIELD_PER,
+)
 
-def get_engine(url: str | None = None) -> Engine:
-    return create_engine(url or DATABASE_URL, pool_pre_ping=True, future=True)
+# --- Process-wide engine registry ---------------------------------------------
+# Satu Engine (dan satu pool) per URL per proses. Setelah fork (ProcessPoolExecutor),
+# child membuat engine baru sendiri; koneksi milik parent tidak boleh dipakai ulang.
 
-def fetch_scalar(engine: Engine, sql: str, params: dict):
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    checkins: int = 0
+    connects: int = 0
+    invalidations: int = 0
+    wait_total_s: float = 0.0
+    wait_max_s: float = 0.0
+
+    def record_wait(self, seconds: float):
+        self.wait_total_s += seconds
+        if seconds > self.wait_max_s:
+            self.wait_max_s = seconds
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+    metrics: PoolMetrics | None = None
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - t0)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+_LOCK = threading.Lock()
+_PID = os.getpid()
+_ENGINES: Dict[str, Engine] = {}
+_SESSION_FACTORIES: Dict[str, sessionmaker] = {}
+_METRICS: Dict[str, PoolMetrics] = {}
+
+def _check_fork():
+    global _PID
+    if os.getpid() != _PID:
+        # Jangan tutup koneksi parent (close=False), cukup lupakan engine warisan
+        for eng in _ENGINES.values():
+            eng.dispose(close=False)
+        _ENGINES.clear(); _SESSION_FACTORIES.clear(); _METRICS.clear()
+        _PID = os.getpid()
+
+def _registry_key(url: str) -> str:
+    return make_url(url).render_as_string(hide_password=False)
+
+def _pool_kwargs(url: str, pool_size: int | None, max_overflow: int | None,
+                 pool_recycle: int | None, pool_timeout: int | None) -> Dict[str, Any]:
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        # In-memory SQLite memakai SingletonThreadPool, tidak punya size/overflow
+        return {}
+    return {
+        "poolclass": _TimedQueuePool,
+        "pool_size": DB_POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_recycle": DB_POOL_RECYCLE if pool_recycle is None else pool_recycle,
+        "pool_timeout": DB_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+    }
+
+def _attach_metrics(engine: Engine, metrics: PoolMetrics):
+    if isinstance(engine.pool, _TimedQueuePool):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record):
+        metrics.checkins += 1
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        metrics.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exc):
+        metrics.invalidations += 1
+
+def get_engine(url: str | None = None, *, pool_size: int | None = None, max_overflow: int | None = None,
+               pool_recycle: int | None = None, pool_timeout: int | None = None) -> Engine:
+    """
+    Return the shared Engine for `url` (default DATABASE_URL), creating it on first use.
+    Pool options only apply when the engine is first created for that URL.
+    """
+    url = url or DATABASE_URL
+    with _LOCK:
+        _check_fork()
+        key = _registry_key(url)
+        engine = _ENGINES.get(key)
+        if engine is None:
+            engine = create_engine(
+                url, pool_pre_ping=True, future=True,
+                **_pool_kwargs(url, pool_size, max_overflow, pool_recycle, pool_timeout),
+            )
+            metrics = PoolMetrics()
+            _attach_metrics(engine, metrics)
+            _ENGINES[key] = engine
+            _METRICS[key] = metrics
+        return engine
+
+def get_session_factory(url: str | None = None) -> sessionmaker:
+    engine = get_engine(url)
+    key = _registry_key(url or DATABASE_URL)
+    with _LOCK:
+        factory = _SESSION_FACTORIES.get(key)
+        if factory is None:
+            factory = sessionmaker(bind=engine)
+            _SESSION_FACTORIES[key] = factory
+        return factory
+
+def get_session(url: str | None = None) -> Session:
+    return get_session_factory(url)()
+
+def dispose_engines():
+    """Close all pooled connections and forget every registered engine."""
+    with _LOCK:
+        for eng in _ENGINES.values():
+            eng.dispose()
+        _ENGINES.clear(); _SESSION_FACTORIES.clear(); _METRICS.clear()
+        for route in _REPLICAS.values():
+            route.checked_at = float("-inf")
+
+def pool_metrics(url: str | None = None) -> Dict[str, Any]:
+    """Snapshot of checkout/wait counters plus current pool occupancy for `url`."""
+    key = _registry_key(url or DATABASE_URL)
+    engine = _ENGINES.get(key)
+    if engine is None:
+        return {}
+    snap: Dict[str, Any] = asdict(_METRICS[key])
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        snap.update(pool_size=pool.size(), checked_in=pool.checkedin(),
+                    checked_out=pool.checkedout(), overflow=pool.overflow())
+    return snap
+
+# --- Read replica routing -----------------------------------------------------
+# Query read-only (fetch helpers, fetch_pairs, load dimensi) boleh diarahkan ke replica.
+# Write dan read-your-writes (query di dalam transaksi load) tetap di primary.
+# Kalau replica tertinggal > max_lag_s (atau lag tidak bisa dibaca), fallback ke primary.
+
+LagProbe = Callable[[Connection], float | None]
+
+def _mysql_replica_lag(conn: Connection) -> float | None:
+    for stmt, col in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                      ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+        try:
+            row = conn.exec_driver_sql(stmt).mappings().first()
+        except Exception:
+            continue
+        if row is None or row.get(col) is None:
+            return None  # bukan replica / replikasi berhenti
+        return float(row[col])
+    return None
+
+def _postgres_replica_lag(conn: Connection) -> float | None:
+    # Semua WAL yang diterima sudah di-replay => lag 0, walau transaksi terakhir sudah lama
+    # (replica idle yang tersusul). now() - replay_timestamp hanya berarti bila masih ada WAL tertunda.
+    lag = conn.exec_driver_sql(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ).scalar()
+    return None if lag is None else float(lag)
+
+def _default_lag_probe(engine: Engine) -> LagProbe:
+    name = engine.dialect.name
+    if name == "mysql":
+        return _mysql_replica_lag
+    if name == "postgresql":
+        return _postgres_replica_lag
+    # Tanpa info replikasi (mis. dua file SQLite untuk test lokal): anggap selalu segar
+    return lambda conn: 0.0
+
+@dataclass
+class _ReplicaRoute:
+    read_url: str
+    max_lag_s: float
+    check_interval_s: float
+    probe: LagProbe | None = None
+    checked_at: float = float("-inf")
+    fresh: bool = False
+    last_lag_s: float | None = None
+
+_REPLICAS: Dict[str, _ReplicaRoute] = {}
+
+def configure_replica(read_url: str | None, primary_url: str | None = None, *,
+                      max_lag_s: float | None = None, check_interval_s: float | None = None,
+                      probe: LagProbe | None = None):
+    """
+    Register `read_url` as the read replica of `primary_url` (default DATABASE_URL).
+    Passing read_url=None removes the route. `probe(conn)` returns the replica lag in
+    seconds (None = unknown => treated as stale).
+    """
+    key = _registry_key(primary_url or DATABASE_URL)
+    with _LOCK:
+        if not read_url:
+            _REPLICAS.pop(key, None)
+            return
+        _REPLICAS[key] = _ReplicaRoute(
+            read_url=read_url,
+            max_lag_s=REPLICA_MAX_LAG_S if max_lag_s is None else max_lag_s,
+            check_interval_s=REPLICA_LAG_CHECK_INTERVAL_S if check_interval_s is None else check_interval_s,
+            probe=probe,
+        )
+
+if DATABASE_URL and DATABASE_READ_URL:
+    configure_replica(DATABASE_READ_URL)
+
+def _replica_is_fresh(route: _ReplicaRoute, replica: Engine) -> bool:
+    now = time.monotonic()
+    if now - route.checked_at < route.check_interval_s:
+        return route.fresh
+    probe = route.probe or _default_lag_probe(replica)
+    try:
+        with replica.connect() as conn:
+            lag = probe(conn)
+    except Exception as e:
+        logging.getLogger(__name__).warning("Replica lag check failed, using primary: %s", e)
+        lag = None
+    route.last_lag_s = lag
+    route.fresh = lag is not None and lag <= route.max_lag_s
+    route.checked_at = now
+    if not route.fresh:
+        logging.getLogger(__name__).warning(
+            "Replica lag %s s exceeds %s s (or unknown); routing reads to primary", lag, route.max_lag_s)
+    return route.fresh
+
+def get_read_engine(primary: Engine | None = None) -> Engine:
+    """Engine for read-only work: the replica of `primary` if configured and fresh, else `primary`."""
+    primary = primary or get_engine()
+    route = _REPLICAS.get(_registry_key(primary.url.render_as_string(hide_password=False)))
+    if route is None:
+        return primary
+    replica = get_engine(route.read_url)
+    return replica if _replica_is_fresh(route, replica) else primary
+
+def get_read_session(primary_url: str | None = None) -> Session:
+    engine = get_read_engine(get_engine(primary_url))
+    return get_session(engine.url.render_as_string(hide_password=False))
+
+def replica_status(primary_url: str | None = None) -> Dict[str, Any]:
+    route = _REPLICAS.get(_registry_key(primary_url or DATABASE_URL))
+    if route is None:
+        return {"configured": False}
+    return {"configured": True, "fresh": route.fresh, "lag_s": route.last_lag_s, "max_lag_s": route.max_lag_s,
+            "read_url": make_url(route.read_url).render_as_string(hide_password=True)}
+
+# --- Query helpers -------------------------------------------------------------
+# fetch_* hanya membaca => default lewat replica (kalau ada); primary=True untuk read-your-writes.
+
+def fetch_scalar(engine: Engine, sql: str, params: dict, primary: bool = False):
+    engine = engine if primary else get_read_engine(engine)
     with engine.connect() as conn:
         res = conn.execute(text(sql), params).scalar()
     return res
 
-def fetch_one(engine: Engine, sql: str, params: dict):
+def fetch_one(engine: Engine, sql: str, params: dict, primary: bool = False):
+    engine = engine if primary else get_read_engine(engine)
     with engine.connect() as conn:
         res = conn.execute(text(sql), params).mappings().first()
     return res
 
-def fetch_all(engine: Engine, sql: str, params: dict):
+def fetch_all(engine: Engine, sql: str, params: dict, primary: bool = False):
+    engine = engine if primary else get_read_engine(engine)
     with engine.connect() as conn:
         res = conn.execute(text(sql), params).mappings().all()
     return res
 
-def get_session():
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+def stream_rows(bind: Engine | Session, sql, params: dict, yield_per: int | None = None) -> Iterator:
+    """
+    Iterate rows of a large result without buffering it all in the driver
+    (server-side cursor via stream_results + yield_per). `bind` may be an Engine
+    or a Session; `sql` may be a string or a text() construct.
+    """
+    stmt = text(sql) if isinstance(sql, str) else sql
+    opts = {"stream_results": True, "yield_per": yield_per or DB_STREAM_YIELD_PER}
+    if isinstance(bind, Session):
+        yield from bind.execute(stmt, params, execution_options=opts)
+        return
+    with bind.connect() as conn:
+        yield from conn.execution_options(**opts).execute(stmt, params)
+
+def stream_partitions(bind: Engine | Session, sql, params: dict, size: int | None = None) -> Iterator[List]:
+    """Like stream_rows but yields lists of up to `size` rows."""
+    size = size or DB_STREAM_YIELD_PER
+    chunk: List = []
+    for row in stream_rows(bind, sql, params, yield_per=size):
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
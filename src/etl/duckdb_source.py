@@ -0,0 +1,191 @@
+"""
+Sumber pasangan harian (wx, py) untuk PearsonPipeline yang dibaca dari ARSIP, bukan dari
+warehouse: DuckDB embedded di atas ARCHIVED/parquet (dan CSV mentah untuk batch lama yang
+belum punya Parquet). Untuk eksperimen korelasi offline tanpa membebani MySQL:
+
+    metrics = metrics_from_db(engine)            # sekali; atau load_metrics("metrics.json")
+    source = DuckDBPairSource("jakarta", metrics)
+    PearsonPipeline(source=source).compute_range(date(2024, 1, 1), date(2024, 1, 31), "MONTH_202401")
+
+Semantik disamakan dengan FETCH_PAIRS_SQL + loader (etl.load), sehingga klasifikasinya sama:
+- per (stasiun, tanggal) berlaku kiriman TERAKHIR (batch_id diawali timestamp, terbesar menang);
+  dalam satu file baris pertama menang (INSERT IGNORE)
+- nilai kosong dihitung 0 (loader menyimpan NaN sebagai 0)
+- hanya baris yang lolos aturan kualitas: Parquet ditulis dari frame bersih, CSV mentah
+  melewati transform + etl.quality yang sama
+- rata-rata harian semua stasiun kota per atribut; deret tanggal = tanggal yang punya observasi
+
+Beda yang diketahui: replay batch lama yang sengaja menimpa nilai baru di DB tidak tercermin
+(di arsip kiriman terakhir selalu menang). Hanya level kota (granularity="city").
+
+DuckDB hanya membaca kolom & partisi yang dibutuhkan, jadi histori 10+ tahun satu kota
+(~puluhan ribu baris lebar per stasiun) cukup di laptop. Butuh `pip install airweather-etl[research]`.
+"""
+import datetime, json, re
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .archive import ArchiveCatalog
+from .logging_util import get_logger
+from .quality import DEFAULT_RULES, apply_rules
+
+logger = get_logger(__name__)
+
+@dataclass(frozen=True)
+class CorrelationMetric:
+    corrmet_id: int
+    weather_attr: str        # nama kolom frame bersih, mis. "suhu_avg"
+    pollutant_attr: str      # mis. "pm25"
+
+METRICS_SQL = """
+SELECT cm.corrmet_id, wa.weatherattr_code, pa.pollutantattr_code
+FROM correlation_metrics cm
+JOIN weather_attribute wa ON wa.weatherattr_id = cm.weather_x
+JOIN pollutant_attribute pa ON pa.pollutantattr_id = cm.pollutant_y
+WHERE cm.is_active = 1
+ORDER BY cm.corrmet_id
+"""
+
+def metrics_from_db(engine: Engine) -> List[CorrelationMetric]:
+    """Metrik aktif dari warehouse (corrmet_id harus sama agar hasil bisa dibandingkan)."""
+    with engine.connect() as c:
+        rows = c.execute(text(METRICS_SQL)).all()
+    return [CorrelationMetric(int(i), str(w).lower(), str(p).lower()) for i, w, p in rows]
+
+def save_metrics(metrics: Sequence[CorrelationMetric], path: str):
+    with open(path, "w") as f:
+        json.dump([asdict(m) for m in metrics], f, indent=2)
+
+def load_metrics(path: str) -> List[CorrelationMetric]:
+    with open(path) as f:
+        return [CorrelationMetric(**m) for m in json.load(f)]
+
+_IDENT = re.compile(r"^[a-z][a-z0-9_]*$")
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "''") + "'"
+
+class DuckDBPairSource:
+    """Pengganti PearsonPipeline.fetch_pairs: list (corrmet_id, obs_date, wx_val, py_val)."""
+
+    def __init__(self, city: str, metrics: Sequence[CorrelationMetric], catalog: ArchiveCatalog | None = None,
+                 station_map: Dict[str, int] | None = None, threads: int | None = None,
+                 memory_limit: str | None = None):
+        import duckdb
+
+        self.city = city.lower()
+        self.metrics = list(metrics)
+        self.catalog = catalog or ArchiveCatalog()
+        # station_map (kode -> location_id) hanya untuk CSV mentah: tanpa itu aturan unknown_station dilewati
+        self.station_map = station_map
+        self.columns = sorted({m.weather_attr for m in self.metrics} | {m.pollutant_attr for m in self.metrics})
+        bad = [c for c in self.columns if not _IDENT.match(c)]
+        if bad:
+            raise ValueError(f"Invalid attribute names: {bad}")
+        self.con = duckdb.connect()
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.con.execute(f"SET memory_limit = {_quote(memory_limit)}")
+        self.con.register("metrics", pd.DataFrame(
+            [asdict(m) for m in self.metrics], columns=["corrmet_id", "weather_attr", "pollutant_attr"]))
+        self._raw_cache: Dict[str, pd.DataFrame] = {}
+
+    def close(self):
+        self.con.close()
+
+    # --- sumber data ---
+
+    def _sources(self, start: datetime.date, end: datetime.date) -> Tuple[List[str], List[Tuple[str, str, str]]]:
+        """(file Parquet, [(batch_id, weather_csv, ispu_csv)] untuk batch tanpa Parquet)."""
+        entries = self.catalog.find(self.city, start, end, kind="parquet")
+        parquet = [self.catalog.abspath(e) for e in entries]
+        has_parquet = {e.batch_id for e in entries}
+        raw = [(w.batch_id, self.catalog.abspath(w), self.catalog.abspath(i))
+               for w, i in self.catalog.raw_batches(self.city, start, end) if w.batch_id not in has_parquet]
+        return parquet, raw
+
+    def _raw_batch(self, batch_id: str, weather_csv: str, ispu_csv: str) -> pd.DataFrame:
+        """CSV mentah -> frame bersih yang sama dengan isi Parquet (di-cache per batch)."""
+        if batch_id in self._raw_cache:
+            return self._raw_cache[batch_id]
+        from .extract import extract_ispu, extract_weather, merge_outer_by_date
+        from .factories.transform_factory import TransformEngineFactory
+        from .pipeline.airweather_pipeline import _extract_station_code
+
+        merged = merge_outer_by_date(extract_weather(weather_csv), extract_ispu(ispu_csv))
+        clean, _ = TransformEngineFactory.create().clean_and_rename(merged)
+        clean["station_code"] = clean["stasiun"].apply(_extract_station_code)
+        if self.station_map is not None:
+            clean["location_id"] = clean["station_code"].map(self.station_map)
+            rules = DEFAULT_RULES
+        else:
+            rules = [r for r in DEFAULT_RULES if r.code != "unknown_station"]
+        good, _, _ = apply_rules(clean, rules)
+
+        out = pd.DataFrame({"tanggal": pd.to_datetime(good["tanggal"]).dt.date,
+                            "station_code": good["station_code"].astype(str),
+                            "batch": batch_id, "rn": np.arange(len(good), dtype="int64")})
+        for c in self.columns:
+            out[c] = pd.to_numeric(good[c], errors="coerce").to_numpy(dtype="float64") if c in good.columns else np.nan
+        self._raw_cache[batch_id] = out
+        return out
+
+    # --- query ---
+
+    def _pairs_sql(self, parquet: List[str], with_raw: bool) -> str:
+        values = ", ".join(f'CAST("{c}" AS DOUBLE) AS "{c}"' for c in self.columns)
+        parts = []
+        if parquet:
+            files = ", ".join(_quote(p) for p in parquet)
+            parts.append(f"""
+                SELECT CAST(tanggal AS DATE) AS tanggal, CAST(station_code AS VARCHAR) AS station_code,
+                       regexp_extract(filename, 'part-(.+)\\.parquet$', 1) AS batch, file_row_number AS rn, {values}
+                FROM read_parquet([{files}], filename = true, file_row_number = true, union_by_name = true)""")
+        if with_raw:
+            parts.append(f"SELECT tanggal, station_code, batch, rn, {values} FROM raw_rows")
+        unpivot = ", ".join(f'"{c}"' for c in self.columns)
+        coalesced = ", ".join(f'COALESCE("{c}", 0) AS "{c}"' for c in self.columns)
+        return f"""
+            WITH src AS ({" UNION ALL BY NAME ".join(parts)}),
+            latest AS (
+                SELECT * FROM src
+                WHERE tanggal BETWEEN $start AND $end
+                QUALIFY row_number() OVER (PARTITION BY station_code, tanggal ORDER BY batch DESC, rn) = 1
+            ),
+            long AS (
+                UNPIVOT (SELECT tanggal, {coalesced} FROM latest) ON {unpivot} INTO NAME attr VALUE val
+            ),
+            daily AS (SELECT attr, tanggal, AVG(val) AS val FROM long GROUP BY attr, tanggal),
+            dates AS (SELECT DISTINCT tanggal FROM latest)
+            SELECT m.corrmet_id, d.tanggal AS obs_date, w.val AS wx_val, p.val AS py_val
+            FROM metrics m CROSS JOIN dates d
+            LEFT JOIN daily w ON w.attr = m.weather_attr AND w.tanggal = d.tanggal
+            LEFT JOIN daily p ON p.attr = m.pollutant_attr AND p.tanggal = d.tanggal
+            ORDER BY m.corrmet_id, d.tanggal
+        """
+
+    def fetch_pairs(self, start: datetime.date, end: datetime.date, city_id: int | None = None) -> List[Tuple]:
+        """Sama bentuknya dengan PearsonPipeline.fetch_pairs; `city_id` diabaikan (sumber per kota)."""
+        if not self.metrics:
+            return []
+        parquet, raw = self._sources(start, end)
+        frames = [self._raw_batch(*r) for r in raw]
+        if not parquet and not frames:
+            logger.warning("No archive for %s between %s and %s", self.city, start, end)
+            return []
+        if frames:
+            self.con.register("raw_rows", pd.concat(frames, ignore_index=True))
+        try:
+            rows = self.con.execute(self._pairs_sql(parquet, bool(frames)), {"start": start, "end": end}).fetchall()
+        finally:
+            if frames:
+                self.con.unregister("raw_rows")
+        logger.info("DuckDB pairs for %s %s..%s: %s rows from %s parquet files + %s raw batches",
+                    self.city, start, end, len(rows), len(parquet), len(raw))
+        return rows
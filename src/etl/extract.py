@@ -1,6 +1,30 @@
+"""
+Extract CSV mentah. Selain baca penuh, ada mode inkremental untuk sumber yang tumbuh
+dengan append (file cuaca_harian_<city>.csv / ispu_harian_<city>.csv yang sama ditambah
+hari baru setiap kiriman):
+
+    res = read_incremental(path, "TANGGAL")      # seed + tail saja
+    ...transform/load...
+    commit_state(res.pending)                    # setelah load sukses
+
+State per sumber (STATE/<nama file>.json): byte offset yang sudah diproses, sha256 header
+dan sha256 prefix [0, offset), tanggal pertama & terakhir, serta baris "seed" hari terakhir yang nilai
+kosongnya sudah di-ffill. Bila header/prefix berubah (file ditulis ulang, bukan di-append)
+atau tidak ada state, dibaca penuh. Seed ikut di depan tail agar ffill/bfill di
+clean_and_rename sama dengan run penuh; baris dengan tanggal <= `cutoff` dibuang setelah
+transform. Asumsi: file terurut per tanggal dan append selalu berupa hari baru yang utuh.
+"""
+import hashlib, io, json, os
+from dataclasses import asdict, dataclass, field
+from typing import List, Tuple
 import pandas as pd
+from .config import Paths
+from .logging_util import get_logger
+from .transform import _coerce_date_yyyy_mm_dd, normalize_special_missing
 from .validators import read_csv_full
 
+logger = get_logger(__name__)
+
 def extract_weather(path: str) -> pd.DataFrame:
     df = read_csv_full(path)
     return df
@@ -14,5 +38,123 @@ def merge_outer_by_date(df_weather: pd.DataFrame, df_ispu: pd.DataFrame) -> pd.D
     dfw = df_weather.rename(columns={"TANGGAL":"tanggal"})
     dfi = df_ispu.rename(columns={"Tanggal":"tanggal"})
     merged = pd.merge(dfw, dfi, on="tanggal", how="outer", suffixes=("_w","_i"))
-    merged = merged.sort_values("tanggal").reset_index(drop=True)
+    # stable: urutan baris dalam satu tanggal = urutan file (ffill deterministik)
+    merged = merged.sort_values("tanggal", kind="stable").reset_index(drop=True)
     return merged
+
+# --- Incremental (tail-only) reads ---------------------------------------------
+
+@dataclass
+class SourceState:
+    source: str                   # nama file, mis. cuaca_harian_jakarta.csv
+    offset: int                   # byte setelah baris utuh terakhir yang sudah diproses
+    header_sha256: str
+    prefix_sha256: str            # sha256 byte [0, offset)
+    last_tanggal: str | None      # 'YYYY-MM-DD'
+    seed: List[dict] = field(default_factory=list)   # baris hari terakhir, sudah di-ffill
+    first_tanggal: str | None = None   # tanggal pertama di file (cakupan arsip raw saat mode tail)
+
+@dataclass
+class IncrementalRead:
+    frame: pd.DataFrame           # seed + baris baru (atau seluruh file bila mode "full")
+    mode: str                     # full | tail
+    cutoff: str | None            # baris dengan tanggal <= cutoff adalah seed, jangan dimuat
+    pending: SourceState          # state baru; simpan dengan commit_state setelah load sukses
+
+def _state_path(source: str, state_dir: str | None) -> str:
+    return os.path.join(state_dir or Paths.STATE, f"{source}.json")
+
+def load_state(source: str, state_dir: str | None = None) -> SourceState | None:
+    try:
+        with open(_state_path(source, state_dir), encoding="utf-8") as f:
+            return SourceState(**json.load(f))
+    except FileNotFoundError:
+        return None
+
+def commit_state(state: SourceState, state_dir: str | None = None):
+    path = _state_path(state.source, state_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(state), f)
+    os.replace(tmp, path)
+
+def _hash_prefix(f, length: int, chunk_size: int = 1 << 20):
+    h = hashlib.sha256()
+    f.seek(0)
+    remaining = length
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        h.update(chunk)
+        remaining -= len(chunk)
+    return h
+
+def date_range(frame: pd.DataFrame, date_col: str) -> Tuple[str | None, str | None]:
+    """('YYYY-MM-DD', 'YYYY-MM-DD') tanggal valid terkecil/terbesar di `frame` (None bila kosong)."""
+    if date_col not in frame.columns or frame.empty:
+        return None, None
+    dates, bad = _coerce_date_yyyy_mm_dd(normalize_special_missing(frame[[date_col]])[date_col])
+    dates = dates[~bad]
+    return (dates.min(), dates.max()) if len(dates) else (None, None)
+
+def _first_date(path: str, date_col: str, nrows: int = 100) -> str | None:
+    # State lama tanpa first_tanggal: file terurut per tanggal, cukup baca awal file
+    return date_range(pd.read_csv(path, usecols=[date_col], nrows=nrows), date_col)[0]
+
+def _next_state(source: str, frame: pd.DataFrame, date_col: str, offset: int,
+                header_sha: str, prefix_sha: str, first: str | None = None) -> SourceState:
+    # Seed = baris hari terakhir setelah ffill, dengan aturan yang sama seperti clean_and_rename
+    # (sentinel -> NaN, baris bertanggal rusak diabaikan)
+    norm = normalize_special_missing(frame)
+    dates, bad = _coerce_date_yyyy_mm_dd(norm[date_col])
+    norm = norm[~bad].ffill()
+    dates = dates[~bad]
+    if norm.empty:
+        return SourceState(source, offset, header_sha, prefix_sha, None, [], first)
+    last = dates.max()
+    seed = norm[dates == last].astype(object).where(norm[dates == last].notna(), None)
+    return SourceState(source, offset, header_sha, prefix_sha, last,
+                       [{k: _json_value(v) for k, v in row.items()} for row in seed.to_dict("records")],
+                       first or dates.min())
+
+def _json_value(v):
+    # simpan tipe asli (angka tetap angka) agar baris seed diperlakukan sama seperti hasil read_csv
+    return v.item() if hasattr(v, "item") else v
+
+def read_incremental(path: str, date_col: str, state_dir: str | None = None, full: bool = False) -> IncrementalRead:
+    source = os.path.basename(path)
+    state = None if full else load_state(source, state_dir)
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        header_sha = hashlib.sha256(header).hexdigest()
+        prefix = None
+        if state is not None and state.last_tanggal and state.header_sha256 == header_sha and state.offset <= size:
+            h = _hash_prefix(f, state.offset)          # posisi f sekarang = state.offset
+            if h.hexdigest() == state.prefix_sha256:
+                prefix = h
+        if prefix is None:
+            if state is not None:
+                logger.info("%s was rewritten (header/prefix checksum changed); full read", source)
+                state = None
+            f.seek(0)
+        data = f.read()
+
+    # hanya baris utuh: baris terakhir tanpa newline menunggu kiriman berikutnya
+    data = data[: data.rfind(b"\n") + 1]
+    h = prefix.copy() if prefix is not None else hashlib.sha256()
+    h.update(data)
+
+    if prefix is None:
+        frame = pd.read_csv(io.BytesIO(data))
+        nxt = _next_state(source, frame, date_col, len(data), header_sha, h.hexdigest())
+        return IncrementalRead(frame, "full", None, nxt)
+
+    body = pd.read_csv(io.BytesIO(header + data)) if data else pd.DataFrame()
+    frame = pd.concat([pd.DataFrame(state.seed), body], ignore_index=True)
+    first = state.first_tanggal or _first_date(path, date_col)
+    nxt = _next_state(source, frame, date_col, state.offset + len(data), header_sha, h.hexdigest(), first)
+    logger.info("%s: read %s new bytes after offset %s (%s rows)", source, len(data), state.offset, len(body))
+    return IncrementalRead(frame, "tail", state.last_tanggal, nxt)
@@ -0,0 +1,16 @@
+from . import __init__  # type: ignore # noqa: F401
+from ..config import TRANSFORM_ENGINE
+from ..strategies.transform_engine import PandasTransformEngine, PolarsTransformEngine, TransformEngine
+
+class TransformEngineFactory:
+    ENGINES = {"pandas": PandasTransformEngine, "polars": PolarsTransformEngine}
+
+    @staticmethod
+    def create(name: str | None = None) -> TransformEngine:
+        name = (name or TRANSFORM_ENGINE).lower()
+        if name not in TransformEngineFactory.ENGINES:
+            raise ValueError(f"Unknown transform engine {name!r}; choose one of {sorted(TransformEngineFactory.ENGINES)}")
+        try:
+            return TransformEngineFactory.ENGINES[name]()
+        except ImportError as e:
+            raise RuntimeError(f"Transform engine {name!r} needs `pip install airweather-etl[{name}]`") from e
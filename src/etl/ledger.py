@@ -0,0 +1,83 @@
+"""
+Ledger ingest per file (tabel etl_file_ledger, migrasi v3).
+
+Sebelum parsing, AirWeatherPipeline meng-hash kedua CSV (streaming, lihat
+archive.sha256_file) dan mencari hash tersebut dengan status 'loaded' — satu lookup index
+(sha256, status). Bila KEDUA file sudah pernah dimuat dengan isi yang sama, pasangan itu
+langsung diarsip sebagai duplikat tanpa extract/transform/load.
+
+Setiap file yang selesai dicatat dengan status (loaded / duplicate / failed), jumlah baris
+dan durasi run, sehingga tabel ini juga bisa dipakai untuk perencanaan kapasitas:
+
+    SELECT city, AVG(duration_s), SUM(rows_loaded) FROM etl_file_ledger
+    WHERE status = 'loaded' GROUP BY city
+"""
+import datetime, os
+from dataclasses import dataclass, fields
+from typing import Iterable, List
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .archive import sha256_file
+from .logging_util import get_logger, run_id
+
+logger = get_logger(__name__)
+
+LOADED, DUPLICATE, FAILED = "loaded", "duplicate", "failed"
+
+@dataclass
+class LedgerEntry:
+    sha256: str
+    file_name: str
+    kind: str                      # raw_weather | raw_ispu
+    status: str
+    size_bytes: int
+    city: str | None = None
+    rows_in: int | None = None
+    rows_loaded: int | None = None
+    duration_s: float | None = None
+    run_id: str | None = None
+    recorded_at: datetime.datetime | None = None
+
+@dataclass(frozen=True)
+class HashedFile:
+    kind: str
+    path: str
+    sha256: str
+    size_bytes: int
+
+def hash_file(kind: str, path: str) -> HashedFile:
+    return HashedFile(kind, path, sha256_file(path), os.path.getsize(path))
+
+class FileLedger:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def is_loaded(self, sha256: str) -> bool:
+        # primary, bukan replica: run sebelumnya mungkin baru saja commit
+        with self.engine.connect() as c:
+            row = c.execute(text(
+                "SELECT 1 FROM etl_file_ledger WHERE sha256 = :h AND status = :s LIMIT 1"
+            ), {"h": sha256, "s": LOADED}).first()
+        return row is not None
+
+    def record(self, entries: Iterable[LedgerEntry]):
+        now = datetime.datetime.now().replace(microsecond=0)
+        rows = []
+        for e in entries:
+            e.run_id = e.run_id or run_id()
+            e.recorded_at = e.recorded_at or now
+            rows.append({f.name: getattr(e, f.name) for f in fields(LedgerEntry)})
+        if not rows:
+            return
+        cols = [f.name for f in fields(LedgerEntry)]
+        with self.engine.begin() as c:
+            c.execute(text(f"INSERT INTO etl_file_ledger ({', '.join(cols)}) "
+                           f"VALUES ({', '.join(':' + col for col in cols)})"), rows)
+
+    def entries(self, sha256: str) -> List[LedgerEntry]:
+        cols = [f.name for f in fields(LedgerEntry)]
+        with self.engine.connect() as c:
+            rows = c.execute(text(f"SELECT {', '.join(cols)} FROM etl_file_ledger WHERE sha256 = :h "
+                                  "ORDER BY ledger_id"), {"h": sha256}).mappings().all()
+        return [LedgerEntry(**dict(r)) for r in rows]
@@ -1,9 +1,16 @@
-from typing import Dict
+from dataclasses import dataclass, field
+from typing import Dict, List
+import numpy as np
 import pandas as pd  # type: ignore
-from sqlalchemy import text # type: ignore
+from sqlalchemy import bindparam, text # type: ignore
 from sqlalchemy.engine import Engine, Connection # type: ignore
-from .db import fetch_scalar
+from .batch import ObservationBatch, to_days
+from .config import LOAD_FLOAT_TOLERANCE
+from .db import fetch_scalar, get_read_engine
 from .logging_util import get_logger
+from .aggregates import AQI, POLLUTANT, WEATHER, refresh_for_load
+from .query import AQI_TABLE, POLLUTANT_TABLE, WEATHER_TABLE, invalidate
+from .upsert import insert_ignore, upsert
 
 logger = get_logger(__name__)
 
@@ -14,7 +21,8 @@ __all__ = [
 
 #solution
 def _get_station_map_for_city(engine: Engine, city_id: int) -> dict[str, int]:
-    with engine.connect() as c:
+    # dimensi (jarang berubah) => boleh dibaca dari replica
+    with get_read_engine(engine).connect() as c:
         rows = c.execute(text("""
             SELECT UPPER(TRIM(station_code)) AS code, location_id
             FROM location
@@ -23,10 +31,6 @@ def _get_station_map_for_city(engine: Engine, city_id: int) -> dict[str, int]:
     return {r["code"]: int(r["location_id"]) for r in rows}
 
 #existing code...
-def _nz(v):
-    """Return 0 if value is NaN/NA, else the value as-is."""
-    return 0 if pd.isna(v) else v
-
 def _get_city_id(engine: Engine, city_name: str) -> int:
     sql = """
     SELECT city_id FROM city WHERE LOWER(name)=LOWER(:name) LIMIT 1
@@ -60,122 +64,277 @@ def _get_pollutantattr_ids_with_conn(conn: Connection) -> Dict[str, int]:
     )).mappings().all()
     return {r["pollutantattr_code"].lower(): int(r["pollutantattr_id"]) for r in rows}
 
-def _resolve_pollobs_id_with_conn(conn: Connection, location_id: int, dt: str, pollutant_code: str) -> int | None:
-    code = pollutant_code.lower().strip() if pollutant_code else None
-    if not code:
-        return None
-    row = conn.execute(text("""
-        SELECT po.pollobs_id
-        FROM pollutant_observation po
-        JOIN pollutant_attribute pa ON pa.pollutantattr_id = po.pollutantattr_id
-        WHERE po.location_id = :loc AND po.pollobs_date = :dt AND LOWER(pa.pollutantattr_code) = :code
-    """), {"loc": location_id, "dt": dt, "code": code}).mappings().first()
-    return int(row["pollobs_id"]) if row else None
+# --- Change detection ---------------------------------------------------------
+# File BMKG/ISPU sering dikirim ulang dengan rentang tanggal yang tumpang tindih dan beberapa
+# nilai koreksi. Loader mengambil nilai yang sudah ada untuk key (location, date, attribute)
+# yang masuk dalam SATU query per tabel, membandingkannya secara vektor (etl.batch.ObservationBatch),
+# lalu hanya menulis:
+#   - key baru      -> insert-ignore (bulk, etl.upsert)
+#   - nilai berubah -> upsert kolom nilai (bulk), toleransi float LOAD_FLOAT_TOLERANCE
+#   - nilai sama    -> dilewati
+# Biaya tulis sebanding dengan jumlah perubahan, bukan ukuran file. SQL per dialect
+# (MySQL / SQLite / PostgreSQL) dibentuk oleh etl.upsert.
+
+WEATHER_COLS = ["suhu_min", "suhu_max", "suhu_avg", "kelembapan_avg", "curah_hujan", "durasi_penyinaran",
+                "kecepatan_angin_max", "arah_angin_max", "kecepatan_angin_avg"]
+POLLUTANT_COLS = ["pm25", "pm10", "so2", "co", "o3", "no2"]
+
+@dataclass
+class TableChanges:
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # key (location_id, date) yang disisipkan/berubah; dipakai refresh agregat (etl.aggregates)
+    touched: pd.DataFrame | None = field(default=None, repr=False, compare=False)
+
+    def __iadd__(self, other: "TableChanges") -> "TableChanges":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        if other.touched is not None:
+            frames = [t for t in (self.touched, other.touched) if t is not None]
+            self.touched = pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+        return self
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"inserted": self.inserted, "updated": self.updated, "unchanged": self.unchanged}
+
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated
+
+@dataclass
+class LoadReport:
+    weather: TableChanges = field(default_factory=TableChanges)
+    pollutant: TableChanges = field(default_factory=TableChanges)
+    aqi: TableChanges = field(default_factory=TableChanges)
+
+    def __iadd__(self, other: "LoadReport") -> "LoadReport":
+        self.weather += other.weather
+        self.pollutant += other.pollutant
+        self.aqi += other.aqi
+        return self
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        return {name: getattr(self, name).as_dict() for name in ("weather", "pollutant", "aqi")}
+
+@dataclass(frozen=True)
+class _ObsTable:
+    name: str
+    date_col: str
+    attr_col: str
+    value_col: str
+
+WEATHER_OBS = _ObsTable("weather_observation", "weatherobs_date", "weatherattr_id", "weatherobs_value")
+POLLUTANT_OBS = _ObsTable("pollutant_observation", "pollobs_date", "pollutantattr_id", "pollobs_value")
+
+def _date_key(s: pd.Series) -> pd.Series:
+    # DB mengembalikan date (MySQL) atau string (SQLite); samakan ke 'YYYY-MM-DD'
+    return pd.to_datetime(s.astype(str).str.slice(0, 10)).dt.strftime("%Y-%m-%d")
+
+def _scope(df: pd.DataFrame) -> dict:
+    """Parameter filter (lokasi + rentang tanggal) untuk mengambil baris yang sudah ada."""
+    return {"locs": sorted(int(x) for x in df["location_id"].unique()),
+            "start": df["obs_date"].min(), "end": df["obs_date"].max()}
+
+def _touched(location_id, date) -> pd.DataFrame:
+    """Key (location_id, date datetime64[D]) unik yang ditulis, untuk refresh agregat."""
+    return pd.DataFrame({"location_id": np.asarray(location_id, dtype=np.int64),
+                         "date": to_days(pd.Series(date))}).drop_duplicates(ignore_index=True)
+
+# Query baca yang jalan di setiap load (lokasi + rentang tanggal batch); penggunaan index-nya
+# dicek oleh etl.query_plans (HOT_QUERIES).
+def existing_obs_sql(t: _ObsTable) -> str:
+    """Nilai observasi yang sudah ada untuk deteksi perubahan."""
+    return f"""
+        SELECT location_id, {t.date_col} AS obs_date, {t.attr_col} AS attr_id, {t.value_col} AS value
+        FROM {t.name}
+        WHERE location_id IN :locs AND {t.date_col} BETWEEN :start AND :end
+    """
+
+# pollobs_id untuk dominant_pollobs_id aqi_daily, semua baris batch sekaligus
+DOMINANT_POLLOBS_SQL = """
+    SELECT location_id, pollobs_date AS obs_date, pollutantattr_id AS dom_attr, pollobs_id
+    FROM pollutant_observation
+    WHERE location_id IN :locs AND pollobs_date BETWEEN :start AND :end
+"""
+
+def _fetch_existing_obs(c: Connection, t: _ObsTable, scope: dict) -> ObservationBatch:
+    sql = text(existing_obs_sql(t)).bindparams(bindparam("locs", expanding=True))
+    return ObservationBatch.from_rows(c.execute(sql, scope).all())
+
+# Baris aqi_daily yang sudah ada untuk rentang batch (deteksi perubahan)
+EXISTING_AQI_SQL = """
+    SELECT location_id, aqidaily_date AS obs_date, aqicat_id, dominant_pollobs_id
+    FROM aqi_daily
+    WHERE location_id IN :locs AND aqidaily_date BETWEEN :start AND :end
+"""
+
+def _diff(incoming: pd.DataFrame, existing: pd.DataFrame, on: List[str],
+          same_mask) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Return (baru, berubah, jumlah_sama). `same_mask(merged)` membandingkan kolom *_db."""
+    merged = incoming.merge(existing, on=on, how="left", suffixes=("", "_db"), indicator=True)
+    new = (merged["_merge"] == "left_only").to_numpy()
+    same = ~new & same_mask(merged)
+    changed = ~new & ~same
+    return merged[new], merged[changed], int(same.sum())
+
+def _write_observations(c: Connection, t: _ObsTable, obs: ObservationBatch, tol: float) -> TableChanges:
+    if not len(obs):
+        return TableChanges()
+    existing = _fetch_existing_obs(c, t, obs.scope())
+    # posisi key di baris DB (-1 = key baru); key DB unik (constraint uq_*)
+    pos = pd.Index(existing.keys()).get_indexer(obs.keys())
+    new = pos < 0
+    old = existing.value[np.where(new, 0, pos)] if len(existing) else np.zeros(len(obs))
+    same = ~new & np.isclose(obs.value, old, rtol=0.0, atol=tol)
+    changed = ~new & ~same
+
+    cols = ["location_id", t.date_col, t.attr_col, t.value_col]
+    written = obs.take(new | changed)
+    if new.any():
+        # tetap ignore: worker lain (replay/klaim paralel) bisa menyisipkan key yang sama duluan
+        insert_ignore(c, t.name, cols, cols[:3], obs.take(new).rows())
+    if changed.any():
+        # upsert (bukan UPDATE per baris): satu statement multi-row per potongan di MySQL
+        upsert(c, t.name, cols, cols[:3], obs.take(changed).rows(), update=[t.value_col])
+    return TableChanges(int(new.sum()), int(changed.sum()), int(same.sum()),
+                        _touched(written.location_id, written.date))
+
+def _refresh_aggregates(c: Connection, report: LoadReport):
+    # Di dalam transaksi load: ringkasan periode (etl.aggregates) ikut commit/rollback.
+    # Hanya minggu/bulan dari key yang disisipkan/berubah; tanpa perubahan => tidak ada refresh.
+    touched = {k: ch.touched for k, ch in ((WEATHER, report.weather), (POLLUTANT, report.pollutant),
+                                           (AQI, report.aqi)) if ch.changed}
+    if touched:
+        refresh_for_load(c, touched)
+
+def _invalidate_read_cache(df: pd.DataFrame, report: LoadReport):
+    # Dipanggil SETELAH commit: cache etl.query untuk rentang tanggal batch ini jadi basi
+    tables = [t for t, ch in ((WEATHER_TABLE, report.weather), (POLLUTANT_TABLE, report.pollutant),
+                              (AQI_TABLE, report.aqi)) if ch.changed]
+    if tables and len(df):
+        dates = _date_key(df["tanggal"])
+        invalidate(tables, dates.min(), dates.max())
 
 # --- Main loaders (now transaction-aware) -----------------------------------
 
-def insert_weather_and_pollutants(engine: Engine, df: pd.DataFrame, conn: Connection | None = None):
+def insert_weather_and_pollutants(engine: Engine, df: pd.DataFrame, conn: Connection | None = None,
+                                  tolerance: float | None = None) -> LoadReport:
     """
-    Insert weather + pollutant observations.
+    Insert new / update changed weather + pollutant observations (lihat "Change detection").
     - If `conn` is provided, uses that connection/transaction.
     - Otherwise, opens its own transaction and commits/rolls back automatically.
     """
-    def _do_work(c: Connection):
+    tol = LOAD_FLOAT_TOLERANCE if tolerance is None else tolerance
+
+    def _do_work(c: Connection) -> LoadReport:
         wmap = _get_weatherattr_ids_with_conn(c)
         pmap = _get_pollutantattr_ids_with_conn(c)
-
-        weather_pairs = [
-            ("suhu_min","suhu_min"),
-            ("suhu_max","suhu_max"),
-            ("suhu_avg","suhu_avg"),
-            ("kelembapan_avg","kelembapan_avg"),
-            ("curah_hujan","curah_hujan"),
-            ("durasi_penyinaran","durasi_penyinaran"),
-            ("kecepatan_angin_max","kecepatan_angin_max"),
-            ("arah_angin_max","arah_angin_max"),
-            ("kecepatan_angin_avg","kecepatan_angin_avg"),
-        ]
-        pollutant_cols = ["pm25","pm10","so2","co","o3","no2"]
-
-        # WEATHER
-        w_stmt = text("""
-            INSERT IGNORE INTO weather_observation (location_id, weatherobs_date, weatherattr_id, weatherobs_value)
-            VALUES (:loc, :dt, :attr, :val)
-        """)
-        for _, row in df.iterrows():
-            loc = int(row["location_id"])
-            dt = row["tanggal"]
-            for code, col in weather_pairs:
-                if col in df.columns and code in wmap:
-                    c.execute(w_stmt, {"loc": loc, "dt": dt, "attr": wmap[code], "val": _nz(row.get(col))})
-
-        # POLLUTANTS
-        p_stmt = text("""
-            INSERT IGNORE INTO pollutant_observation (location_id, pollobs_date, pollutantattr_id, pollobs_value)
-            VALUES (:loc, :dt, :attr, :val)
-        """)
-        for _, row in df.iterrows():
-            loc = int(row["location_id"])
-            dt = row["tanggal"]
-            for col in pollutant_cols:
-                if col in df.columns and col in pmap:
-                    c.execute(p_stmt, {"loc": loc, "dt": dt, "attr": pmap[col], "val": _nz(row.get(col))})
+        report = LoadReport()
+        # frame lebar -> batch long bertipe, sekali per tabel (lihat etl.batch untuk memori)
+        report.weather = _write_observations(c, WEATHER_OBS, ObservationBatch.from_wide(df, wmap, WEATHER_COLS), tol)
+        report.pollutant = _write_observations(c, POLLUTANT_OBS, ObservationBatch.from_wide(df, pmap, POLLUTANT_COLS), tol)
+        return report
 
     if conn is not None:
-        # Use caller's transaction
-        _do_work(conn)
-    else:
-        # Own transaction scope
-        with engine.begin() as c:
-            _do_work(c)
-
-def insert_aqi_daily(engine: Engine, df: pd.DataFrame, conn: Connection | None = None):
+        # Use caller's transaction (pemanggil yang memperbarui agregat & meng-invalidate cache)
+        return _do_work(conn)
+    # Own transaction scope
+    with engine.begin() as c:
+        report = _do_work(c)
+        _refresh_aggregates(c, report)
+    _invalidate_read_cache(df, report)
+    return report
+
+def insert_aqi_daily(engine: Engine, df: pd.DataFrame, conn: Connection | None = None) -> TableChanges:
     """
-    Insert/Upsert AQI daily rows.
+    Insert new / update changed AQI daily rows; baris yang identik dilewati.
+    dominant_pollobs_id di-resolve untuk semua baris dengan satu query (bukan per baris).
     - If `conn` is provided, uses that connection/transaction.
     - Otherwise, opens its own transaction and commits/rolls back automatically.
     """
-    def _do_work(c: Connection):
-        for _, row in df.iterrows():
-            loc = int(row["location_id"])
-            dt = row["tanggal"]
-            kategori = (row.get("kategori_ispu") or "").strip()
-            dom = (row.get("polutan_dominan") or "").strip()
-            dom_id = _resolve_pollobs_id_with_conn(c, loc, dt, dom)
-
-            aqicat = c.execute(
-                text("SELECT aqicat_id FROM aqi_category WHERE aqicat_name=:name"),
-                {"name": kategori}
-            ).mappings().first()
-            if not aqicat:
-                logger.warning(f"AQI category '{kategori}' not found. Skipping aqidaily for {dt}.")
-                continue
-            aqicat_id = int(aqicat["aqicat_id"])
-
-            c.execute(text("""
-                INSERT INTO aqi_daily (location_id, aqidaily_date, aqicat_id, dominant_pollobs_id)
-                VALUES (:loc, :dt, :aqi, :dom)
-                ON DUPLICATE KEY UPDATE
-                    aqicat_id=VALUES(aqicat_id),
-                    dominant_pollobs_id=VALUES(dominant_pollobs_id)
-            """), {"loc": loc, "dt": dt, "aqi": aqicat_id, "dom": dom_id})
+    def _do_work(c: Connection) -> TableChanges:
+        if df.empty:
+            return TableChanges()
+        pmap = _get_pollutantattr_ids_with_conn(c)
+        catmap = {r["aqicat_name"]: int(r["aqicat_id"]) for r in c.execute(
+            text("SELECT aqicat_id, aqicat_name FROM aqi_category")).mappings()}
+
+        a = pd.DataFrame({
+            "location_id": df["location_id"].astype("int64").to_numpy(),
+            "obs_date": _date_key(df["tanggal"]).to_numpy(),
+            "kategori": df["kategori_ispu"].fillna("").astype(str).str.strip().to_numpy()
+                        if "kategori_ispu" in df.columns else "",
+            "dom_attr": df["polutan_dominan"].fillna("").astype(str).str.strip().str.lower().map(pmap).astype("Int64").to_numpy()
+                        if "polutan_dominan" in df.columns else pd.NA,
+        })
+        a["aqicat_id"] = a["kategori"].map(catmap).astype("Int64")
+        unknown = a["aqicat_id"].isna()
+        if unknown.any():
+            for kategori, n in a.loc[unknown, "kategori"].value_counts().items():
+                logger.warning("AQI category '%s' not found. Skipping %s aqidaily rows.", kategori, n)
+            a = a[~unknown]
+        # upsert: baris terakhir per (location, date) menang
+        a = a.drop_duplicates(["location_id", "obs_date"], keep="last")
+        if a.empty:
+            return TableChanges()
+        scope = _scope(a)
+
+        ids = pd.DataFrame(c.execute(text(DOMINANT_POLLOBS_SQL).bindparams(bindparam("locs", expanding=True)),
+                                     scope).all(),
+            columns=["location_id", "obs_date", "dom_attr", "pollobs_id"])
+        ids = ids.astype({"location_id": "int64", "dom_attr": "Int64", "pollobs_id": "Int64"})
+        ids["obs_date"] = _date_key(ids["obs_date"]) if len(ids) else ids["obs_date"].astype(str)
+        a = a.merge(ids, on=["location_id", "obs_date", "dom_attr"], how="left")
+        a = a.rename(columns={"pollobs_id": "dominant_pollobs_id"})
+
+        existing = pd.DataFrame(c.execute(text(EXISTING_AQI_SQL).bindparams(bindparam("locs", expanding=True)),
+                                          scope).all(),
+            columns=["location_id", "obs_date", "aqicat_id", "dominant_pollobs_id"])
+        existing = existing.astype({"location_id": "int64", "aqicat_id": "Int64", "dominant_pollobs_id": "Int64"})
+        existing["obs_date"] = _date_key(existing["obs_date"]) if len(existing) else existing["obs_date"].astype(str)
+
+        def same(m: pd.DataFrame) -> np.ndarray:
+            cat = m["aqicat_id"].eq(m["aqicat_id_db"]).fillna(False)
+            dom = m["dominant_pollobs_id"].eq(m["dominant_pollobs_id_db"]).fillna(False) | (
+                m["dominant_pollobs_id"].isna() & m["dominant_pollobs_id_db"].isna())
+            return (cat & dom).to_numpy(dtype=bool)
+        new, changed, unchanged = _diff(a[["location_id", "obs_date", "aqicat_id", "dominant_pollobs_id"]],
+                                        existing, ["location_id", "obs_date"], same)
+
+        # baru + berubah dalam satu upsert (key baru dari worker lain ikut ditimpa, seperti dulu)
+        todo = pd.concat([new, changed])
+        if len(todo):
+            dom = todo["dominant_pollobs_id"].astype(object).where(todo["dominant_pollobs_id"].notna(), None)
+            rows = [(l, d, int(q), None if p is None else int(p)) for l, d, q, p in zip(
+                todo["location_id"].tolist(), todo["obs_date"].tolist(), todo["aqicat_id"].tolist(), dom.tolist())]
+            upsert(c, "aqi_daily", ["location_id", "aqidaily_date", "aqicat_id", "dominant_pollobs_id"],
+                   ["location_id", "aqidaily_date"], rows)
+        return TableChanges(len(new), len(changed), unchanged, _touched(todo["location_id"], todo["obs_date"]))
 
     if conn is not None:
-        # Use caller's transaction
-        _do_work(conn)
-    else:
-        # Own transaction scope
-        with engine.begin() as c:
-            _do_work(c)
+        # Use caller's transaction (pemanggil yang memperbarui agregat & meng-invalidate cache)
+        return _do_work(conn)
+    # Own transaction scope
+    with engine.begin() as c:
+        changes = _do_work(c)
+        _refresh_aggregates(c, LoadReport(aqi=changes))
+    _invalidate_read_cache(df, LoadReport(aqi=changes))
+    return changes
 
 # --- Convenience wrapper to run BOTH steps atomically -----------------------
 
-def load_all_in_one_transaction(engine: Engine, df: pd.DataFrame):
+def load_all_in_one_transaction(engine: Engine, df: pd.DataFrame) -> LoadReport:
     """
     Run weather/pollutant inserts and AQI daily inserts in ONE transaction.
     - If any step fails, the whole transaction rolls back.
     - On success, it commits once.
+    Return LoadReport (inserted/updated/unchanged per tabel).
     """
     with engine.begin() as c:
-        insert_weather_and_pollutants(engine, df, conn=c)
-        insert_aqi_daily(engine, df, conn=c)
+        report = insert_weather_and_pollutants(engine, df, conn=c)
+        report.aqi = insert_aqi_daily(engine, df, conn=c)
+        _refresh_aggregates(c, report)
+    _invalidate_read_cache(df, report)
+    return report
@@ -1,19 +1,154 @@
-import logging, os, datetime
-from .config import Paths
+"""
+Process-wide logging setup.
 
-def get_logger(name="airweather.etl"):
-    os.makedirs(Paths.LOG_DIR, exist_ok=True)
+configure_logging() dipanggil sekali per proses (otomatis oleh get_logger bila belum):
+- semua logger mengalir ke root -> QueueHandler (non-blocking, format di thread pemanggil minimal)
+- QueueListener di thread terpisah menulis ke SATU file per run
+  (LOG/LOG_<ts>_<pid>.log, rotasi per ukuran) + console
+- file berformat JSON per baris dengan run_id, city dan stage (contextvars)
+
+    logger = get_logger(__name__)
+    with log_context(city="jakarta"):
+        logger.info("...")
+"""
+import atexit, contextvars, datetime, json, logging, os, queue, uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator
+
+from .config import Paths, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_FORMAT
+
+_TEXT_FMT = "%(asctime)s | %(levelname)s | %(message)s"
+# Logger milik aplikasi; logger pihak ketiga tetap di level root (WARNING)
+_APP_LOGGERS = ("etl", "airweather")
+
+_CONTEXT: contextvars.ContextVar[Dict[str, str] | None] = contextvars.ContextVar("log_context", default=None)
+_RUN_ID = uuid.uuid4().hex[:12]
+
+_configured = False
+_listener: QueueListener | None = None
+_queue_handler: QueueHandler | None = None
+_logfile: str | None = None
+
+def run_id() -> str:
+    return _RUN_ID
+
+def current_context() -> Dict[str, str]:
+    return dict(_CONTEXT.get() or {})
+
+def set_log_context(**fields):
+    """Tambah/ubah field konteks untuk sisa eksekusi (thread/task) ini."""
+    ctx = current_context()
+    ctx.update({k: str(v) for k, v in fields.items() if v is not None})
+    _CONTEXT.set(ctx)
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    token = _CONTEXT.set({**current_context(), **{k: str(v) for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _CONTEXT.reset(token)
+
+class _ContextFilter(logging.Filter):
+    # Dijalankan di thread pemanggil (sebelum masuk queue) agar contextvars masih terbaca
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = _CONTEXT.get() or {}
+        record.run_id = ctx.get("run_id", _RUN_ID)
+        record.city = ctx.get("city")
+        record.stage = ctx.get("stage")   # di-set oleh RunMetrics.stage()
+        return True
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "run_id": getattr(record, "run_id", _RUN_ID),
+            "city": getattr(record, "city", None),
+            "stage": getattr(record, "stage", None),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, default=str, ensure_ascii=False)
+
+def logfile() -> str | None:
+    return _logfile
+
+def configure_logging(log_dir: str | None = None, *, level: str | None = None,
+                      fmt: str | None = None, console: bool = True, force: bool = False) -> str | None:
+    """Pasang QueueHandler + listener sekali per proses. Return path file log run ini."""
+    global _configured, _listener, _queue_handler, _logfile
+    if _configured and not force:
+        return _logfile
+    if force:
+        shutdown_logging()
+
+    log_dir = log_dir or Paths.LOG_DIR
+    os.makedirs(log_dir, exist_ok=True)
     ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    logfile = os.path.join(Paths.LOG_DIR, f"LOG_{ts}.log")
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    logger.propagate = False
-    # avoid duplicate handlers during tests
-    if not logger.handlers:
-        fh = logging.FileHandler(logfile, encoding="utf-8")
+    _logfile = os.path.join(log_dir, f"LOG_{ts}_{os.getpid()}.log")
+
+    # delay=True: file baru dibuat saat record pertama ditulis
+    fh = RotatingFileHandler(_logfile, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                             encoding="utf-8", delay=True)
+    fh.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else logging.Formatter(_TEXT_FMT))
+    handlers = [fh]
+    if console:
         ch = logging.StreamHandler()
-        fmt = logging.Formatter("%(asctime)s | %(levelname)s | %(message)s")
-        fh.setFormatter(fmt); ch.setFormatter(fmt)
-        logger.addHandler(fh); logger.addHandler(ch)
-    logger.info("Log file initialized.")
+        ch.setFormatter(logging.Formatter(_TEXT_FMT))
+        handlers.append(ch)
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(q)
+    _queue_handler.addFilter(_ContextFilter())
+    _listener = QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    _configured = True
+    lvl = getattr(logging, (level or LOG_LEVEL).upper(), logging.INFO)
+    for app in _APP_LOGGERS:
+        logging.getLogger(app).setLevel(lvl)
+    return _logfile
+
+def shutdown_logging():
+    """Flush queue & tutup file (dipanggil otomatis saat exit)."""
+    global _configured, _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+    _listener = None
+    _queue_handler = None
+    _configured = False
+
+atexit.register(shutdown_logging)
+
+def _after_fork_in_child():
+    # Thread listener tidak ikut ter-fork: record di child akan menumpuk di queue tanpa pembaca.
+    # Worker (ProcessPoolExecutor) cukup menulis langsung ke stderr.
+    global _listener, _queue_handler, _logfile
+    if _queue_handler is None:
+        return
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = _queue_handler = None
+    _logfile = None
+    ch = logging.StreamHandler()
+    ch.setFormatter(logging.Formatter(f"%(asctime)s | %(levelname)s | pid={os.getpid()} | %(message)s"))
+    logging.getLogger().addHandler(ch)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+def get_logger(name="airweather.etl"):
+    configure_logging()
+    logger = logging.getLogger(name)
+    if not name.startswith(_APP_LOGGERS) and logger.level == logging.NOTSET:
+        logger.setLevel(logging.getLogger(_APP_LOGGERS[0]).level)
     return logger
@@ -0,0 +1,186 @@
+"""
+Lightweight per-stage metrics for the ETL pipelines.
+
+    metrics = RunMetrics("airweather", city="jakarta")
+    with metrics.stage("extract") as st:
+        df = extract_weather(path)
+        st.rows_out = len(df)
+    metrics.emit()
+
+Satu record JSON per run (durasi, rows in/out, rows/sec per stage) ditulis ke log dan
+di-append ke METRICS_JSONL. Jika METRICS_TEXTFILE_DIR di-set, file `.prom` untuk
+node_exporter textfile collector ikut ditulis (atomic rename).
+
+`current_stage()` memberi nama stage yang sedang berjalan (dipakai untuk atribusi SQL
+dan log), dan `register_stage_hook()` memungkinkan modul lain membungkus setiap stage.
+"""
+import contextvars, json, os, re, tempfile, time, datetime
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass
+from typing import Callable, ContextManager, Dict, Iterator, List
+
+from .config import METRICS_JSONL, METRICS_TEXTFILE_DIR
+from .logging_util import current_context, get_logger, log_context, run_id as process_run_id
+
+logger = get_logger(__name__)
+
+_CURRENT_STAGE: contextvars.ContextVar[str | None] = contextvars.ContextVar("etl_stage", default=None)
+
+# hook(pipeline, stage) -> context manager yang membungkus eksekusi stage
+StageHook = Callable[[str, str], ContextManager]
+_STAGE_HOOKS: List[StageHook] = []
+
+def current_stage() -> str | None:
+    return _CURRENT_STAGE.get()
+
+def register_stage_hook(hook: StageHook) -> StageHook:
+    _STAGE_HOOKS.append(hook)
+    return hook
+
+def unregister_stage_hook(hook: StageHook):
+    if hook in _STAGE_HOOKS:
+        _STAGE_HOOKS.remove(hook)
+
+@dataclass
+class StageMetrics:
+    name: str
+    rows_in: int | None = None
+    rows_out: int | None = None
+    duration_s: float = 0.0
+
+    @property
+    def rows_per_s(self) -> float | None:
+        rows = self.rows_out if self.rows_out is not None else self.rows_in
+        if rows is None or self.duration_s <= 0:
+            return None
+        return rows / self.duration_s
+
+    def as_dict(self) -> dict:
+        rps = self.rows_per_s
+        return {
+            "stage": self.name,
+            "duration_s": round(self.duration_s, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "rows_per_s": None if rps is None else round(rps, 2),
+        }
+
+class RunMetrics:
+    """
+    Metrik satu run. `labels` berkardinalitas rendah (ikut ke Prometheus);
+    `info` untuk detail yang hanya masuk record JSON (mis. period_name).
+    """
+    def __init__(self, pipeline: str, run_id: str | None = None, **labels):
+        self.pipeline = pipeline
+        self.labels: Dict[str, str] = {k: str(v) for k, v in labels.items() if v is not None}
+        self.info: Dict[str, object] = {}
+        # Default: run_id yang sama dengan record log, supaya metrik & log bisa di-join
+        self.run_id = run_id or current_context().get("run_id") or process_run_id()
+        self.stages: List[StageMetrics] = []
+        self.status = "running"
+        self.started_at = datetime.datetime.now()
+        self._t0 = time.perf_counter()
+        self.duration_s = 0.0
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None) -> Iterator[StageMetrics]:
+        st = StageMetrics(name=name, rows_in=rows_in)
+        token = _CURRENT_STAGE.set(name)
+        t0 = time.perf_counter()
+        try:
+            with ExitStack() as hooks:
+                hooks.enter_context(log_context(stage=name))
+                for hook in list(_STAGE_HOOKS):
+                    hooks.enter_context(hook(self.pipeline, name))
+                yield st
+        finally:
+            st.duration_s = time.perf_counter() - t0
+            _CURRENT_STAGE.reset(token)
+            self.stages.append(st)
+
+    def finish(self, status: str = "ok") -> "RunMetrics":
+        self.status = status
+        self.duration_s = time.perf_counter() - self._t0
+        return self
+
+    def to_record(self) -> dict:
+        return {
+            "run_id": self.run_id,
+            "pipeline": self.pipeline,
+            "labels": self.labels,
+            **self.info,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration_s": round(self.duration_s, 6),
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+    def to_prometheus(self) -> str:
+        base = {"pipeline": self.pipeline, **self.labels}
+        def fmt(labels: Dict[str, str]) -> str:
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+        lines = [
+            "# HELP airweather_stage_duration_seconds Duration of the last run per stage.",
+            "# TYPE airweather_stage_duration_seconds gauge",
+        ]
+        lines += [f"airweather_stage_duration_seconds{fmt({**base, 'stage': s.name})} {s.duration_s:.6f}"
+                  for s in self.stages]
+        lines += ["# HELP airweather_stage_rows Rows in/out of the last run per stage.",
+                  "# TYPE airweather_stage_rows gauge"]
+        for s in self.stages:
+            for direction, v in (("in", s.rows_in), ("out", s.rows_out)):
+                if v is not None:
+                    lines.append(f"airweather_stage_rows{fmt({**base, 'stage': s.name, 'direction': direction})} {v}")
+        lines += [
+            "# HELP airweather_run_duration_seconds Duration of the last run.",
+            "# TYPE airweather_run_duration_seconds gauge",
+            f"airweather_run_duration_seconds{fmt(base)} {self.duration_s:.6f}",
+            "# HELP airweather_run_success 1 if the last run succeeded.",
+            "# TYPE airweather_run_success gauge",
+            f"airweather_run_success{fmt(base)} {1 if self.status == 'ok' else 0}",
+            "# HELP airweather_run_timestamp_seconds Unix time the last run finished.",
+            "# TYPE airweather_run_timestamp_seconds gauge",
+            f"airweather_run_timestamp_seconds{fmt(base)} {time.time():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def emit(self, jsonl_path: str | None = None, textfile_dir: str | None = None) -> dict:
+        """Log + append record JSON; tulis file .prom bila textfile_dir (atau METRICS_TEXTFILE_DIR) ada."""
+        if self.status == "running":
+            self.finish()
+        record = self.to_record()
+        line = json.dumps(record, default=str)
+        logger.info("RUN_METRICS %s", line)
+
+        jsonl_path = jsonl_path or METRICS_JSONL
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+            with open(jsonl_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+        textfile_dir = textfile_dir or METRICS_TEXTFILE_DIR
+        if textfile_dir:
+            write_textfile(self, textfile_dir)
+        return record
+
+    def emit_safely(self, **kwargs) -> dict | None:
+        """emit() untuk blok `finally`: kegagalan menulis metrik hanya di-log, tidak menutupi exception run."""
+        try:
+            return self.emit(**kwargs)
+        except Exception:
+            logger.exception("Failed to emit run metrics for %s (run_id=%s)", self.pipeline, self.run_id)
+            return None
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def write_textfile(metrics: RunMetrics, directory: str) -> str:
+    # node_exporter membaca *.prom; tulis ke file sementara lalu rename agar tidak terbaca setengah jadi
+    os.makedirs(directory, exist_ok=True)
+    suffix = re.sub(r"[^A-Za-z0-9_]+", "_", "_".join([metrics.pipeline, *metrics.labels.values()]))
+    path = os.path.join(directory, f"airweather_{suffix}.prom")
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(metrics.to_prometheus())
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,266 @@
+"""
+Versioned schema/index migrations for the airweather warehouse.
+
+Setiap Migration punya nomor versi; versi yang sudah diterapkan dicatat di tabel
+`schema_migrations`. DDL ditulis sekali dengan placeholder tipe per dialect
+({pk}, {double}, {flag}, {ts}) sehingga bisa jalan di MySQL, SQLite dan PostgreSQL.
+Index dibuat hanya jika belum ada index dengan nama sama atau index lain yang
+sudah diawali kolom yang sama (dicek via inspector; MySQL tidak punya
+CREATE INDEX IF NOT EXISTS).
+
+    uv run python scripts/db_migrate.py upgrade
+    uv run python scripts/db_migrate.py status
+    uv run python scripts/db_migrate.py check-plans
+"""
+import datetime
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+_TYPES: Dict[str, Dict[str, str]] = {
+    "mysql":      {"pk": "INT AUTO_INCREMENT PRIMARY KEY", "double": "DOUBLE", "flag": "TINYINT", "ts": "DATETIME"},
+    "sqlite":     {"pk": "INTEGER PRIMARY KEY AUTOINCREMENT", "double": "REAL", "flag": "SMALLINT", "ts": "TIMESTAMP"},
+    "postgresql": {"pk": "SERIAL PRIMARY KEY", "double": "DOUBLE PRECISION", "flag": "SMALLINT", "ts": "TIMESTAMP"},
+}
+
+@dataclass(frozen=True)
+class IndexSpec:
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    tables: Tuple[str, ...] = ()      # CREATE TABLE IF NOT EXISTS templates
+    indexes: Tuple[IndexSpec, ...] = ()
+
+# Tabel-tabel yang hampir selalu dibaca per (lokasi, tanggal, atribut)
+OBSERVATION_TABLES = ("weather_observation", "pollutant_observation", "aqi_daily")
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="baseline star schema (no-op on an existing warehouse)",
+        tables=(
+            """CREATE TABLE IF NOT EXISTS city (
+                city_id {pk},
+                name VARCHAR(100) NOT NULL
+            )""",
+            """CREATE TABLE IF NOT EXISTS location (
+                location_id {pk},
+                city_id INT NOT NULL,
+                station_code VARCHAR(50) NOT NULL,
+                location_name VARCHAR(150)
+            )""",
+            """CREATE TABLE IF NOT EXISTS weather_attribute (
+                weatherattr_id {pk},
+                weatherattr_code VARCHAR(50) NOT NULL,
+                CONSTRAINT uq_weatherattr_code UNIQUE (weatherattr_code)
+            )""",
+            """CREATE TABLE IF NOT EXISTS pollutant_attribute (
+                pollutantattr_id {pk},
+                pollutantattr_code VARCHAR(50) NOT NULL,
+                CONSTRAINT uq_pollutantattr_code UNIQUE (pollutantattr_code)
+            )""",
+            """CREATE TABLE IF NOT EXISTS weather_observation (
+                weatherobs_id {pk},
+                location_id INT NOT NULL,
+                weatherobs_date DATE NOT NULL,
+                weatherattr_id INT NOT NULL,
+                weatherobs_value {double},
+                CONSTRAINT uq_weather_observation UNIQUE (location_id, weatherobs_date, weatherattr_id)
+            )""",
+            """CREATE TABLE IF NOT EXISTS pollutant_observation (
+                pollobs_id {pk},
+                location_id INT NOT NULL,
+                pollobs_date DATE NOT NULL,
+                pollutantattr_id INT NOT NULL,
+                pollobs_value {double},
+                CONSTRAINT uq_pollutant_observation UNIQUE (location_id, pollobs_date, pollutantattr_id)
+            )""",
+            """CREATE TABLE IF NOT EXISTS aqi_category (
+                aqicat_id {pk},
+                aqicat_name VARCHAR(50) NOT NULL,
+                CONSTRAINT uq_aqicat_name UNIQUE (aqicat_name)
+            )""",
+            """CREATE TABLE IF NOT EXISTS aqi_daily (
+                aqidaily_id {pk},
+                location_id INT NOT NULL,
+                aqidaily_date DATE NOT NULL,
+                aqicat_id INT NOT NULL,
+                dominant_pollobs_id INT,
+                CONSTRAINT uq_aqi_daily UNIQUE (location_id, aqidaily_date)
+            )""",
+            """CREATE TABLE IF NOT EXISTS correlation_metrics (
+                corrmet_id {pk},
+                weather_x INT NOT NULL,
+                pollutant_y INT NOT NULL,
+                is_active {flag} NOT NULL DEFAULT 1
+            )""",
+            """CREATE TABLE IF NOT EXISTS correlation_flag (
+                corrflag_id {pk},
+                corrflag_desc VARCHAR(50) NOT NULL,
+                CONSTRAINT uq_corrflag_desc UNIQUE (corrflag_desc)
+            )""",
+            """CREATE TABLE IF NOT EXISTS correlation_result (
+                corrres_id {pk},
+                location_id INT NOT NULL,
+                corrmet_id INT NOT NULL,
+                period_name VARCHAR(40) NOT NULL,
+                processing_date DATE NOT NULL,
+                val_result INT NOT NULL,
+                n_samples INT NOT NULL
+            )""",
+        ),
+    ),
+    Migration(
+        version=2,
+        description="covering indexes for fetch_pairs, fetch_pairs_by_station and the loader's existing-row lookups",
+        indexes=(
+            # fetch_pairs: LEFT JOIN ... ON attr_id = cm.* AND date = d.dt (covering: + location_id, value)
+            IndexSpec("ix_wo_attr_date", "weather_observation",
+                      ("weatherattr_id", "weatherobs_date", "location_id", "weatherobs_value")),
+            IndexSpec("ix_po_attr_date", "pollutant_observation",
+                      ("pollutantattr_id", "pollobs_date", "location_id", "pollobs_value")),
+            # fetch_pairs: deret tanggal (UNION ... WHERE date BETWEEN :start AND :end)
+            IndexSpec("ix_wo_date", "weather_observation", ("weatherobs_date",)),
+            IndexSpec("ix_po_date", "pollutant_observation", ("pollobs_date",)),
+            # loader (existing_obs_sql / DOMINANT_POLLOBS_SQL): location_id IN (...) AND pollobs_date BETWEEN
+            # (dilewati jika unique key dengan kolom yang sama sudah ada; PK ikut di index InnoDB)
+            IndexSpec("ix_po_loc_date_attr", "pollutant_observation",
+                      ("location_id", "pollobs_date", "pollutantattr_id")),
+            # fetch_pairs_by_station: location per kota
+            IndexSpec("ix_location_city", "location", ("city_id", "location_id")),
+        ),
+    ),
+    Migration(
+        version=3,
+        description="etl_file_ledger: one row per ingested file (sha256, status, rows, duration)",
+        tables=(
+            """CREATE TABLE IF NOT EXISTS etl_file_ledger (
+                ledger_id {pk},
+                sha256 CHAR(64) NOT NULL,
+                file_name VARCHAR(255) NOT NULL,
+                kind VARCHAR(20) NOT NULL,
+                city VARCHAR(100),
+                status VARCHAR(20) NOT NULL,
+                size_bytes BIGINT NOT NULL,
+                rows_in INT,
+                rows_loaded INT,
+                duration_s {double},
+                run_id VARCHAR(32),
+                recorded_at {ts} NOT NULL
+            )""",
+        ),
+        indexes=(
+            # cek duplikat sebelum parsing: WHERE sha256 = :h AND status = 'loaded'
+            IndexSpec("ix_ledger_sha256_status", "etl_file_ledger", ("sha256", "status")),
+        ),
+    ),
+    Migration(
+        version=4,
+        description="weekly/monthly descriptive aggregates per station and city (etl.aggregates)",
+        tables=(
+            # scope = 'station' (scope_id = location_id) | 'city' (scope_id = city_id)
+            """CREATE TABLE IF NOT EXISTS agg_observation_period (
+                aggobs_id {pk},
+                scope VARCHAR(10) NOT NULL,
+                scope_id INT NOT NULL,
+                period_type VARCHAR(5) NOT NULL,
+                period_start DATE NOT NULL,
+                period_end DATE NOT NULL,
+                period_name VARCHAR(40) NOT NULL,
+                kind VARCHAR(10) NOT NULL,
+                attr_id INT NOT NULL,
+                n_obs INT NOT NULL,
+                min_value {double},
+                max_value {double},
+                mean_value {double},
+                updated_at {ts} NOT NULL,
+                CONSTRAINT uq_agg_observation_period UNIQUE (scope, scope_id, period_type, period_start, kind, attr_id)
+            )""",
+            """CREATE TABLE IF NOT EXISTS agg_aqi_period (
+                aggaqi_id {pk},
+                scope VARCHAR(10) NOT NULL,
+                scope_id INT NOT NULL,
+                period_type VARCHAR(5) NOT NULL,
+                period_start DATE NOT NULL,
+                period_end DATE NOT NULL,
+                period_name VARCHAR(40) NOT NULL,
+                aqicat_id INT NOT NULL,
+                n_days INT NOT NULL,
+                updated_at {ts} NOT NULL,
+                CONSTRAINT uq_agg_aqi_period UNIQUE (scope, scope_id, period_type, period_start, aqicat_id)
+            )""",
+        ),
+    ),
+]
+
+_VERSION_TABLE = """CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(200) NOT NULL,
+    applied_at {ts} NOT NULL
+)"""
+
+def _render(conn: Connection, ddl: str) -> str:
+    types = _TYPES.get(conn.dialect.name)
+    if types is None:
+        raise RuntimeError(f"Unsupported dialect for migrations: {conn.dialect.name}")
+    return ddl.format(**types)
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(_render(conn, _VERSION_TABLE)))
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        rows = conn.execute(text("SELECT version FROM schema_migrations ORDER BY version")).all()
+    return [int(r[0]) for r in rows]
+
+def current_version(engine: Engine) -> int:
+    versions = applied_versions(engine)
+    return versions[-1] if versions else 0
+
+def pending(engine: Engine) -> List[Migration]:
+    done = set(applied_versions(engine))
+    return [m for m in MIGRATIONS if m.version not in done]
+
+def _existing_indexes(conn: Connection, table: str) -> Dict[str, Tuple[str, ...]]:
+    insp = inspect(conn)
+    out = {ix["name"]: tuple(c for c in ix["column_names"] if c) for ix in insp.get_indexes(table)}
+    for uq in insp.get_unique_constraints(table):
+        out[uq.get("name") or f"uq_{len(out)}"] = tuple(uq["column_names"])
+    return out
+
+def _index_exists(existing: Dict[str, Tuple[str, ...]], ix: IndexSpec) -> bool:
+    if ix.name in existing:
+        return True
+    n = len(ix.columns)
+    return any(tuple(c.lower() for c in cols[:n]) == ix.columns for cols in existing.values())
+
+def _apply(conn: Connection, m: Migration):
+    for ddl in m.tables:
+        conn.execute(text(_render(conn, ddl)))
+    for ix in m.indexes:
+        if _index_exists(_existing_indexes(conn, ix.table), ix):
+            continue
+        conn.execute(text(f"CREATE INDEX {ix.name} ON {ix.table} ({', '.join(ix.columns)})"))
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+        {"v": m.version, "d": m.description, "t": datetime.datetime.now().replace(microsecond=0)},
+    )
+
+def upgrade(engine: Engine, target: int | None = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: latest). Returns applied versions."""
+    applied = []
+    for m in pending(engine):
+        if target is not None and m.version > target:
+            break
+        # Satu transaksi per versi (DDL MySQL auto-commit, tapi pencatatan versi tetap terakhir)
+        with engine.begin() as conn:
+            _apply(conn, m)
+        applied.append(m.version)
+    return applied
@@ -0,0 +1,242 @@
+"""
+RANGE partitioning (MySQL) untuk tabel observasi berdasarkan tanggal.
+
+- convert_statements(): ubah tabel heap menjadi PARTITION BY RANGE COLUMNS(<tanggal>)
+  per bulan atau per tahun, plus partisi penampung `pmax`.
+- maintenance_statements(): pre-create partisi ke depan (REORGANIZE pmax) dan opsional
+  arsip (EXCHANGE PARTITION ke tabel biasa) atau drop partisi lama.
+- verify_pruning(): EXPLAIN query panas yang sebenarnya (fetch_pairs, fetch_pairs_by_station,
+  lookup rentang aqi_daily di loader) dengan parameter nyata, dan pastikan setiap akses ke tabel
+  terpartisi hanya membaca partisi rentang yang diminta.
+
+Semua fungsi *_statements murni (hanya menghasilkan SQL) sehingga bisa di-review/dry-run
+dulu lewat `scripts/partition_maintenance.py` sebelum dieksekusi.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Tuple
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection, Engine
+
+class PartitioningError(RuntimeError): ...
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    table: str
+    date_column: str
+    pk_column: str
+
+PARTITIONED_TABLES: Dict[str, PartitionedTable] = {
+    "weather_observation": PartitionedTable("weather_observation", "weatherobs_date", "weatherobs_id"),
+    "pollutant_observation": PartitionedTable("pollutant_observation", "pollobs_date", "pollobs_id"),
+    "aqi_daily": PartitionedTable("aqi_daily", "aqidaily_date", "aqidaily_id"),
+}
+
+CATCH_ALL = "pmax"
+_NAME_RE = re.compile(r"^p(\d{4})(\d{2})?$")
+
+# --- Partition boundaries -------------------------------------------------------
+
+def _next_period(d: date, granularity: str) -> date:
+    if granularity == "year":
+        return date(d.year + 1, 1, 1)
+    if granularity == "month":
+        return date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+    raise ValueError(f"granularity must be 'month' or 'year', got {granularity!r}")
+
+def _period_start(d: date, granularity: str) -> date:
+    return date(d.year, 1, 1) if granularity == "year" else date(d.year, d.month, 1)
+
+def partition_name(period_start: date, granularity: str) -> str:
+    return f"p{period_start.year}" if granularity == "year" else f"p{period_start:%Y%m}"
+
+def partition_bounds(start: date, end: date, granularity: str) -> List[Tuple[str, date]]:
+    """[(nama, batas_atas_eksklusif)] untuk setiap periode yang memuat start..end."""
+    out = []
+    cur = _period_start(start, granularity)
+    while cur <= end:
+        nxt = _next_period(cur, granularity)
+        out.append((partition_name(cur, granularity), nxt))
+        cur = nxt
+    return out
+
+def _partition_clause(name: str, upper: date) -> str:
+    return f"PARTITION {name} VALUES LESS THAN ('{upper.isoformat()}')"
+
+# --- Conversion -------------------------------------------------------------------
+
+def convert_statements(spec: PartitionedTable, start: date, end: date, granularity: str = "month") -> List[str]:
+    """
+    MySQL mensyaratkan kolom partisi ada di setiap unique key (termasuk PK), jadi PK
+    diperluas menjadi (pk, tanggal) sebelum PARTITION BY RANGE COLUMNS.
+    """
+    parts = [_partition_clause(n, u) for n, u in partition_bounds(start, end, granularity)]
+    parts.append(f"PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE)")
+    return [
+        f"ALTER TABLE {spec.table} DROP PRIMARY KEY, ADD PRIMARY KEY ({spec.pk_column}, {spec.date_column})",
+        f"ALTER TABLE {spec.table} PARTITION BY RANGE COLUMNS({spec.date_column}) (\n    "
+        + ",\n    ".join(parts) + "\n)",
+    ]
+
+def preflight(conn: Connection, spec: PartitionedTable):
+    """Tolak konversi jika ada foreign key atau unique key yang tidak memuat kolom tanggal."""
+    fks = conn.execute(text("""
+        SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE
+        WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL
+          AND (TABLE_NAME = :t OR REFERENCED_TABLE_NAME = :t)
+    """), {"t": spec.table}).scalars().all()
+    if fks:
+        raise PartitioningError(f"{spec.table}: partitioned InnoDB tables cannot have foreign keys {sorted(set(fks))}")
+    rows = conn.execute(text("""
+        SELECT INDEX_NAME, GROUP_CONCAT(COLUMN_NAME) AS cols FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND NON_UNIQUE = 0 AND INDEX_NAME <> 'PRIMARY'
+        GROUP BY INDEX_NAME
+    """), {"t": spec.table}).mappings().all()
+    bad = [r["INDEX_NAME"] for r in rows if spec.date_column not in str(r["cols"]).split(",")]
+    if bad:
+        raise PartitioningError(f"{spec.table}: unique keys {bad} must include {spec.date_column}")
+
+# --- Maintenance --------------------------------------------------------------------
+
+def existing_partitions(conn: Connection, table: str) -> List[Tuple[str, str]]:
+    """[(PARTITION_NAME, PARTITION_DESCRIPTION)] berurutan; kosong jika tabel belum dipartisi."""
+    rows = conn.execute(text("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """), {"t": table}).all()
+    return [(r[0], str(r[1])) for r in rows]
+
+def _period_of(name: str) -> Tuple[date, str] | None:
+    m = _NAME_RE.match(name)
+    if not m:
+        return None
+    year, month = int(m.group(1)), m.group(2)
+    return (date(year, int(month), 1), "month") if month else (date(year, 1, 1), "year")
+
+def maintenance_statements(spec: PartitionedTable, partitions: List[Tuple[str, str]], today: date,
+                           ahead: int = 3, retain: int | None = None, mode: str = "keep") -> List[str]:
+    """
+    - ahead: jumlah periode ke depan (setelah periode `today`) yang harus sudah ada.
+    - retain: simpan `retain` periode terakhir (termasuk periode berjalan); lebih lama dari itu
+      di-`archive` (EXCHANGE ke tabel <table>_<partisi>) atau di-`drop`. mode="keep" => tidak ada.
+    """
+    if mode not in ("keep", "archive", "drop"):
+        raise ValueError("mode must be keep, archive or drop")
+    periods = [(n, p) for n, _ in partitions if (p := _period_of(n))]
+    if not periods:
+        raise PartitioningError(f"{spec.table} is not partitioned by this tool (no pYYYY[MM] partitions)")
+    granularity = periods[0][1][1]
+    last_start = max(p[0] for _, p in periods)
+    names = {n for n, _ in periods}
+
+    stmts: List[str] = []
+
+    # 1) Pre-create partisi ke depan dengan memecah pmax
+    target = _period_start(today, granularity)
+    for _ in range(ahead):
+        target = _next_period(target, granularity)
+    new_parts = []
+    cur = _next_period(last_start, granularity)
+    while cur <= target:
+        name = partition_name(cur, granularity)
+        if name not in names:
+            new_parts.append(_partition_clause(name, _next_period(cur, granularity)))
+        cur = _next_period(cur, granularity)
+    if new_parts:
+        stmts.append(
+            f"ALTER TABLE {spec.table} REORGANIZE PARTITION {CATCH_ALL} INTO (\n    "
+            + ",\n    ".join(new_parts + [f"PARTITION {CATCH_ALL} VALUES LESS THAN (MAXVALUE)"]) + "\n)"
+        )
+
+    # 2) Retensi: partisi yang seluruhnya lebih tua dari `retain` periode terakhir
+    if retain is not None and mode != "keep":
+        cutoff = _period_start(today, granularity)
+        for _ in range(retain - 1):
+            cutoff = _period_start(date.fromordinal(cutoff.toordinal() - 1), granularity)
+        for name, (pstart, _) in sorted(periods, key=lambda x: x[1][0]):
+            if pstart >= cutoff:
+                break
+            if mode == "archive":
+                archive = f"{spec.table}_{name}"
+                stmts += [
+                    f"CREATE TABLE IF NOT EXISTS {archive} LIKE {spec.table}",
+                    f"ALTER TABLE {archive} REMOVE PARTITIONING",
+                    f"ALTER TABLE {spec.table} EXCHANGE PARTITION {name} WITH TABLE {archive}",
+                ]
+            stmts.append(f"ALTER TABLE {spec.table} DROP PARTITION {name}")
+    return stmts
+
+# --- Pruning verification ---------------------------------------------------------------
+
+def expected_partitions(partitions: List[Tuple[str, str]], start: date, end: date) -> List[str]:
+    out = []
+    for name, _ in partitions:
+        p = _period_of(name)
+        if p is None:
+            continue
+        pstart, gran = p
+        if pstart <= end and _next_period(pstart, gran) > start:
+            out.append(name)
+    return out
+
+@dataclass(frozen=True)
+class PruningCheck:
+    query: str
+    table: str              # nama/alias di output EXPLAIN
+    ok: bool
+    used: List[str]
+    expected: List[str]
+
+def _pruning_queries() -> List[Tuple[str, str]]:
+    # import lambat: pipeline Pearson menarik scipy, tidak perlu untuk convert/maintain
+    from .load import EXISTING_AQI_SQL
+    from .pipeline.pearson_pipeline import FETCH_PAIRS_BY_STATION_SQL, FETCH_PAIRS_SQL
+    return [("fetch_pairs", FETCH_PAIRS_SQL), ("fetch_pairs_by_station", FETCH_PAIRS_BY_STATION_SQL),
+            ("existing_aqi_daily", EXISTING_AQI_SQL)]
+
+def verify_pruning(engine: Engine, start: date, end: date, city_id: int = 1) -> List[PruningCheck]:
+    """
+    EXPLAIN query panas dengan parameter nyata (rentang, `city_id`, stasiun kota itu). Satu
+    PruningCheck per baris EXPLAIN yang membaca tabel terpartisi: ok bila partisi yang dibaca
+    tidak kosong dan seluruhnya di dalam rentang. Query yang membungkus kolom tanggal dengan
+    fungsi atau join lewat jalur tanpa pruning akan membaca partisi lain dan gagal.
+    """
+    out = []
+    with engine.connect() as conn:
+        parts = {t: existing_partitions(conn, t) for t in PARTITIONED_TABLES}
+        expected = {t: expected_partitions(p, start, end) for t, p in parts.items() if p}
+        if not expected:
+            return out
+        locs = conn.execute(text("SELECT location_id FROM location WHERE city_id = :c"), {"c": city_id}).scalars().all()
+        params = {"start": start, "end": end, "city_id": city_id, "locs": list(locs) or [0]}
+        for name, sql in _pruning_queries():
+            stmt = text("EXPLAIN " + sql)
+            if ":locs" in sql:
+                stmt = stmt.bindparams(bindparam("locs", expanding=True))
+            rows = conn.execute(stmt, {k: v for k, v in params.items() if f":{k}" in sql}).mappings().all()
+            out += pruning_checks(name, sql, rows, expected)
+    return out
+
+def pruning_checks(name: str, sql: str, explain_rows: List[dict],
+                   expected: Dict[str, List[str]]) -> List[PruningCheck]:
+    """Nilai baris EXPLAIN MySQL (kolom `table`, `partitions`) terhadap partisi yang diharapkan per tabel."""
+    from .query_plans import _alias_map
+    aliases = _alias_map(sql)
+    out = []
+    for row in explain_rows:
+        table = str(row.get("table") or "")
+        real = aliases.get(table.lower(), table.lower())
+        if real not in expected:
+            continue
+        used = [p for p in str(row.get("partitions") or "").split(",") if p]
+        out.append(PruningCheck(name, table, bool(used) and set(used) <= set(expected[real]), used, expected[real]))
+    return out
+
+def execute(engine: Engine, statements: List[str]):
+    # DDL MySQL auto-commit per statement; jalankan berurutan dan berhenti di error pertama
+    with engine.connect() as conn:
+        for stmt in statements:
+            conn.execute(text(stmt))
+        conn.commit()
@@ -0,0 +1,38 @@
+"""
+Batas periode WEEK/MONTH yang dipakai bersama PearsonPipeline (jadwal korelasi) dan
+etl.aggregates (ringkasan periode).
+
+- MONTH: tanggal 1 s/d akhir bulan.
+- WEEK : Senin s/d Minggu, dipotong batas bulan. Minggu yang melewati pergantian bulan jadi
+  dua periode: sisa akhir bulan (leftover, dijalankan di hari terakhir bulan) dan awal bulan
+  berikutnya s/d hari Minggu (get_date_range_weekly).
+
+Nama periode sama dengan correlation_result.period_name: WEEK_<start>_<end>, MONTH_<YYYYMM>.
+"""
+from datetime import date, timedelta
+from typing import Tuple
+
+WEEK, MONTH = "WEEK", "MONTH"
+
+def month_last_day(d: date) -> date:
+    if d.month == 12:
+        return date(d.year, 12, 31)
+    return date(d.year, d.month + 1, 1) - timedelta(days=1)
+
+def last_sunday_before_or_on(d: date) -> date:
+    offset = (d.weekday() - 6) % 7  # Monday=0..Sunday=6
+    return d - timedelta(days=offset)
+
+def month_bounds(d: date) -> Tuple[date, date]:
+    return date(d.year, d.month, 1), month_last_day(d)
+
+def week_bounds(d: date) -> Tuple[date, date]:
+    """Periode WEEK yang memuat `d` (Senin–Minggu, dipotong batas bulan)."""
+    monday = d - timedelta(days=d.weekday())
+    first, last = month_bounds(d)
+    return max(monday, first), min(monday + timedelta(days=6), last)
+
+def period_name(period_type: str, start: date, end: date) -> str:
+    if period_type == MONTH:
+        return f"MONTH_{start.strftime('%Y%m')}"
+    return f"WEEK_{start.isoformat()}_{end.isoformat()}"
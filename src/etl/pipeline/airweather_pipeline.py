@@ -1,93 +1,317 @@
-import os, shutil, datetime, re
+import os, shutil, datetime, re, time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import pandas as pd
 from sqlalchemy.engine import Engine # type: ignore
+from sqlalchemy.exc import SQLAlchemyError # type: ignore
 
-from ..config import Paths, REQUIRED_WEATHER_COLS, REQUIRED_ISPU_COLS
-from ..logging_util import get_logger
-from ..validators import ensure_files_exist, infer_city_from_filename, validate_csv_columns
-from ..extract import extract_weather, extract_ispu, merge_outer_by_date
-from ..transform import clean_and_rename
+from ..config import Paths, REQUIRED_WEATHER_COLS, REQUIRED_ISPU_COLS, SQL_STATS_ENABLED, INCREMENTAL_READS
+from ..logging_util import get_logger, log_context, set_log_context
+from ..archive import new_batch_id, record_archive
+from ..claims import FileClaimer, Heartbeat
+from ..ledger import DUPLICATE, FAILED, LOADED, FileLedger, HashedFile, LedgerEntry, hash_file
+from ..metrics import RunMetrics
+from ..quality import apply_rules, write_quarantine
+from ..sql_stats import track_sql
+from ..validators import ValidationError, ensure_files_exist, infer_city_from_filename, validate_csv_columns
+from ..extract import SourceState, commit_state, date_range, extract_weather, extract_ispu, merge_outer_by_date, read_incremental
+from ..factories.transform_factory import TransformEngineFactory
+from ..strategies.transform_engine import TransformEngine
 from ..db import get_engine
-from ..load import _get_city_id, _get_station_map_for_city, load_all_in_one_transaction
+from ..load import LoadReport, _get_city_id, _get_station_map_for_city, load_all_in_one_transaction
 
 logger = get_logger(__name__)
 
+DUPLICATES_DIR = "duplicates"     # ARCHIVED/duplicates/: kiriman ulang dengan isi identik
+
+@dataclass
+class PreparedBatch:
+    weather_path: str
+    ispu_path: str
+    city: str
+    city_id: int
+    weather: pd.DataFrame
+    ispu: pd.DataFrame
+    clean: pd.DataFrame      # sudah bertipe, dengan location_id; lolos aturan kualitas
+    rejected: pd.DataFrame   # baris yang dikarantina + reason_codes
+    pending_state: List[SourceState] = field(default_factory=list)   # commit setelah load sukses
+    batch_id: str = ""                 # unik per run: nama arsip raw, file karantina, katalog
+    # kind (raw_weather/raw_ispu) -> (date_min, date_max) seluruh file mentah, bukan hanya tail
+    raw_dates: Dict[str, Tuple[str | None, str | None]] = field(default_factory=dict)
+    quarantine_path: str | None = None
+
+def _extract_station_code(val: str) -> str:
+    s = str(val).strip().upper() 
+    s = re.split(r"\s*\(", s, maxsplit=1)[0].strip() #jika ada tanda kurung, potong sebelum "("
+    m = re.match(r"^(DKI\d+)", s) #ambil pola DKI + angka di awal string
+    return m.group(1) if m else s
+
 class AirWeatherPipeline:
-    def __init__(self, engine: Engine | None = None):
+    def __init__(self, engine: Engine | None = None, incremental: bool | None = None,
+                 transform_engine: TransformEngine | str | None = None):
         self.engine = engine or get_engine()
+        # pandas (default) atau polars; lihat etl.strategies.transform_engine
+        self.transform_engine = (transform_engine if isinstance(transform_engine, TransformEngine)
+                                 else TransformEngineFactory.create(transform_engine))
+        # Baca tail saja untuk sumber yang di-append (etl.extract.read_incremental)
+        self.incremental = INCREMENTAL_READS if incremental is None else incremental
+        self.last_metrics: RunMetrics | None = None
 
     def run(self, weather_csv: str, ispu_csv: str):
-        # 1) Validate presence
-        w_path, i_path = ensure_files_exist(Paths.INCOMING, weather_csv, ispu_csv)
+        metrics = RunMetrics("airweather")
+        self.last_metrics = metrics
+        with (track_sql(self.engine) if SQL_STATS_ENABLED else nullcontext()) as sql_stats:
+            try:
+                with log_context():
+                    self._run(metrics, weather_csv, ispu_csv)
+            except Exception:
+                metrics.finish("failed")
+                raise
+            finally:
+                if sql_stats is not None:
+                    metrics.info["sql_statements"] = sql_stats.total
+                    sql_stats.log_summary()
+                metrics.emit_safely()
+
+    def run_claimed(self, weather_csv: str, ispu_csv: str, claimer: FileClaimer | None = None) -> bool:
+        """
+        Versi run() yang aman untuk beberapa worker pada satu INCOMING: pasangan file diklaim
+        (rename atomik ke INCOMING/.processing/<worker>/) sebelum diproses, lease di-heartbeat
+        selama run, dan lease kedaluwarsa milik worker yang crash dikembalikan dulu ke INCOMING.
+        Return False bila pasangan sudah diklaim worker lain / tidak ada. Saat gagal, file
+        dipindah ke FAILED/ lalu exception diteruskan.
+        """
+        claimer = claimer or FileClaimer()
+        claimer.reclaim_stale()
+        claim = claimer.claim(weather_csv, ispu_csv)
+        if claim is None:
+            logger.info("No claimable %s/%s in %s", weather_csv, ispu_csv, claimer.incoming)
+            return False
+        try:
+            with Heartbeat(claimer, claim):
+                try:
+                    self.run(claim.weather_path, claim.ispu_path)
+                except Exception:
+                    self.move_failed(claim.weather_path, claim.ispu_path)
+                    raise
+        finally:
+            claimer.release(claim)
+        return True
+
+    def _run(self, metrics: RunMetrics, weather_csv: str, ispu_csv: str):
+        t0 = time.perf_counter()
+        # 0) Ledger: hash streaming kedua file; pasangan yang isinya sudah pernah dimuat
+        # langsung diarsip sebagai duplikat tanpa parsing
+        with metrics.stage("dedupe"):
+            w_path, i_path = ensure_files_exist(Paths.INCOMING, weather_csv, ispu_csv)
+            hashed = [hash_file("raw_weather", w_path), hash_file("raw_ispu", i_path)]
+            duplicate = self._ledger_has_loaded(hashed)
+        if duplicate:
+            self._archive_duplicates(hashed, metrics, time.perf_counter() - t0)
+            return
+        try:
+            self._process(metrics, weather_csv, ispu_csv, hashed, t0)
+        except Exception:
+            # run gagal tetap tercatat (durasi ikut dipakai untuk perencanaan kapasitas)
+            city = metrics.labels.get("city")
+            self._record_ledger([LedgerEntry(h.sha256, os.path.basename(h.path), h.kind, FAILED, h.size_bytes,
+                                             city=city, duration_s=round(time.perf_counter() - t0, 3))
+                                 for h in hashed])
+            raise
+
+    def _process(self, metrics: RunMetrics, weather_csv: str, ispu_csv: str, hashed: List[HashedFile], t0: float):
+        # 1-7) Validate, extract, merge, transform, station mapping
+        batch = self.prepare(weather_csv, ispu_csv, metrics)
+        city_token, df_clean = batch.city, batch.clean
+
+        # 8) Load
+        self.load(df_clean, metrics)
+
+        # 9) Post-processing (archive/move)
+        with metrics.stage("archive", rows_in=len(df_clean)):
+            batch_id = batch.batch_id
+            archived = [
+                ("raw_weather", self._archive_file(batch.weather_path, f"cuaca_harian_{city_token}_{batch_id}.csv"), len(batch.weather)),
+                ("raw_ispu", self._archive_file(batch.ispu_path, f"ispu_harian_{city_token}_{batch_id}.csv"), len(batch.ispu)),
+            ]
+            # Data sudah ter-commit di DB: kegagalan katalog/Parquet tidak boleh membatalkan run
+            try:
+                record_archive(city_token, archived, df_clean, batch_id=batch_id, raw_dates=batch.raw_dates)
+            except Exception:
+                logger.exception("Archive catalog/Parquet write failed for batch %s", batch_id)
+        for state in batch.pending_state:
+            commit_state(state)
+        rows_in = {"raw_weather": len(batch.weather), "raw_ispu": len(batch.ispu)}
+        self._record_ledger([LedgerEntry(h.sha256, os.path.basename(h.path), h.kind, LOADED, h.size_bytes,
+                                         city=city_token.lower(), rows_in=rows_in[h.kind], rows_loaded=len(df_clean),
+                                         duration_s=round(time.perf_counter() - t0, 3)) for h in hashed])
+        logger.info("ETL completed successfully.")
+
+    def _ledger_has_loaded(self, hashed: List[HashedFile]) -> bool:
+        # Pasangan dilewati hanya bila KEDUA file sudah dimuat (satu file baru tetap butuh merge)
+        try:
+            ledger = FileLedger(self.engine)
+            return all(ledger.is_loaded(h.sha256) for h in hashed)
+        except SQLAlchemyError:
+            logger.warning("etl_file_ledger unavailable (run scripts/db_migrate.py upgrade); duplicate check skipped")
+            return False
+
+    def _record_ledger(self, entries: List[LedgerEntry]):
+        # Data sudah ter-commit (atau run sudah gagal): kegagalan ledger hanya dicatat,
+        # tidak boleh menggantikan exception run
+        try:
+            FileLedger(self.engine).record(entries)
+        except Exception:
+            logger.exception("Failed to record %s files in etl_file_ledger", len(entries))
 
-        # 2) Validate columns and separator
-        validate_csv_columns(w_path, REQUIRED_WEATHER_COLS, sep=",")
-        validate_csv_columns(i_path, REQUIRED_ISPU_COLS, sep=",")
+    def _archive_duplicates(self, hashed: List[HashedFile], metrics: RunMetrics, duration_s: float):
+        metrics.info["duplicate"] = True
+        try:
+            city = infer_city_from_filename(hashed[0].path).lower()
+        except ValidationError:
+            city = None
+        with metrics.stage("archive"):
+            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            os.makedirs(os.path.join(Paths.ARCHIVED, DUPLICATES_DIR), exist_ok=True)
+            for h in hashed:
+                stem = os.path.splitext(os.path.basename(h.path))[0]
+                self._archive_file(h.path, os.path.join(DUPLICATES_DIR, f"{stem}_{ts}.csv"))
+        self._record_ledger([LedgerEntry(h.sha256, os.path.basename(h.path), h.kind, DUPLICATE, h.size_bytes,
+                                         city=city, duration_s=round(duration_s, 3)) for h in hashed])
+        logger.info("Skipped duplicate delivery (content already loaded): %s",
+                    ", ".join(os.path.basename(h.path) for h in hashed))
 
-        # 3) Infer city from either filename (require same city token)
-        city_w = infer_city_from_filename(w_path)
-        city_i = infer_city_from_filename(i_path)
-        if city_w.lower() != city_i.lower():
-            raise RuntimeError(f"City tokens not aligned: '{city_w}' vs '{city_i}'")
-        city_token = city_w
+    def prepare(self, weather_csv: str, ispu_csv: str, metrics: RunMetrics,
+                city_token: str | None = None, quarantine: bool = True) -> PreparedBatch:
+        """
+        Validate -> extract -> merge -> transform -> station mapping (tanpa menulis ke DB).
+        `weather_csv`/`ispu_csv` boleh nama file di INCOMING atau path absolut (mis. arsip
+        saat replay). `city_token` menggantikan inferensi dari nama file (nama arsip memuat timestamp).
+        Baris yang ditolak aturan kualitas langsung ditulis ke QUARANTINE/ (`quarantine=False`
+        untuk replay: baris arsip itu sudah dikarantina saat run aslinya), jadi tetap tersimpan
+        walaupun load setelahnya gagal.
+        """
+        with metrics.stage("validate"):
+            # 1) Validate presence
+            w_path, i_path = ensure_files_exist(Paths.INCOMING, weather_csv, ispu_csv)
 
-        # 4) Resolve CITY_ID (no global location_id anymore)
-        city_id = _get_city_id(self.engine, city_token)
-        logger.info(f"Resolved CITY_ID={city_id} for city '{city_token}'.")
+            # 2) Validate columns and separator
+            validate_csv_columns(w_path, REQUIRED_WEATHER_COLS, sep=",")
+            validate_csv_columns(i_path, REQUIRED_ISPU_COLS, sep=",")
+
+            # 3) Infer city from either filename (require same city token)
+            if city_token is None:
+                city_w = infer_city_from_filename(w_path)
+                city_i = infer_city_from_filename(i_path)
+                if city_w.lower() != city_i.lower():
+                    raise RuntimeError(f"City tokens not aligned: '{city_w}' vs '{city_i}'")
+                city_token = city_w
+            metrics.labels["city"] = city_token.lower()
+            set_log_context(city=city_token.lower())
+
+            # 4) Resolve CITY_ID (no global location_id anymore)
+            city_id = _get_city_id(self.engine, city_token)
+            logger.info(f"Resolved CITY_ID={city_id} for city '{city_token}'.")
 
         # 5) Extract
-        dfw = extract_weather(w_path)
-        dfi = extract_ispu(i_path)
+        cutoff, pending = None, []
+        with metrics.stage("extract") as st:
+            if self.incremental:
+                dfw, dfi, cutoff, pending = self._extract_incremental(w_path, i_path, metrics)
+                # frame bisa hanya tail: cakupan file dari state (tanggal pertama..terakhir)
+                raw_dates = {kind: (p.first_tanggal, p.last_tanggal)
+                             for kind, p in zip(("raw_weather", "raw_ispu"), pending)}
+            else:
+                dfw = extract_weather(w_path)
+                dfi = extract_ispu(i_path)
+                raw_dates = {"raw_weather": date_range(dfw, "TANGGAL"), "raw_ispu": date_range(dfi, "tanggal")}
+            st.rows_out = len(dfw) + len(dfi)
 
         # 6) Merge
-        df_airweather = merge_outer_by_date(dfw, dfi)
+        with metrics.stage("merge", rows_in=len(dfw) + len(dfi)) as st:
+            df_airweather = merge_outer_by_date(dfw, dfi)
+            st.rows_out = len(df_airweather)
         logger.info(f"Merged dataframe shape: {df_airweather.shape}")
 
         # 7) Transform
-        df_clean, bad_rows = clean_and_rename(df_airweather)
+        with metrics.stage("transform", rows_in=len(df_airweather)) as st:
+            metrics.info["transform_engine"] = self.transform_engine.name
+            df_clean, bad_rows = self.transform_engine.clean_and_rename(df_airweather)
+            st.rows_out = len(df_clean)
         if len(bad_rows):
             logger.warning(f"Dropped {len(bad_rows)} rows with invalid dates.")
+        if cutoff is not None:
+            # baris seed (hari terakhir run sebelumnya) hanya untuk ffill/bfill, sudah dimuat
+            df_clean = df_clean[df_clean["tanggal"] > cutoff].copy()
         logger.info(f"Clean dataframe shape: {df_clean.shape}")
 
         # 7.5)Ambil hanya kode stasiun di depan: "DKI1 (Bunderan HI)" -> "DKI1"
-        def _extract_station_code(val: str) -> str:
-            s = str(val).strip().upper() 
-            s = re.split(r"\s*\(", s, maxsplit=1)[0].strip() #jika ada tanda kurung, potong sebelum "("
-            m = re.match(r"^(DKI\d+)", s) #ambil pola DKI + angka di awal string
-            return m.group(1) if m else s
-
-        df_clean["station_code"] = df_clean["stasiun"].apply(_extract_station_code)
-
-        # Map station_code -> location_id (from DB, keys must be UPPERCASE)
-        station_map = _get_station_map_for_city(self.engine, city_id)  # dict seperti {"DKI1":1,...}
-        df_clean["location_id"] = df_clean["station_code"].map(station_map)
-
-        if df_clean["location_id"].isna().any():
-            unknowns = (
-                df_clean.loc[df_clean["location_id"].isna(), "stasiun"]
-                .astype(str).str.strip().unique().tolist()
-            )
-            raise RuntimeError(
-                f"Stasiun berikut belum terdaftar di tabel location: {unknowns}. "
-                "Tambahkan barisnya ke tabel location (station_code + city_id), atau perbaiki penamaan di CSV, lalu jalankan ulang."
-            )
-        
+        with metrics.stage("station_mapping", rows_in=len(df_clean)) as st:
+            df_clean["station_code"] = df_clean["stasiun"].apply(_extract_station_code)
+
+            # Map station_code -> location_id (from DB, keys must be UPPERCASE)
+            station_map = _get_station_map_for_city(self.engine, city_id)  # dict seperti {"DKI1":1,...}
+            df_clean["location_id"] = df_clean["station_code"].map(station_map)
+
+            st.rows_out = len(df_clean)
+
+        # 7.6) Aturan kualitas: baris yang melanggar (termasuk stasiun tak terdaftar) dikarantina,
+        # sisanya tetap dimuat
+        with metrics.stage("quality", rows_in=len(df_clean)) as st:
+            df_clean, rejected, quality = apply_rules(df_clean)
+            st.rows_out = len(df_clean)
+        metrics.info["quality_violations"] = quality.violations
+        metrics.info["rows_quarantined"] = quality.rows_rejected
+        quality.log()
+        if quality.violations.get("unknown_station"):
+            unknowns = rejected.loc[rejected["location_id"].isna(), "stasiun"].astype(str).str.strip().unique().tolist()
+            logger.warning(
+                "Stasiun berikut belum terdaftar di tabel location: %s. Tambahkan barisnya ke tabel "
+                "location (station_code + city_id) lalu muat ulang dari QUARANTINE/.", unknowns)
+
+        # unik per run (bukan timestamp detik): worker paralel / kota lain pada detik yang sama
+        batch_id = new_batch_id()
+        quarantine_path = write_quarantine(rejected, city_token, batch_id) if quarantine else None
+
         logger.info("Distribusi baris per location_id: %s", df_clean["location_id"].value_counts().to_dict())
 
-        # 8) Load
-        load_all_in_one_transaction(self.engine, df_clean)
+        return PreparedBatch(w_path, i_path, city_token, city_id, dfw, dfi, df_clean, rejected, pending,
+                             batch_id=batch_id, quarantine_path=quarantine_path, raw_dates=raw_dates)
 
-        # 9) Post-processing (archive/move)
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self._archive_file(w_path, f"cuaca_harian_{city_token}_{ts}.csv")
-        self._archive_file(i_path, f"ispu_harian_{city_token}_{ts}.csv")
-        logger.info("ETL completed successfully.")
+    def _extract_incremental(self, w_path: str, i_path: str, metrics: RunMetrics):
+        rw = read_incremental(w_path, "TANGGAL")
+        ri = read_incremental(i_path, "tanggal")
+        if rw.mode != ri.mode or rw.cutoff != ri.cutoff:
+            # kedua sumber harus dilanjutkan dari hari yang sama; bila tidak, baca penuh keduanya
+            logger.info("Incremental state of %s and %s disagree; reading both in full",
+                        os.path.basename(w_path), os.path.basename(i_path))
+            rw = read_incremental(w_path, "TANGGAL", full=True)
+            ri = read_incremental(i_path, "tanggal", full=True)
+        metrics.info["read_mode"] = rw.mode
+        return rw.frame, ri.frame, rw.cutoff, [rw.pending, ri.pending]
+
+    def load(self, df_clean: pd.DataFrame, metrics: RunMetrics, chunk_rows: int | None = None) -> LoadReport:
+        """Tulis ke DB. Default satu transaksi; `chunk_rows` => commit per potongan baris (replay)."""
+        with metrics.stage("load", rows_in=len(df_clean)) as st:
+            if not chunk_rows:
+                report = load_all_in_one_transaction(self.engine, df_clean)
+            else:
+                report = LoadReport()
+                for i in range(0, len(df_clean), chunk_rows):
+                    report += load_all_in_one_transaction(self.engine, df_clean.iloc[i:i + chunk_rows])
+            st.rows_out = len(df_clean)
+        metrics.info["load"] = report.as_dict()
+        logger.info("Load changes (inserted/updated/unchanged): %s", report.as_dict())
+        return report
 
-    def _archive_file(self, src: str, newname: str):
+    def _archive_file(self, src: str, newname: str) -> str:
         dst = os.path.join(Paths.ARCHIVED, newname)
         shutil.move(src, dst)
+        return dst
 
     def move_failed(self, weather_csv: str, ispu_csv: str):
-        # Used by scripts/run_etl.py in exception handling
+        # Used by run_claimed (and scripts) in exception handling; nama relatif INCOMING atau path absolut
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         w = os.path.join(Paths.INCOMING, weather_csv)
         i = os.path.join(Paths.INCOMING, ispu_csv)
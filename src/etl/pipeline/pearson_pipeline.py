@@ -1,12 +1,22 @@
+import os
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
 from etl.logging_util import get_logger
-from etl.db import get_session
+from etl.db import get_engine, get_read_engine, get_read_session, get_session, stream_rows
+from itertools import groupby
 from datetime import date, timedelta
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 import pandas as pd 
 import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from scipy.stats import pearsonr, spearmanr
+from etl.config import SQL_STATS_ENABLED
+from etl.metrics import RunMetrics
+from etl.query import CORRELATION_TABLE, invalidate
+from etl.periods import MONTH, WEEK, last_sunday_before_or_on, month_bounds, month_last_day, period_name, week_bounds
+from etl.sql_stats import track_sql
+from etl.resampling import ResamplingConfig, resample_correlations
 
 logger = get_logger(__name__)
 
@@ -14,24 +24,288 @@ logger = get_logger(__name__)
 DEFAULT_CITY_ID = 1          # Jakarta
 CITY_AGG_LOC_ID = 6          # location_id = 'CITY_AGG_JKT' (CITY_AGG_JAKARTA)
 
-def month_last_day(d: date) -> date:
-    if d.month == 12:
-        return date(d.year, 12, 31)
-    return date(d.year, d.month + 1, 1) - timedelta(days=1)
+# --- Hot analytical queries (juga dipakai etl.query_plans untuk cek EXPLAIN) ---
+
+# City-level: 1 baris per (corrmet_id, tanggal), rata-rata harian semua stasiun kota (lihat fetch_pairs)
+FETCH_PAIRS_SQL = """
+SELECT
+cm.corrmet_id,
+d.dt AS obs_date,
+AVG(CASE WHEN lw.city_id = :city_id THEN wo.weatherobs_value END) AS wx_val,
+AVG(CASE WHEN lp.city_id = :city_id THEN po.pollobs_value    END) AS py_val
+FROM correlation_metrics cm
+
+-- Deret tanggal: gabungan tanggal yang ada di salah satu sisi (cuaca/polutan)
+JOIN (
+SELECT weatherobs_date AS dt
+FROM weather_observation
+WHERE weatherobs_date BETWEEN :start AND :end
+UNION
+SELECT pollobs_date AS dt
+FROM pollutant_observation
+WHERE pollobs_date BETWEEN :start AND :end
+) d
+
+-- Sisi cuaca: LEFT JOIN agar hari tetap muncul jika tidak ada data cuaca
+-- (BETWEEN konstan di ON => partition pruning bisa dipakai; hasil tidak berubah)
+LEFT JOIN weather_observation wo
+    ON wo.weatherattr_id   = cm.weather_x
+    AND wo.weatherobs_date  = d.dt
+    AND wo.weatherobs_date BETWEEN :start AND :end
+LEFT JOIN location lw
+    ON lw.location_id      = wo.location_id
+
+-- Sisi polutan: LEFT JOIN agar hari tetap muncul jika tidak ada data polutan
+LEFT JOIN pollutant_observation po
+    ON po.pollutantattr_id = cm.pollutant_y
+    AND po.pollobs_date     = d.dt
+    AND po.pollobs_date BETWEEN :start AND :end
+LEFT JOIN location lp
+    ON lp.location_id      = po.location_id
+
+WHERE cm.is_active = 1
+GROUP BY cm.corrmet_id, d.dt
+ORDER BY cm.corrmet_id, d.dt
+"""
+
+# Station-level: pasangan harian per stasiun, terurut per location_id (lihat fetch_pairs_by_station)
+FETCH_PAIRS_BY_STATION_SQL = """
+SELECT cm.corrmet_id, wo.location_id,
+        wo.weatherobs_date AS obs_date, wo.weatherobs_value AS wx_val, po.pollobs_value AS py_val
+FROM correlation_metrics cm
+JOIN weather_observation wo ON wo.weatherattr_id = cm.weather_x
+JOIN location l ON l.location_id = wo.location_id
+JOIN pollutant_observation po
+        ON po.pollutantattr_id = cm.pollutant_y
+    AND po.pollobs_date = wo.weatherobs_date
+    AND po.location_id = wo.location_id
+WHERE cm.is_active = 1
+    AND l.city_id = :city_id
+    AND wo.weatherobs_date BETWEEN :start AND :end
+    AND po.pollobs_date BETWEEN :start AND :end
+ORDER BY wo.location_id, cm.corrmet_id, wo.weatherobs_date
+"""
+
+# Tambahkan helper kecil di atas/sekitar fungsi classify
+def min_n_for_period(period_name: str) -> int:
+    # Weekly window biasanya 5–7 observasi efektif
+    if period_name.upper().startswith("WEEK"):
+        return 5
+    return 12
+
+def classify_correlation(pearson_r: float, spearman_rho: float, n_obs: int, period_name: str | None = None, p_p: float | None = None,p_s: float | None = None, alpha: float | None = None,
+                         ci_p: Tuple[float, float] | None = None, ci_s: Tuple[float, float] | None = None) -> str:
+
+    """
+    Dipakai bersama oleh PearsonPipeline.classify (level kota) dan worker per stasiun.
+    Versi baru tetap kompatibel:
+    - Jika period_name=None dan p_p/p_s=None => fallback ke logika lama.
+    - Jika period_name ada => pakai ambang n dinamis.
+    - Jika p_p & p_s ada => pakai signifikansi.
+    - Jika ci_p & ci_s (CI bootstrap) ada => keduanya memuat 0 dianggap INCONCLUSIVE.
+    """
+
+    # 0) Tentukan alpha efektif
+    if alpha is None:
+        per = (period_name or "").upper()
+        if per.startswith("WEEK"):
+            eff_alpha = 0.20
+        else:
+            eff_alpha = 0.10
+    else:
+        eff_alpha = alpha
+
+    # 1) Ambang jumlah sampel
+    if period_name is None:
+        # fallback lama: weekly pun bakal sering INCONCLUSIVE
+        if n_obs < 12:
+            return "INCONCLUSIVE"
+    else:
+        if n_obs < min_n_for_period(period_name):
+            return "INCONCLUSIVE"
 
-def last_sunday_before_or_on(d: date) -> date:
-    offset = (d.weekday() - 6) % 7  # Monday=0..Sunday=6
-    return d - timedelta(days=offset)
+    # 2) Tanda berlawanan => tidak reliabel
+    if np.sign(pearson_r) != np.sign(spearman_rho):
+        return "UNRELIABLE"
+
+    # 3) Jika p-value tersedia: keduanya tak signifikan => INCONCLUSIVE
+    if (p_p is not None and p_s is not None) and (p_p >= eff_alpha and p_s >= eff_alpha):
+        return "INCONCLUSIVE"
+
+    # 3b) Jika CI tersedia: kedua interval memuat 0 => arah korelasi tidak pasti
+    if ci_p is not None and ci_s is not None:
+        def _spans_zero(ci: Tuple[float, float]) -> bool:
+            lo, hi = ci
+            return bool(np.isnan(lo) or np.isnan(hi) or (lo <= 0.0 <= hi))
+        if _spans_zero(ci_p) and _spans_zero(ci_s):
+            return "INCONCLUSIVE"
+
+    # 4) Kekuatan dan kedekatan nilai
+    delta = abs(pearson_r - spearman_rho)
+    min_abs = min(abs(pearson_r), abs(spearman_rho))
+
+    if delta < 0.20 and min_abs >= 0.30:
+        return "STABLE"
+    if delta < 0.40:
+        return "CONSISTENT_WEAKER"
+    return "NONLINEAR_OR_OUTLIERS"
+
+def compute_classifications(df: pd.DataFrame, period_name: str,
+                            resampling: ResamplingConfig | None = None,
+                            rng: np.random.Generator | None = None,
+                            alpha: float | None = None) -> List[Tuple[int, str, int]]:
+    """
+    Hitung klasifikasi per corrmet_id dari DF berkolom (corrmet_id, wx_val, py_val).
+    Return list (corrmet_id, classification, n_samples). Fungsi level-modul supaya
+    bisa dijalankan di worker process (mode per stasiun). `alpha` None = default per periode.
+    """
+    # 2c) Siapkan deret bersih per corrmet_id
+    series = {}
+    for corrmet_id, g in df.groupby("corrmet_id"):
+        wx = g["wx_val"].astype(float).values
+        py = g["py_val"].astype(float).values
+
+        # 1. Bersihkan data dari NaN / inf
+        mask = np.isfinite(wx) & np.isfinite(py)
+        wx, py = wx[mask], py[mask]
+
+        # 2. Cek minimal panjang
+        if len(wx) < 2 or len(py) < 2:
+            continue
+        series[corrmet_id] = (wx, py)
+
+    # 2d) Mode resampling: semua metrik dihitung sekaligus dalam satu batch vektor
+    resampled = {}
+    if resampling is not None:
+        varied = {k: v for k, v in series.items() if np.nanstd(v[0]) != 0 and np.nanstd(v[1]) != 0}
+        resampled = resample_correlations(varied, resampling, rng=rng)
+
+    results = []
+    for corrmet_id, (wx, py) in series.items():
+        # 3. Kalau varians nol → semua nilai sama → korelasi meaningless
+        if np.nanstd(wx) == 0 or np.nanstd(py) == 0:
+            classification = "INCONCLUSIVE"
+        elif corrmet_id in resampled:
+            # p-value empiris + CI bootstrap menggantikan p-value parametrik
+            res = resampled[corrmet_id]
+            classification = classify_correlation(
+                pearson_r=res.pearson_r,
+                spearman_rho=res.spearman_rho,
+                n_obs=len(wx),
+                period_name=period_name,
+                p_p=res.p_p,
+                p_s=res.p_s,
+                alpha=alpha,
+                ci_p=res.ci_p,
+                ci_s=res.ci_s,
+            )
+        else:
+            try:
+                pearson_r, p_p = pearsonr(wx, py)
+                spearman_rho, p_s = spearmanr(wx, py)
+            except Exception as e:
+                logger.error("Correlation error for corrmet_id=%s: %s", corrmet_id, e)
+                continue
+
+            # 4. Panggil classify baru dengan parameter tambahan
+            classification = classify_correlation(
+                pearson_r=pearson_r,
+                spearman_rho=spearman_rho,
+                n_obs=len(wx),
+                period_name=period_name,  # auto: WEEK* => 0.20, selain itu => 0.10
+                p_p=p_p,                  # p-value Pearson
+                p_s=p_s,                  # p-value Spearman
+                alpha=alpha,              # None => default threshold signifikansi
+            )
+        results.append((int(corrmet_id), classification, int(len(wx))))
+    return results
+
+def _station_rng(resampling: ResamplingConfig | None, location_id: int) -> np.random.Generator | None:
+    # RNG per stasiun diturunkan dari seed global => hasil tidak tergantung urutan worker
+    if resampling is None or resampling.seed is None:
+        return None
+    return np.random.default_rng([resampling.seed, int(location_id)])
+
+def _compute_station(args) -> Tuple[int, List[Tuple[int, str, int]]]:
+    """Entry point worker process: (location_id, df, period_name, resampling)."""
+    location_id, df, period_name, resampling = args
+    return location_id, compute_classifications(df, period_name, resampling, _station_rng(resampling, location_id))
+
+def _map_bounded(pool: Executor, fn, tasks: Iterable, max_in_flight: int) -> list:
+    """Seperti pool.map, tetapi `tasks` dikonsumsi malas: paling banyak `max_in_flight` task
+    (DataFrame per stasiun) ditampung sekaligus. Hasil dikembalikan sesuai urutan task."""
+    results, pending = {}, {}
+    for i, task in enumerate(tasks):
+        if len(pending) >= max_in_flight:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[pending.pop(fut)] = fut.result()
+        pending[pool.submit(fn, task)] = i
+    for fut in pending:
+        results[pending[fut]] = fut.result()
+    return [results[i] for i in range(len(results))]
 
 class PearsonPipeline:
-    def __init__(self, db_session: Session | None = None):
-        self.db = db_session or get_session()
+    def __init__(self, db_session: Session | None = None, resampling: ResamplingConfig | None = None,
+                 granularity: str = "city", max_workers: int | None = None, source=None):
+        if granularity not in ("city", "station"):
+            raise ValueError(f"Unknown granularity '{granularity}', expected 'city' or 'station'")
+        if source is not None and granularity != "city":
+            raise ValueError("An alternate pair source only supports granularity 'city'")
+        # Session dibuat saat pertama dipakai (lihat property `db`)
+        self._db = db_session
+        self._db_injected = db_session is not None
+        # Session read-only (replica bila dikonfigurasi) untuk fetch_pairs*
+        self._read_db: Session | None = None
+        # Opsional: p-value permutasi + CI bootstrap (berguna untuk window mingguan 5–7 titik)
+        self.resampling = resampling
+        # "city" => rata-rata kota (CITY_AGG_LOC_ID); "station" => per location_id, paralel di process pool
+        self.granularity = granularity
+        self.max_workers = max_workers
+        # Opsional: sumber pasangan lain dengan method fetch_pairs(start, end, city_id), mis.
+        # etl.duckdb_source.DuckDBPairSource (arsip offline); None => warehouse (read_db)
+        self.source = source
+        self.last_metrics: RunMetrics | None = None
+
+    @property
+    def db(self) -> Session:
+        if self._db is None:
+            self._db = get_session()
+        return self._db
+
+    @db.setter
+    def db(self, value):
+        self._db = value
+        self._db_injected = True
+
+    @property
+    def read_db(self) -> Session:
+        """
+        Session untuk query analitik. Diarahkan ke read replica (DATABASE_READ_URL) bila ada dan
+        tidak tertinggal; kalau tidak (atau session di-inject pemanggil) sama dengan `db`.
+
+        Rute di-resolve ulang lewat get_read_engine() (cek lag, di-cache per
+        REPLICA_LAG_CHECK_INTERVAL_S) setiap kali diakses, yaitu per panggilan fetch_pairs*:
+        replica yang tertinggal di tengah run panjang langsung ditinggalkan ke primary.
+        """
+        if self._db_injected:
+            return self.db
+        engine = get_read_engine()
+        if engine is get_engine():
+            return self.db
+        if self._read_db is not None and self._read_db.get_bind() is not engine:
+            self._read_db.close()
+            self._read_db = None
+        if self._read_db is None:
+            self._read_db = get_read_session()
+        return self._read_db
 
     def get_date_range_weekly(self, today: date) -> Tuple[date, date]:
-        start = today - timedelta(days=6)
-        if start.month != today.month:
-            start = date(today.year, today.month, 1)
-        return (start, today)
+        # Hari Minggu (jadwal): periode WEEK yang sama dengan etl.aggregates
+        if today.weekday() == 6:
+            return week_bounds(today)
+        # Tanggal lain (run manual): 7 hari terakhir s/d `today`, dipotong awal bulan
+        return (max(today - timedelta(days=6), month_bounds(today)[0]), today)
 
     def get_date_range_monthly(self, today: date) -> Tuple[date, date]:
         start = date(today.year, today.month, 1)
@@ -64,207 +338,160 @@ class PearsonPipeline:
         - Dengan granularitas harian yang konsisten, weekly biasanya ~7 titik dan monthly ~28–31,
         sehingga risiko INCONCLUSIVE karena n terlalu kecil jauh berkurang.
         """
-        sql = text(
-            """
-            SELECT
-            cm.corrmet_id,
-            d.dt AS obs_date,
-            AVG(CASE WHEN lw.city_id = :city_id THEN wo.weatherobs_value END) AS wx_val,
-            AVG(CASE WHEN lp.city_id = :city_id THEN po.pollobs_value    END) AS py_val
-            FROM correlation_metrics cm
-
-            -- Deret tanggal: gabungan tanggal yang ada di salah satu sisi (cuaca/polutan)
-            JOIN (
-            SELECT weatherobs_date AS dt
-            FROM weather_observation
-            WHERE weatherobs_date BETWEEN :start AND :end
-            UNION
-            SELECT pollobs_date AS dt
-            FROM pollutant_observation
-            WHERE pollobs_date BETWEEN :start AND :end
-            ) d
-
-            -- Sisi cuaca: LEFT JOIN agar hari tetap muncul jika tidak ada data cuaca
-            LEFT JOIN weather_observation wo
-                ON wo.weatherattr_id   = cm.weather_x
-                AND wo.weatherobs_date  = d.dt
-            LEFT JOIN location lw
-                ON lw.location_id      = wo.location_id
-
-            -- Sisi polutan: LEFT JOIN agar hari tetap muncul jika tidak ada data polutan
-            LEFT JOIN pollutant_observation po
-                ON po.pollutantattr_id = cm.pollutant_y
-                AND po.pollobs_date     = d.dt
-            LEFT JOIN location lp
-                ON lp.location_id      = po.location_id
-
-            WHERE cm.is_active = 1
-            GROUP BY cm.corrmet_id, d.dt
-            ORDER BY cm.corrmet_id, d.dt
-            """
-        )
-        rows = self.db.execute(
+        if self.source is not None:
+            return self.source.fetch_pairs(start, end, city_id=city_id)
+        sql = text(FETCH_PAIRS_SQL)
+        rows = self.read_db.execute(
             sql, {"start": start, "end": end, "city_id": city_id}
         ).fetchall()
         return rows
 
-    # Versi lama, sebelum pakai city-level aggregatio
-    # def fetch_pairs(self, start: date, end: date) -> List[Tuple]:
-    #     sql = text(
-    #         """
-    #         SELECT cm.corrmet_id, wo.location_id,
-    #                 wo.weatherobs_date, wo.weatherobs_value, po.pollobs_value
-    #         FROM correlation_metrics cm
-    #         JOIN weather_observation wo ON wo.weatherattr_id = cm.weather_x
-    #         JOIN pollutant_observation po 
-    #                 ON po.pollutantattr_id = cm.pollutant_y
-    #             AND po.pollobs_date = wo.weatherobs_date
-    #             AND po.location_id = wo.location_id
-    #         WHERE cm.is_active = 1
-    #             AND wo.weatherobs_date BETWEEN :start AND :end
-    #         ORDER BY cm.corrmet_id, wo.location_id, wo.weatherobs_date
-    #         """
-    #     )
-    #     rows = self.db.execute(sql, {"start": start, "end": end}).fetchall()
-    #     return rows
-
-    # Tambahkan helper kecil di atas/sekitar fungsi classify
-    @staticmethod
-    def _min_n_for_period(period_name: str) -> int:
-        # Weekly window biasanya 5–7 observasi efektif
-        if period_name.upper().startswith("WEEK"):
-            return 5
-        return 12
-
-    def classify(self, pearson_r: float, spearman_rho: float, n_obs: int, period_name: str | None = None, p_p: float | None = None,p_s: float | None = None, alpha: float | None = None) -> str:
-
+    def fetch_pairs_by_station(self, start: date, end: date, city_id: int = DEFAULT_CITY_ID) -> Iterable[Tuple]:
         """
-        Versi baru tetap kompatibel:
-        - Jika period_name=None dan p_p/p_s=None => fallback ke logika lama.
-        - Jika period_name ada => pakai ambang n dinamis.
-        - Jika p_p & p_s ada => pakai signifikansi.
+        Pasangan WX/PY harian per stasiun untuk SEMUA stasiun satu kota dalam satu query
+        (pengganti fetch_pairs versi lama yang per stasiun). Hasil di-stream (server-side
+        cursor) berurutan per location_id, lalu dipartisi oleh `_process_range_by_station`.
         """
+        sql = text(FETCH_PAIRS_BY_STATION_SQL)
+        return stream_rows(self.read_db, sql, {"start": start, "end": end, "city_id": city_id})
 
-        # 0) Tentukan alpha efektif
-        if alpha is None:
-            per = (period_name or "").upper()
-            if per.startswith("WEEK"):
-                eff_alpha = 0.20
-            else:
-                eff_alpha = 0.10
-        else:
-            eff_alpha = alpha
-
-        # 1) Ambang jumlah sampel
-        if period_name is None:
-            # fallback lama: weekly pun bakal sering INCONCLUSIVE
-            if n_obs < 12:
-                return "INCONCLUSIVE"
-        else:
-            if n_obs < self._min_n_for_period(period_name):
-                return "INCONCLUSIVE"
+    @staticmethod
+    def _min_n_for_period(period_name: str) -> int:
+        return min_n_for_period(period_name)
 
-        # 2) Tanda berlawanan => tidak reliabel
-        if np.sign(pearson_r) != np.sign(spearman_rho):
-            return "UNRELIABLE"
+    def classify(self, pearson_r: float, spearman_rho: float, n_obs: int, period_name: str | None = None, p_p: float | None = None,p_s: float | None = None, alpha: float | None = None,
+                 ci_p: Tuple[float, float] | None = None, ci_s: Tuple[float, float] | None = None) -> str:
+        return classify_correlation(pearson_r, spearman_rho, n_obs, period_name, p_p, p_s, alpha, ci_p, ci_s)
 
-        # 3) Jika p-value tersedia: keduanya tak signifikan => INCONCLUSIVE
-        if (p_p is not None and p_s is not None) and (p_p >= eff_alpha and p_s >= eff_alpha):
-            return "INCONCLUSIVE"
+    def compute_range(self, start: date, end: date, period_name: str, city_id: int = DEFAULT_CITY_ID,
+                      alpha: float | None = None) -> List[Tuple[int, str, int]]:
+        """Fetch + klasifikasi level kota tanpa menulis ke DB (eksperimen / sumber offline)."""
+        rows = self.fetch_pairs(start, end, city_id=city_id)
+        df = pd.DataFrame(rows, columns=["corrmet_id", "obs_date", "wx_val", "py_val"])
+        return compute_classifications(df, period_name, self.resampling, alpha=alpha)
 
-        # 4) Kekuatan dan kedekatan nilai
-        delta = abs(pearson_r - spearman_rho)
-        min_abs = min(abs(pearson_r), abs(spearman_rho))
-        
-        if delta < 0.20 and min_abs >= 0.30:
-            return "STABLE"
-        if delta < 0.40:
-            return "CONSISTENT_WEAKER"
-        return "NONLINEAR_OR_OUTLIERS"
+    def _write_results(self, results: List[Tuple[int, str, int]], location_id: int, period_name: str, processing_date: date) -> int:
+        # 5. Simpan hasil ke tabel correlation_result
+        insert_sql = text(
+            """
+            INSERT INTO correlation_result
+            (location_id, corrmet_id, period_name, processing_date, val_result, n_samples)
+            SELECT :loc, :corr, :period, :proc, cf.corrflag_id, :n
+            FROM correlation_flag cf WHERE cf.corrflag_desc = :desc
+            """
+        )
+        for corrmet_id, classification, n in results:
+            self.db.execute(
+                insert_sql,
+                {
+                    "loc": location_id,
+                    "corr": corrmet_id,
+                    "period": period_name,
+                    "proc": processing_date,
+                    "n": n,
+                    "desc": classification,
+                },
+            )
+        return len(results)
 
     def _process_range(self, start: date, end: date, period_name: str, processing_date: date):
+        # Satu record metrik per periode; label dibuat berkardinalitas rendah (WEEK/MONTH)
+        metrics = RunMetrics("pearson", granularity=self.granularity, period=period_name.split("_", 1)[0].lower())
+        metrics.info.update(period_name=period_name, start=start.isoformat(), end=end.isoformat())
+        self.last_metrics = metrics
+        # engine=None: session bisa di primary maupun replica, hitung semua engine
+        with (track_sql() if SQL_STATS_ENABLED else nullcontext()) as sql_stats:
+            try:
+                if self.granularity == "station":
+                    return self._process_range_by_station(metrics, start, end, period_name, processing_date)
+                return self._process_range_city(metrics, start, end, period_name, processing_date)
+            except Exception:
+                metrics.finish("failed")
+                raise
+            finally:
+                if sql_stats is not None:
+                    metrics.info["sql_statements"] = sql_stats.total
+                    sql_stats.log_summary()
+                metrics.emit_safely()
+
+    def _process_range_city(self, metrics: RunMetrics, start: date, end: date, period_name: str, processing_date: date):
         logger.info(f"Processing range {start} to {end} as {period_name}")
 
         # 2a) Ambil data AGG kota per hari
-        rows = self.fetch_pairs(start, end, city_id=DEFAULT_CITY_ID)
+        with metrics.stage("fetch") as st:
+            rows = self.fetch_pairs(start, end, city_id=DEFAULT_CITY_ID)
+            st.rows_out = len(rows)
         if not rows:
             logger.warning("No rows found for period %s", period_name)
             return 0
         
         # 2b) DF TANPA location_id; group by corrmet_id saja
-        df = pd.DataFrame(rows, columns=["corrmet_id", "obs_date", "wx_val", "py_val"])
-        inserted = 0
-
-        for corrmet_id, g in df.groupby("corrmet_id"):
-            wx = g["wx_val"].astype(float).values
-            py = g["py_val"].astype(float).values
-
-            # 1. Bersihkan data dari NaN / inf
-            mask = np.isfinite(wx) & np.isfinite(py)
-            wx, py = wx[mask], py[mask]
+        with metrics.stage("compute", rows_in=len(rows)) as st:
+            df = pd.DataFrame(rows, columns=["corrmet_id", "obs_date", "wx_val", "py_val"])
+            results = compute_classifications(df, period_name, self.resampling)
+            st.rows_out = len(results)
+
+        # INSERT: gunakan location_id agregat kota
+        with metrics.stage("write", rows_in=len(results)) as st:
+            inserted = self._write_results(results, CITY_AGG_LOC_ID, period_name, processing_date)
+            self.db.commit()
+            st.rows_out = inserted
+        invalidate((CORRELATION_TABLE,), start, end)
+        logger.info("Inserted %s correlation_result rows for %s", inserted, period_name)
+        return inserted
 
-            # 2. Cek minimal panjang
-            if len(wx) < 2 or len(py) < 2:
-                continue
+    def _process_range_by_station(self, metrics: RunMetrics, start: date, end: date, period_name: str, processing_date: date):
+        logger.info(f"Processing range {start} to {end} as {period_name} (per station)")
+
+        # Rows datang terurut per location_id => tiap stasiun dikirim ke worker begitu
+        # barisnya lengkap; paling banyak 2x workers stasiun yang menunggu/dihitung sekaligus,
+        # jadi hasil query tidak pernah ditampung seluruhnya.
+        # Karena itu fetch & compute saling tumpang tindih dan diukur sebagai satu stage.
+        cols = ["corrmet_id", "location_id", "obs_date", "wx_val", "py_val"]
+        fetched = 0
+        def _counted(rows):
+            nonlocal fetched
+            for r in rows:
+                fetched += 1
+                yield r
+
+        with metrics.stage("fetch_compute") as st:
+            rows = _counted(self.fetch_pairs_by_station(start, end, city_id=DEFAULT_CITY_ID))
+            tasks = (
+                (int(loc), pd.DataFrame(list(g), columns=cols), period_name, self.resampling)
+                for loc, g in groupby(rows, key=lambda r: r[1])
+            )
 
-            # 3. Kalau varians nol → semua nilai sama → korelasi meaningless
-            if np.nanstd(wx) == 0 or np.nanstd(py) == 0:
-                classification = "INCONCLUSIVE"
+            workers = self.max_workers or os.cpu_count() or 1
+            if workers > 1:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    per_station = _map_bounded(pool, _compute_station, tasks, max_in_flight=2 * workers)
             else:
-                try:
-                    pearson_r, p_p = pearsonr(wx, py)
-                    spearman_rho, p_s = spearmanr(wx, py)
-                except Exception as e:
-                    logger.error("Correlation error for corrmet_id=%s: %s", corrmet_id, e)
-                    continue
-
-                # 4. Panggil classify baru dengan parameter tambahan
-                classification = self.classify(
-                    pearson_r=pearson_r,
-                    spearman_rho=spearman_rho,
-                    n_obs=len(wx),
-                    period_name=period_name,  # auto: WEEK* => 0.20, selain itu => 0.10
-                    p_p=p_p,                  # p-value Pearson
-                    p_s=p_s,                  # p-value Spearman
-                    # alpha=0.10,               # default threshold signifikansi
-                )
-
-            # 5. Simpan hasil ke tabel correlation_result (INSERT: gunakan location_id agregat kota)
-            insert_sql = text(
-                """
-                INSERT INTO correlation_result
-                (location_id, corrmet_id, period_name, processing_date, val_result, n_samples)
-                SELECT :loc, :corr, :period, :proc, cf.corrflag_id, :n
-                FROM correlation_flag cf WHERE cf.corrflag_desc = :desc
-                """
-            )
-            self.db.execute(
-                insert_sql,
-                {
-                    "loc": CITY_AGG_LOC_ID, # pakai lokasi agregat kota
-                    "corr": corrmet_id,
-                    "period": period_name,
-                    "proc": processing_date,
-                    "n": int(len(wx)),
-                    "desc": classification,
-                },
-            )
-            inserted += 1
+                per_station = [_compute_station(t) for t in tasks]
+            computed = sum(len(results) for _, results in per_station)
+            st.rows_in, st.rows_out = fetched, computed
+        if not per_station:
+            logger.warning("No rows found for period %s", period_name)
+            return 0
 
-        self.db.commit()
-        logger.info("Inserted %s correlation_result rows for %s", inserted, period_name)
+        with metrics.stage("write", rows_in=computed) as st:
+            inserted = 0
+            for location_id, results in per_station:
+                inserted += self._write_results(results, location_id, period_name, processing_date)
+            self.db.commit()
+            st.rows_out = inserted
+        invalidate((CORRELATION_TABLE,), start, end)
+        logger.info("Inserted %s correlation_result rows for %s across %s stations",
+                    inserted, period_name, len(per_station))
         return inserted
 
     def run_weekly(self, today: date) -> int:
         start, end = self.get_date_range_weekly(today)
-        period_name = f"WEEK_{start.isoformat()}_{end.isoformat()}"
-        return self._process_range(start, end, period_name, today)
+        return self._process_range(start, end, period_name(WEEK, start, end), today)
 
     def run_weekly_custom(self, start: date, end: date, processing_date: date) -> int:
-        period_name = f"WEEK_{start.isoformat()}_{end.isoformat()}"
-        return self._process_range(start, end, period_name, processing_date)
+        return self._process_range(start, end, period_name(WEEK, start, end), processing_date)
 
     def run_monthly(self, today: date) -> int:
         start, end = self.get_date_range_monthly(today)
-        period_name = f"MONTH_{start.strftime('%Y%m')}"
-        return self._process_range(start, end, period_name, today)
+        return self._process_range(start, end, period_name(MONTH, start, end), today)
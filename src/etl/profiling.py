@@ -0,0 +1,119 @@
+"""
+Profiling mode (`--profile` di scripts/run_etl.py dan scripts/schedule_runner.py).
+
+Setiap stage RunMetrics (validate, extract, merge, transform, station_mapping, quality, load, archive;
+fetch, compute, write / fetch_compute) dibungkus cProfile + tracemalloc:
+- LOG/profile_<ts>_<pid>/<nn>_<pipeline>_<stage>.prof  (buka dengan snakeviz / pstats)
+- LOG/profile_<ts>_<pid>/allocations.txt               (top-N alokasi per stage)
+- tabel ringkas (wall, cpu, peak memory, net alloc) di akhir run
+
+Catatan: tracemalloc memperlambat eksekusi berkali lipat; angka waktu di mode ini hanya
+untuk perbandingan antar stage, bukan latensi produksi.
+"""
+import cProfile, datetime, os, time, tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List
+
+from .config import Paths
+from .logging_util import get_logger
+from .metrics import register_stage_hook, unregister_stage_hook
+
+logger = get_logger(__name__)
+
+@dataclass
+class StageProfile:
+    seq: int
+    pipeline: str
+    stage: str
+    wall_s: float
+    cpu_s: float
+    peak_bytes: int
+    net_alloc_bytes: int
+    prof_path: str
+    top_allocations: List[str] = field(default_factory=list)
+
+def _fmt_bytes(n: int) -> str:
+    sign = "-" if n < 0 else ""
+    n = abs(n)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if n < 1024 or unit == "GiB":
+            return f"{sign}{n:.0f} {unit}" if unit == "B" else f"{sign}{n:.1f} {unit}"
+        n /= 1024
+
+class StageProfiler:
+    def __init__(self, out_dir: str | None = None, top_n: int = 15, frames: int = 10):
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.out_dir = out_dir or os.path.join(Paths.LOG_DIR, f"profile_{ts}_{os.getpid()}")
+        self.top_n = top_n
+        self.frames = frames
+        self.stages: List[StageProfile] = []
+        self._started_tracemalloc = False
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+        register_stage_hook(self.hook)
+
+    def stop(self):
+        unregister_stage_hook(self.hook)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def hook(self, pipeline: str, stage: str) -> Iterator[None]:
+        seq = len(self.stages) + 1
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        prof = cProfile.Profile()
+        t0, c0 = time.perf_counter(), time.process_time()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            wall, cpu = time.perf_counter() - t0, time.process_time() - c0
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            path = os.path.join(self.out_dir, f"{seq:02d}_{pipeline}_{stage}.prof")
+            prof.dump_stats(path)
+            top = [str(d) for d in after.compare_to(before, "lineno")[: self.top_n]]
+            self.stages.append(StageProfile(seq, pipeline, stage, wall, cpu, peak - base, current - base, path, top))
+
+    def write_allocations(self) -> str:
+        path = os.path.join(self.out_dir, "allocations.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for sp in self.stages:
+                f.write(f"== {sp.seq:02d} {sp.pipeline}.{sp.stage}  peak={_fmt_bytes(sp.peak_bytes)}"
+                        f"  net={_fmt_bytes(sp.net_alloc_bytes)}\n")
+                for line in sp.top_allocations:
+                    f.write(f"  {line}\n")
+                f.write("\n")
+        return path
+
+    def summary_table(self) -> str:
+        header = f"{'#':>3}  {'stage':<30} {'wall_s':>9} {'cpu_s':>9} {'peak':>11} {'net_alloc':>11}"
+        lines = [header, "-" * len(header)]
+        for sp in self.stages:
+            lines.append(f"{sp.seq:>3}  {sp.pipeline + '.' + sp.stage:<30} {sp.wall_s:>9.3f} {sp.cpu_s:>9.3f}"
+                         f" {_fmt_bytes(sp.peak_bytes):>11} {_fmt_bytes(sp.net_alloc_bytes):>11}")
+        return "\n".join(lines)
+
+@contextmanager
+def profiling(out_dir: str | None = None, top_n: int = 15, echo: bool = True) -> Iterator[StageProfiler]:
+    profiler = StageProfiler(out_dir, top_n)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        report = profiler.write_allocations()
+        table = profiler.summary_table()
+        logger.info("Profile written to %s (allocations: %s)", profiler.out_dir, report)
+        if echo:
+            print(table)
+            print(f"\n.prof files and allocations report: {profiler.out_dir}")
@@ -0,0 +1,406 @@
+"""
+Read API untuk dashboard: fungsi query bertipe di atas observasi harian, aqi_daily dan
+correlation_result, dengan cache hasil in-process (LRU + TTL).
+
+    series = city_daily_series("jakarta", "pm25", date(2024, 1, 1), date(2024, 1, 31))
+    flags = latest_correlations("jakarta", "WEEK")
+
+- Hasil di-cache per (fungsi, database, argumen) sebagai tuple dataclass frozen; entri diberi
+  tag tabel + rentang tanggal yang dibacanya.
+- Loader (etl.load) dan PearsonPipeline memanggil `invalidate(tables, start, end)` setelah
+  commit: hanya entri yang tabelnya sama DAN rentangnya beririsan yang dibuang. TTL membatasi
+  umur entri untuk perubahan yang tidak lewat hook (edit manual, proses lain).
+- Proses ETL dan server dashboard biasanya terpisah: set QUERY_INVALIDATION_LOG ke file yang
+  sama di keduanya agar invalidasi diteruskan (satu baris JSON per commit, dibaca server saat
+  lookup berikutnya). Penulis memadatkan file di atas QUERY_INVALIDATION_LOG_MAX_BYTES (hanya
+  entri yang lebih muda dari TTL), pembaca mendeteksinya lewat inode baru.
+- Query dibaca lewat replica bila dikonfigurasi (db.fetch_all). Kecuali: selama
+  REPLICA_MAX_LAG_S + REPLICA_LAG_CHECK_INTERVAL_S setelah invalidasi, load yang beririsan
+  dengan tabel/rentang yang diinvalidasi membaca dari primary. Replica yang tertinggal tidak bisa
+  mengembalikan data sebelum commit ke cache untuk satu TTL penuh.
+
+Endpoint HTTP/JSON lokal: etl.query_server / scripts/query_server.py.
+"""
+import datetime, json, os, tempfile, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+from sqlalchemy.engine import Engine
+
+from .config import (QUERY_CACHE_SIZE, QUERY_CACHE_TTL_S, QUERY_INVALIDATION_LOG, QUERY_INVALIDATION_LOG_MAX_BYTES,
+                     REPLICA_LAG_CHECK_INTERVAL_S, REPLICA_MAX_LAG_S)
+from .db import fetch_all, get_engine
+from .logging_util import get_logger
+
+logger = get_logger(__name__)
+
+WEATHER_TABLE, POLLUTANT_TABLE, AQI_TABLE = "weather_observation", "pollutant_observation", "aqi_daily"
+CORRELATION_TABLE = "correlation_result"
+PERIODS = ("WEEK", "MONTH")
+
+# --- Cache -------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class _Entry:
+    value: Any
+    expires_at: float
+    tables: frozenset
+    start: datetime.date | None      # None = tidak terikat rentang (kena invalidasi apa pun)
+    end: datetime.date | None
+
+def _overlaps(a_start, a_end, b_start, b_end) -> bool:
+    return (a_start is None or b_end is None or a_start <= b_end) and \
+           (b_start is None or a_end is None or b_start <= a_end)
+
+def _log_position(path: str) -> Tuple[int, int] | None:
+    """(inode, ukuran) file invalidasi; None bila belum ada."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_size
+
+class QueryCache:
+    """
+    LRU + TTL, thread-safe (ThreadingHTTPServer). Invalidasi per tabel & rentang tanggal.
+    `load(primary)` dipanggil saat miss; primary=True bila tabel/rentangnya baru diinvalidasi
+    (lihat docstring modul).
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, ttl_s: float = QUERY_CACHE_TTL_S,
+                 invalidation_log: str | None = None, clock: Callable[[], float] = time.monotonic,
+                 primary_window_s: float = REPLICA_MAX_LAG_S + REPLICA_LAG_CHECK_INTERVAL_S):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.invalidation_log = invalidation_log
+        self.primary_window_s = primary_window_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # naik setiap invalidasi; hasil query yang berjalan saat invalidasi tidak disimpan
+        self._generation = 0
+        # (batas waktu, tabel, start, end) yang baru diinvalidasi => load berikutnya dari primary
+        self._recent: list = []
+        pos = _log_position(invalidation_log) if invalidation_log else None
+        self._log_inode, self._log_offset = pos if pos else (None, 0)
+        self.hits = self.misses = self.evictions = self.invalidated = self.primary_loads = 0
+
+    def _needs_primary(self, tables: frozenset, start, end, now: float) -> bool:
+        self._recent = [r for r in self._recent if r[0] > now]
+        return any(r[1] & tables and _overlaps(r[2], r[3], start, end) for r in self._recent)
+
+    def get_or_load(self, key: Hashable, load: Callable[[bool], Any], tables: Iterable[str],
+                    start: datetime.date | None = None, end: datetime.date | None = None) -> Any:
+        self._sync()
+        tables = frozenset(tables)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+            primary = self._needs_primary(tables, start, end, now)
+            self.primary_loads += primary
+        value = load(primary)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = _Entry(value, self._clock() + self.ttl_s, tables, start, end)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self, tables: Iterable[str], start: datetime.date | None = None,
+                   end: datetime.date | None = None) -> int:
+        tables = frozenset(tables)
+        with self._lock:
+            self._generation += 1
+            if self.primary_window_s > 0:
+                self._recent.append((self._clock() + self.primary_window_s, tables, start, end))
+            stale = [k for k, e in self._entries.items()
+                     if e.tables & tables and _overlaps(e.start, e.end, start, end)]
+            for k in stale:
+                del self._entries[k]
+            self.invalidated += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "ttl_s": self.ttl_s, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "invalidated": self.invalidated,
+                    "primary_loads": self.primary_loads}
+
+    def _sync(self):
+        """Terapkan invalidasi baru dari QUERY_INVALIDATION_LOG (proses lain). Biaya: satu stat()."""
+        path = self.invalidation_log
+        if not path:
+            return
+        pos = _log_position(path)
+        if pos is None:
+            return
+        inode, size = pos
+        with self._lock:
+            if inode == self._log_inode and size == self._log_offset:
+                return
+            if inode != self._log_inode:
+                # dipadatkan penulis (file baru): isinya = semua entri yang masih dalam TTL,
+                # termasuk yang mungkin belum terbaca dari file lama => baca ulang dari awal
+                self._log_inode, self._log_offset = inode, 0
+            elif size < self._log_offset:        # dipotong di tempat: tidak tahu apa yang terlewat
+                self._generation += 1
+                self._entries.clear()
+                self._log_offset = 0
+            with open(path, "rb") as f:
+                f.seek(self._log_offset)
+                chunk = f.read(size - self._log_offset)
+            complete = chunk[:chunk.rfind(b"\n") + 1]   # baris terakhir mungkin belum selesai ditulis
+            self._log_offset += len(complete)
+        for line in complete.splitlines():
+            try:
+                ev = json.loads(line)
+                self.invalidate(ev["tables"], _as_date(ev.get("start")), _as_date(ev.get("end")))
+            except (ValueError, KeyError, TypeError):
+                logger.warning("Skipping malformed query invalidation line: %r", line[:200])
+
+CACHE = QueryCache(invalidation_log=QUERY_INVALIDATION_LOG or None)
+
+def invalidate(tables: Iterable[str], start: datetime.date | str | None = None,
+               end: datetime.date | str | None = None) -> int:
+    """Hook setelah commit: buang entri cache yang membaca `tables` di [start, end] (None = semua)."""
+    tables = sorted(set(tables))
+    if not tables:
+        return 0
+    start, end = _as_date(start), _as_date(end)
+    dropped = CACHE.invalidate(tables, start, end)
+    if QUERY_INVALIDATION_LOG:
+        line = json.dumps({"tables": tables, "start": start and start.isoformat(), "end": end and end.isoformat(),
+                           "pid": os.getpid(), "ts": time.time()}) + "\n"
+        try:
+            with open(QUERY_INVALIDATION_LOG, "a") as f:
+                f.write(line)
+                size = f.tell()
+            if size > QUERY_INVALIDATION_LOG_MAX_BYTES:
+                compact_invalidation_log(QUERY_INVALIDATION_LOG, QUERY_CACHE_TTL_S)
+        except OSError as e:
+            # data sudah commit; paling buruk dashboard stale sampai TTL habis
+            logger.warning("Could not publish query invalidation to %s: %s", QUERY_INVALIDATION_LOG, e)
+    return dropped
+
+def compact_invalidation_log(path: str, ttl_s: float) -> int:
+    """
+    Tulis ulang file invalidasi dengan entri yang lebih muda dari `ttl_s` saja (lebih tua =>
+    entri cache yang terkena sudah kedaluwarsa). Atomic rename, jadi pembaca melihat inode baru.
+    Append proses lain di sela baca & rename bisa hilang; dampaknya dibatasi TTL.
+    Return jumlah baris yang disimpan.
+    """
+    cutoff = time.time() - ttl_s
+    keep = []
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                if line.endswith(b"\n") and float(json.loads(line).get("ts", 0)) >= cutoff:
+                    keep.append(line)
+            except (ValueError, TypeError, AttributeError):
+                continue
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.writelines(keep)
+    os.replace(tmp, path)
+    return len(keep)
+
+# --- Result types ------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class DailyValue:
+    date: datetime.date
+    value: float | None
+    stations: int                    # jumlah stasiun yang punya nilai hari itu
+
+@dataclass(frozen=True)
+class AqiDay:
+    date: datetime.date
+    location_id: int
+    station_code: str
+    category: str
+    dominant_pollutant: str | None
+
+@dataclass(frozen=True)
+class CorrelationFlag:
+    location_id: int
+    station_code: str
+    corrmet_id: int
+    weather_attr: str
+    pollutant_attr: str
+    period_name: str
+    processing_date: datetime.date
+    flag: str
+    n_samples: int
+
+def _as_date(v) -> datetime.date | None:
+    if v is None or (isinstance(v, datetime.date) and not isinstance(v, datetime.datetime)):
+        return v
+    if isinstance(v, datetime.datetime):
+        return v.date()
+    return datetime.date.fromisoformat(str(v)[:10])
+
+def _check_range(start: datetime.date, end: datetime.date):
+    if end < start:
+        raise ValueError(f"end {end} is before start {start}")
+
+def _cached(engine: Engine, fn: str, args: Tuple, load: Callable[[bool], Any], tables: Iterable[str],
+            start: datetime.date | None = None, end: datetime.date | None = None):
+    key = (fn, engine.url.render_as_string(hide_password=True)) + args
+    return CACHE.get_or_load(key, load, tables, start, end)
+
+# --- Lookups -----------------------------------------------------------------------
+
+def _city_id(engine: Engine, city: str) -> int:
+    def load(primary: bool):
+        row = fetch_all(engine, "SELECT city_id FROM city WHERE LOWER(name) = :name", {"name": city.strip().lower()},
+                        primary=primary)
+        if not row:
+            raise ValueError(f"Unknown city '{city}'")
+        return int(row[0]["city_id"])
+    return _cached(engine, "city_id", (city.strip().lower(),), load, ("city",))
+
+def _attribute(engine: Engine, attribute: str) -> Tuple[str, int]:
+    """Kode atribut -> (tabel observasi, attr_id). Cuaca: 'suhu_avg', ...; polutan: 'pm25', ..."""
+    code = attribute.strip().lower()
+    def load(primary: bool):
+        for table, sql in (
+            (WEATHER_TABLE, "SELECT weatherattr_id AS id FROM weather_attribute WHERE LOWER(weatherattr_code) = :c"),
+            (POLLUTANT_TABLE, "SELECT pollutantattr_id AS id FROM pollutant_attribute WHERE LOWER(pollutantattr_code) = :c"),
+        ):
+            rows = fetch_all(engine, sql, {"c": code}, primary=primary)
+            if rows:
+                return table, int(rows[0]["id"])
+        raise ValueError(f"Unknown attribute '{attribute}'")
+    return _cached(engine, "attribute", (code,), load, ("weather_attribute", "pollutant_attribute"))
+
+# --- Queries -----------------------------------------------------------------------
+
+CITY_SERIES_SQL = {
+    WEATHER_TABLE: """
+        SELECT wo.weatherobs_date AS obs_date, AVG(wo.weatherobs_value) AS value,
+               COUNT(wo.weatherobs_value) AS stations
+        FROM weather_observation wo
+        JOIN location l ON l.location_id = wo.location_id
+        WHERE l.city_id = :city_id AND wo.weatherattr_id = :attr_id
+          AND wo.weatherobs_date BETWEEN :start AND :end
+        GROUP BY wo.weatherobs_date
+        ORDER BY wo.weatherobs_date
+    """,
+    POLLUTANT_TABLE: """
+        SELECT po.pollobs_date AS obs_date, AVG(po.pollobs_value) AS value,
+               COUNT(po.pollobs_value) AS stations
+        FROM pollutant_observation po
+        JOIN location l ON l.location_id = po.location_id
+        WHERE l.city_id = :city_id AND po.pollutantattr_id = :attr_id
+          AND po.pollobs_date BETWEEN :start AND :end
+        GROUP BY po.pollobs_date
+        ORDER BY po.pollobs_date
+    """,
+}
+
+AQI_DAILY_SQL = """
+    SELECT a.aqidaily_date AS obs_date, a.location_id, l.station_code, c.aqicat_name,
+           pa.pollutantattr_code AS dominant
+    FROM aqi_daily a
+    JOIN location l ON l.location_id = a.location_id
+    JOIN aqi_category c ON c.aqicat_id = a.aqicat_id
+    LEFT JOIN pollutant_observation po ON po.pollobs_id = a.dominant_pollobs_id
+    LEFT JOIN pollutant_attribute pa ON pa.pollutantattr_id = po.pollutantattr_id
+    WHERE l.city_id = :city_id AND a.aqidaily_date BETWEEN :start AND :end
+    ORDER BY a.aqidaily_date, a.location_id
+"""
+
+# period_name: WEEK_<start>_<end> / MONTH_<YYYYMM> => urutan string = urutan waktu
+LATEST_PERIOD_SQL = """
+    SELECT MAX(r.period_name) AS period_name
+    FROM correlation_result r
+    JOIN location l ON l.location_id = r.location_id
+    WHERE l.city_id = :city_id AND r.period_name LIKE :prefix
+"""
+
+# Periode yang dihitung ulang punya beberapa baris: ambil yang terakhir ditulis
+CORRELATION_FLAGS_SQL = """
+    SELECT r.location_id, l.station_code, r.corrmet_id, wa.weatherattr_code, pa.pollutantattr_code,
+           r.period_name, r.processing_date, f.corrflag_desc, r.n_samples
+    FROM correlation_result r
+    JOIN (
+        SELECT r2.location_id, r2.corrmet_id, MAX(r2.corrres_id) AS corrres_id
+        FROM correlation_result r2
+        JOIN location l2 ON l2.location_id = r2.location_id
+        WHERE l2.city_id = :city_id AND r2.period_name = :period_name
+        GROUP BY r2.location_id, r2.corrmet_id
+    ) latest ON latest.corrres_id = r.corrres_id
+    JOIN location l ON l.location_id = r.location_id
+    JOIN correlation_metrics cm ON cm.corrmet_id = r.corrmet_id
+    JOIN weather_attribute wa ON wa.weatherattr_id = cm.weather_x
+    JOIN pollutant_attribute pa ON pa.pollutantattr_id = cm.pollutant_y
+    JOIN correlation_flag f ON f.corrflag_id = r.val_result
+    ORDER BY r.location_id, r.corrmet_id
+"""
+
+def city_daily_series(city: str, attribute: str, start: datetime.date, end: datetime.date,
+                      engine: Engine | None = None) -> Tuple[DailyValue, ...]:
+    """Rata-rata harian seluruh stasiun kota untuk satu atribut cuaca/polutan di [start, end]."""
+    _check_range(start, end)
+    engine = engine or get_engine()
+    city_id = _city_id(engine, city)
+    table, attr_id = _attribute(engine, attribute)
+    def load(primary: bool):
+        rows = fetch_all(engine, CITY_SERIES_SQL[table],
+                         {"city_id": city_id, "attr_id": attr_id, "start": start, "end": end}, primary=primary)
+        return tuple(DailyValue(_as_date(r["obs_date"]), None if r["value"] is None else float(r["value"]),
+                                int(r["stations"])) for r in rows)
+    return _cached(engine, "city_daily_series", (city_id, attr_id, start, end), load, (table,), start, end)
+
+def aqi_daily(city: str, start: datetime.date, end: datetime.date,
+              engine: Engine | None = None) -> Tuple[AqiDay, ...]:
+    """Kategori ISPU harian per stasiun kota di [start, end]."""
+    _check_range(start, end)
+    engine = engine or get_engine()
+    city_id = _city_id(engine, city)
+    def load(primary: bool):
+        rows = fetch_all(engine, AQI_DAILY_SQL, {"city_id": city_id, "start": start, "end": end}, primary=primary)
+        return tuple(AqiDay(_as_date(r["obs_date"]), int(r["location_id"]), r["station_code"], r["aqicat_name"],
+                            r["dominant"]) for r in rows)
+    return _cached(engine, "aqi_daily", (city_id, start, end), load, (AQI_TABLE, POLLUTANT_TABLE), start, end)
+
+def latest_correlations(city: str, period: str = "WEEK", period_name: str | None = None,
+                        engine: Engine | None = None) -> Tuple[CorrelationFlag, ...]:
+    """
+    Flag korelasi per (lokasi, metrik) untuk periode terbaru `period` (WEEK/MONTH), atau untuk
+    `period_name` tertentu (mis. MONTH_202401). Termasuk lokasi agregat kota.
+    """
+    period = period.upper()
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period '{period}', expected one of {PERIODS}")
+    engine = engine or get_engine()
+    city_id = _city_id(engine, city)
+    def load(primary: bool):
+        name = period_name
+        if name is None:
+            rows = fetch_all(engine, LATEST_PERIOD_SQL, {"city_id": city_id, "prefix": f"{period}_%"}, primary=primary)
+            name = rows[0]["period_name"] if rows else None
+            if name is None:
+                return ()
+        rows = fetch_all(engine, CORRELATION_FLAGS_SQL, {"city_id": city_id, "period_name": name}, primary=primary)
+        return tuple(CorrelationFlag(int(r["location_id"]), r["station_code"], int(r["corrmet_id"]),
+                                     r["weatherattr_code"], r["pollutantattr_code"], r["period_name"],
+                                     _as_date(r["processing_date"]), r["corrflag_desc"], int(r["n_samples"]))
+                     for r in rows)
+    return _cached(engine, "latest_correlations", (city_id, period, period_name), load, (CORRELATION_TABLE,))
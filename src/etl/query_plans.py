@@ -0,0 +1,141 @@
+"""
+EXPLAIN-based guardrail for the hot queries.
+
+`check_plans(engine)` menjalankan EXPLAIN untuk setiap query di HOT_QUERIES dan
+melaporkan full scan pada tabel observasi (weather_observation, pollutant_observation,
+aqi_daily). Di MySQL full index scan (type=index) juga dihitung full scan, kecuali
+memakai covering index yang dibuat migrasi untuk tabel itu dan estimasi rows masih
+di bawah INDEX_SCAN_MAX_ROWS. Dipakai oleh `scripts/db_migrate.py check-plans` (exit code 1 jika gagal).
+
+Catatan: optimizer MySQL bisa memilih full scan pada tabel yang hampir kosong;
+jalankan cek ini terhadap data berukuran realistis (atau setelah ANALYZE TABLE).
+"""
+import json, re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Tuple
+from sqlalchemy import bindparam, text
+from sqlalchemy.engine import Connection, Engine
+
+from .load import DOMINANT_POLLOBS_SQL, EXISTING_AQI_SQL, POLLUTANT_OBS, WEATHER_OBS, existing_obs_sql
+from .migrations import MIGRATIONS, OBSERVATION_TABLES
+from .pipeline.pearson_pipeline import FETCH_PAIRS_SQL, FETCH_PAIRS_BY_STATION_SQL
+
+_SAMPLE_RANGE = {"start": date(2024, 1, 1), "end": date(2024, 1, 31), "city_id": 1}
+# loader: stasiun batch + rentang tanggal batch (list => parameter IN expanding)
+_SAMPLE_LOAD = {"locs": [1, 2], "start": date(2024, 1, 1), "end": date(2024, 1, 31)}
+
+# (nama, sql, contoh parameter)
+HOT_QUERIES: List[Tuple[str, str, dict]] = [
+    ("fetch_pairs", FETCH_PAIRS_SQL, _SAMPLE_RANGE),
+    ("fetch_pairs_by_station", FETCH_PAIRS_BY_STATION_SQL, _SAMPLE_RANGE),
+    ("existing_weather_obs", existing_obs_sql(WEATHER_OBS), _SAMPLE_LOAD),
+    ("existing_pollutant_obs", existing_obs_sql(POLLUTANT_OBS), _SAMPLE_LOAD),
+    ("dominant_pollobs_id", DOMINANT_POLLOBS_SQL, _SAMPLE_LOAD),
+    ("existing_aqi_daily", EXISTING_AQI_SQL, _SAMPLE_LOAD),
+]
+
+# Batas rows (estimasi EXPLAIN MySQL) untuk full index scan yang masih diterima
+INDEX_SCAN_MAX_ROWS = 10_000
+
+def _covering_indexes() -> Dict[str, set]:
+    """tabel -> nama covering index yang dibuat migrasi (etl.migrations)."""
+    out: Dict[str, set] = {}
+    for m in MIGRATIONS:
+        for ix in m.indexes:
+            out.setdefault(ix.table, set()).add(ix.name)
+    return out
+
+_COVERING_INDEXES = _covering_indexes()
+
+@dataclass
+class PlanCheck:
+    name: str
+    plan: List[str]
+    full_scans: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.full_scans
+
+_ALIAS_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)(?:\s+(?:AS\s+)?([A-Za-z_][A-Za-z0-9_]*))?", re.I)
+_KEYWORDS = {"on", "where", "join", "left", "right", "inner", "group", "order", "union", "using"}
+
+def _alias_map(sql: str) -> Dict[str, str]:
+    """alias -> nama tabel, supaya 'wo' di output EXPLAIN dikenali sebagai weather_observation."""
+    out = {}
+    for table, alias in _ALIAS_RE.findall(sql):
+        out[table.lower()] = table.lower()
+        if alias and alias.lower() not in _KEYWORDS:
+            out[alias.lower()] = table.lower()
+    return out
+
+def _explain_stmt(prefix: str, sql: str, params: dict):
+    stmt = text(prefix + sql)
+    expanding = [bindparam(k, expanding=True) for k, v in params.items() if isinstance(v, (list, tuple))]
+    return stmt.bindparams(*expanding) if expanding else stmt
+
+def _explain_sqlite(conn: Connection, sql: str, params: dict, aliases: Dict[str, str]) -> PlanCheck:
+    rows = conn.execute(_explain_stmt("EXPLAIN QUERY PLAN ", sql, params), params).all()
+    plan = [r[-1] for r in rows]
+    scans = []
+    for detail in plan:
+        # "SCAN wo" / "SCAN wo USING COVERING INDEX ..." = seluruh tabel/index dibaca
+        m = re.match(r"SCAN (\w+)", detail)
+        if m and aliases.get(m.group(1).lower(), m.group(1).lower()) in OBSERVATION_TABLES:
+            scans.append(detail)
+    return PlanCheck(name="", plan=plan, full_scans=scans)
+
+def _mysql_full_scan(row, aliases: Dict[str, str], max_rows: int = INDEX_SCAN_MAX_ROWS) -> bool:
+    """type=ALL selalu full scan; type=index (seluruh index dibaca) hanya diterima bila key-nya
+    covering index migrasi untuk tabel tsb dan estimasi rows <= max_rows."""
+    table = str(row.get("table") or "").lower()
+    table = aliases.get(table, table)
+    if table not in OBSERVATION_TABLES:
+        return False
+    kind = str(row.get("type")).upper()
+    if kind == "ALL":
+        return True
+    if kind == "INDEX":
+        covering = row.get("key") in _COVERING_INDEXES.get(table, ())
+        return not (covering and int(row.get("rows") or 0) <= max_rows)
+    return False
+
+def _explain_mysql(conn: Connection, sql: str, params: dict, aliases: Dict[str, str]) -> PlanCheck:
+    rows = conn.execute(_explain_stmt("EXPLAIN ", sql, params), params).mappings().all()
+    plan, scans = [], []
+    for r in rows:
+        line = f"{r.get('table') or ''}: type={r.get('type')} key={r.get('key')} rows={r.get('rows')}"
+        plan.append(line)
+        if _mysql_full_scan(r, aliases):
+            scans.append(line)
+    return PlanCheck(name="", plan=plan, full_scans=scans)
+
+def _explain_postgres(conn: Connection, sql: str, params: dict, aliases: Dict[str, str]) -> PlanCheck:
+    raw = conn.execute(_explain_stmt("EXPLAIN (FORMAT JSON) ", sql, params), params).scalar()
+    doc = raw if isinstance(raw, list) else json.loads(raw)
+    plan, scans = [], []
+    def walk(node):
+        rel = node.get("Relation Name")
+        line = f"{node.get('Node Type')} {rel or ''}".strip()
+        plan.append(line)
+        if node.get("Node Type") == "Seq Scan" and rel in OBSERVATION_TABLES:
+            scans.append(line)
+        for child in node.get("Plans", []):
+            walk(child)
+    walk(doc[0]["Plan"])
+    return PlanCheck(name="", plan=plan, full_scans=scans)
+
+_EXPLAINERS = {"sqlite": _explain_sqlite, "mysql": _explain_mysql, "postgresql": _explain_postgres}
+
+def check_plans(engine: Engine, queries: List[Tuple[str, str, dict]] | None = None) -> List[PlanCheck]:
+    explain = _EXPLAINERS.get(engine.dialect.name)
+    if explain is None:
+        raise RuntimeError(f"check-plans not supported for dialect {engine.dialect.name}")
+    results = []
+    with engine.connect() as conn:
+        for name, sql, params in (queries or HOT_QUERIES):
+            res = explain(conn, sql, params, _alias_map(sql))
+            res.name = name
+            results.append(res)
+    return results
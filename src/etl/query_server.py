@@ -0,0 +1,85 @@
+"""
+Endpoint HTTP/JSON lokal (read-only) di atas etl.query, untuk dashboard.
+
+    uv run python scripts/query_server.py --port 8765
+
+    GET /v1/series?city=jakarta&attribute=pm25&start=2024-01-01&end=2024-01-31
+    GET /v1/aqi?city=jakarta&start=2024-01-01&end=2024-01-31
+    GET /v1/correlations?city=jakarta&period=WEEK[&period_name=WEEK_2024-01-01_2024-01-07]
+    GET /v1/cache                         statistik cache (hits/misses/size/...)
+
+Hanya untuk jaringan lokal/di belakang reverse proxy: tanpa autentikasi. Parameter salah => 400
+dengan {"error": ...}; tanggal ditulis ISO (YYYY-MM-DD).
+"""
+import datetime, json
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+from urllib.parse import parse_qs, urlsplit
+from sqlalchemy.engine import Engine
+
+from . import query
+from .config import QUERY_HTTP_HOST, QUERY_HTTP_PORT
+from .db import get_engine
+from .logging_util import get_logger
+
+logger = get_logger(__name__)
+
+def _param(params: Dict[str, str], name: str, default: str | None = None) -> str:
+    value = params.get(name, default)
+    if value is None or value == "":
+        raise ValueError(f"missing query parameter '{name}'")
+    return value
+
+def _date_param(params: Dict[str, str], name: str) -> datetime.date:
+    return datetime.date.fromisoformat(_param(params, name))
+
+def _json_default(o):
+    if isinstance(o, datetime.date):
+        return o.isoformat()
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+ROUTES: Dict[str, Callable[[Engine, Dict[str, str]], object]] = {
+    "/v1/series": lambda engine, p: query.city_daily_series(
+        _param(p, "city"), _param(p, "attribute"), _date_param(p, "start"), _date_param(p, "end"), engine=engine),
+    "/v1/aqi": lambda engine, p: query.aqi_daily(
+        _param(p, "city"), _date_param(p, "start"), _date_param(p, "end"), engine=engine),
+    "/v1/correlations": lambda engine, p: query.latest_correlations(
+        _param(p, "city"), _param(p, "period", "WEEK"), p.get("period_name") or None, engine=engine),
+    "/v1/cache": lambda engine, p: query.CACHE.stats(),
+}
+
+class QueryHandler(BaseHTTPRequestHandler):
+    engine: Engine            # di-set oleh make_server (subclass per server)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path.rstrip("/"))
+        if route is None:
+            return self._send(404, {"error": f"unknown path {url.path}", "paths": sorted(ROUTES)})
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            result = route(self.engine, params)
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        except Exception:
+            logger.exception("Query %s failed", self.path)
+            return self._send(500, {"error": "internal error"})
+        if isinstance(result, tuple):
+            result = [asdict(r) for r in result]
+        self._send(200, result)
+
+    def _send(self, status: int, body):
+        payload = json.dumps(body, default=_json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, fmt, *args):
+        logger.debug("%s - %s", self.address_string(), fmt % args)
+
+def make_server(host: str = QUERY_HTTP_HOST, port: int = QUERY_HTTP_PORT, engine: Engine | None = None) -> ThreadingHTTPServer:
+    handler = type("BoundQueryHandler", (QueryHandler,), {"engine": engine or get_engine()})
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,143 @@
+import warnings
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Tuple
+import numpy as np
+
+# Perkiraan byte per (metrik x sampel x titik) selama perhitungan:
+# beberapa array float64 sementara untuk korelasi + matriks perbandingan n x n (bool)
+# untuk ranking bootstrap. Dipakai untuk membagi batch agar tidak melewati batas memori.
+_FLOAT_TEMPS = 8
+
+@dataclass(frozen=True)
+class ResamplingConfig:
+    """
+    Opsi mode resampling untuk PearsonPipeline.
+    - n_permutations: jumlah permutasi untuk p-value empiris (two-sided)
+    - n_bootstrap: jumlah sampel bootstrap untuk confidence interval
+    - ci_level: level CI persentil (mis. 0.95)
+    - seed: seed RNG agar hasil bisa direproduksi (None => acak)
+    - max_batch_bytes: batas memori kerja per batch metrik
+    """
+    n_permutations: int = 2000
+    n_bootstrap: int = 2000
+    ci_level: float = 0.95
+    seed: int | None = None
+    max_batch_bytes: int = 64 * 1024 * 1024
+
+@dataclass(frozen=True)
+class ResampledCorrelation:
+    pearson_r: float
+    spearman_rho: float
+    p_p: float
+    p_s: float
+    ci_p: Tuple[float, float]
+    ci_s: Tuple[float, float]
+
+def rank_rows(a: np.ndarray) -> np.ndarray:
+    """Average ranks (1-based, ties averaged) along the last axis, fully vectorized."""
+    less = (a[..., None, :] < a[..., :, None]).sum(axis=-1)
+    equal = (a[..., None, :] == a[..., :, None]).sum(axis=-1)
+    return less + (equal + 1) / 2.0
+
+def pearson_rows(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Pearson r along the last axis; NaN where either side has zero variance."""
+    xm = x - x.mean(axis=-1, keepdims=True)
+    ym = y - y.mean(axis=-1, keepdims=True)
+    num = (xm * ym).sum(axis=-1)
+    den = np.sqrt((xm * xm).sum(axis=-1) * (ym * ym).sum(axis=-1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = num / den
+    r[den == 0] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+def _metric_chunks(m: int, n: int, samples: int, max_bytes: int) -> Tuple[int, int]:
+    """Pilih ukuran potongan (metrik, sampel) sehingga array kerja <= max_bytes."""
+    per_cell = n * (_FLOAT_TEMPS * 8 + 2 * n)
+    per_metric = per_cell * samples
+    if per_metric <= max_bytes:
+        return max(1, min(m, max_bytes // per_metric)), samples
+    return 1, max(1, min(samples, max_bytes // per_cell))
+
+def _empirical_p(obs: np.ndarray, null: np.ndarray) -> np.ndarray:
+    # two-sided, dengan koreksi +1 agar p tidak pernah 0
+    eps = 1e-12
+    hits = (np.abs(null) >= np.abs(obs)[:, None] - eps).sum(axis=1)
+    return (hits + 1.0) / (null.shape[1] + 1.0)
+
+def _percentile_ci(boot: np.ndarray, level: float) -> np.ndarray:
+    tail = (1.0 - level) / 2.0 * 100.0
+    # sampel bootstrap yang konstan menghasilkan NaN; abaikan (All-NaN => CI NaN)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(boot, [tail, 100.0 - tail], axis=1).T
+
+def _resample_block(X: np.ndarray, Y: np.ndarray, cfg: ResamplingConfig,
+                    rng: np.random.Generator) -> List[ResampledCorrelation]:
+    """Semua metrik di blok ini punya panjang n yang sama: X, Y berbentuk (m, n)."""
+    m, n = X.shape
+    RX, RY = rank_rows(X), rank_rows(Y)
+    r_obs = pearson_rows(X, Y)
+    rho_obs = pearson_rows(RX, RY)
+
+    # Satu array indeks (samples x n) per batch, dipakai bersama oleh semua metrik
+    perm_idx = rng.permuted(np.tile(np.arange(n), (cfg.n_permutations, 1)), axis=1)
+    boot_idx = rng.integers(0, n, size=(cfg.n_bootstrap, n))
+
+    r_perm = np.empty((m, cfg.n_permutations))
+    rho_perm = np.empty((m, cfg.n_permutations))
+    r_boot = np.empty((m, cfg.n_bootstrap))
+    rho_boot = np.empty((m, cfg.n_bootstrap))
+
+    samples = max(cfg.n_permutations, cfg.n_bootstrap)
+    m_step, s_step = _metric_chunks(m, n, samples, cfg.max_batch_bytes)
+    for m0 in range(0, m, m_step):
+        ms = slice(m0, m0 + m_step)
+        x, y, rx, ry = X[ms, None, :], Y[ms], RX[ms, None, :], RY[ms]
+        for s0 in range(0, cfg.n_permutations, s_step):
+            idx = perm_idx[s0:s0 + s_step]
+            r_perm[ms, s0:s0 + len(idx)] = pearson_rows(x, y[:, idx])
+            # Permutasi tidak mengubah rank, cukup permutasikan rank Y
+            rho_perm[ms, s0:s0 + len(idx)] = pearson_rows(rx, ry[:, idx])
+        for s0 in range(0, cfg.n_bootstrap, s_step):
+            idx = boot_idx[s0:s0 + s_step]
+            xb, yb = X[ms][:, idx], y[:, idx]
+            r_boot[ms, s0:s0 + len(idx)] = pearson_rows(xb, yb)
+            # Bootstrap menghasilkan ties baru => rank ulang per sampel
+            rho_boot[ms, s0:s0 + len(idx)] = pearson_rows(rank_rows(xb), rank_rows(yb))
+
+    p_p = _empirical_p(r_obs, r_perm)
+    p_s = _empirical_p(rho_obs, rho_perm)
+    ci_p = _percentile_ci(r_boot, cfg.ci_level)
+    ci_s = _percentile_ci(rho_boot, cfg.ci_level)
+    return [
+        ResampledCorrelation(
+            pearson_r=float(r_obs[i]), spearman_rho=float(rho_obs[i]),
+            p_p=float(p_p[i]), p_s=float(p_s[i]),
+            ci_p=(float(ci_p[i, 0]), float(ci_p[i, 1])),
+            ci_s=(float(ci_s[i, 0]), float(ci_s[i, 1])),
+        )
+        for i in range(m)
+    ]
+
+def resample_correlations(series: Dict[Hashable, Tuple[np.ndarray, np.ndarray]],
+                          cfg: ResamplingConfig,
+                          rng: np.random.Generator | None = None) -> Dict[Hashable, ResampledCorrelation]:
+    """
+    Hitung p-value permutasi dan CI bootstrap untuk banyak metrik sekaligus.
+    `series` memetakan key (mis. corrmet_id) -> (wx, py) yang sudah bersih dari NaN.
+    Metrik dengan panjang sama digabung menjadi satu batch (m x n) dan semua korelasi
+    hasil resampling dihitung secara vektor, tanpa loop per sampel.
+    """
+    rng = rng if rng is not None else np.random.default_rng(cfg.seed)
+    by_n: Dict[int, List[Hashable]] = {}
+    for key, (wx, _) in series.items():
+        by_n.setdefault(len(wx), []).append(key)
+
+    out: Dict[Hashable, ResampledCorrelation] = {}
+    for n in sorted(by_n):
+        keys = by_n[n]
+        X = np.vstack([np.asarray(series[k][0], dtype=float) for k in keys])
+        Y = np.vstack([np.asarray(series[k][1], dtype=float) for k in keys])
+        for k, res in zip(keys, _resample_block(X, Y, cfg, rng)):
+            out[k] = res
+    return out
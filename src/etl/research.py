@@ -0,0 +1,99 @@
+"""
+Eksperimen korelasi offline: variasi window, lag, dan alpha di atas satu sumber pasangan
+(biasanya etl.duckdb_source.DuckDBPairSource), tanpa menulis ke correlation_result.
+
+    exps = [Experiment("WEEK"), Experiment("MONTH", lag_days=1), Experiment("14D", alpha=0.05)]
+    df = run_experiments(source, date(2015, 1, 1), date(2024, 12, 31), exps)
+
+Data diambil SEKALI untuk seluruh rentang (+ lag terbesar), lalu tiap eksperimen hanya memotong
+deret di memori dan memanggil compute_classifications (logika klasifikasi yang sama dengan job).
+
+- window "WEEK"/"MONTH": batas periode sama dengan jadwal (etl.periods), jadi hasil dengan
+  lag 0 & alpha None sama dengan yang ditulis job mingguan/bulanan.
+- window "<N>D": blok N hari berurutan mulai `start`; nama periode "<N>D_<start>_<end>"
+  (ambang n minimum = ambang bulanan, lihat min_n_for_period).
+- lag_days = k: nilai cuaca hari d dipasangkan dengan polutan hari d + k.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+import pandas as pd
+
+from .logging_util import get_logger
+from .periods import MONTH, WEEK, month_bounds, period_name, week_bounds
+from .pipeline.pearson_pipeline import DEFAULT_CITY_ID, compute_classifications
+from .resampling import ResamplingConfig
+
+logger = get_logger(__name__)
+
+_DAYS = re.compile(r"^(\d+)D$")
+
+@dataclass(frozen=True)
+class Experiment:
+    window: str = WEEK                # "WEEK" | "MONTH" | "<N>D"
+    lag_days: int = 0
+    alpha: float | None = None        # None => default per periode (WEEK 0.20, lainnya 0.10)
+
+    def __post_init__(self):
+        if self.window not in (WEEK, MONTH) and not _DAYS.match(self.window):
+            raise ValueError(f"Unknown window '{self.window}', expected WEEK, MONTH or <N>D")
+        if self.lag_days < 0:
+            raise ValueError("lag_days must be >= 0")
+
+    @property
+    def name(self) -> str:
+        alpha = "default" if self.alpha is None else f"{self.alpha:g}"
+        return f"{self.window}/lag{self.lag_days}/alpha={alpha}"
+
+def windows(window: str, start: date, end: date) -> List[Tuple[date, date, str]]:
+    """[(awal, akhir, period_name)] yang menutup [start, end]."""
+    out = []
+    m = _DAYS.match(window)
+    d = start
+    while d <= end:
+        if window == WEEK:
+            lo, hi = week_bounds(d)
+        elif window == MONTH:
+            lo, hi = month_bounds(d)
+        else:
+            lo, hi = d, d + timedelta(days=int(m.group(1)) - 1)
+        lo, hi = max(lo, start), min(hi, end)
+        name = period_name(window, lo, hi) if window in (WEEK, MONTH) else f"{window}_{lo.isoformat()}_{hi.isoformat()}"
+        out.append((lo, hi, name))
+        d = hi + timedelta(days=1)
+    return out
+
+def _lagged(pairs: pd.DataFrame, lag_days: int) -> pd.DataFrame:
+    if not lag_days:
+        return pairs
+    py = pairs[["corrmet_id", "obs_date", "py_val"]].assign(obs_date=pairs["obs_date"] - timedelta(days=lag_days))
+    return pairs[["corrmet_id", "obs_date", "wx_val"]].merge(py, on=["corrmet_id", "obs_date"], how="left")
+
+def run_experiments(source, start: date, end: date, experiments: Iterable[Experiment],
+                    city_id: int = DEFAULT_CITY_ID, resampling: ResamplingConfig | None = None) -> pd.DataFrame:
+    """
+    Satu baris per (eksperimen, periode, corrmet_id): experiment, window, lag_days, alpha,
+    period_name, period_start, period_end, corrmet_id, classification, n_samples.
+    """
+    experiments = list(experiments)
+    max_lag = max((e.lag_days for e in experiments), default=0)
+    rows = source.fetch_pairs(start, end + timedelta(days=max_lag), city_id=city_id)
+    pairs = pd.DataFrame(rows, columns=["corrmet_id", "obs_date", "wx_val", "py_val"])
+    pairs["obs_date"] = pd.to_datetime(pairs["obs_date"].astype(str).str.slice(0, 10)).dt.date
+    logger.info("Research: %s pair rows for %s..%s, %s experiments", len(pairs), start, end, len(experiments))
+
+    out = []
+    for exp in experiments:
+        df = _lagged(pairs, exp.lag_days)
+        spans = windows(exp.window, start, end)
+        # tiap tanggal -> indeks window, lalu satu groupby (bukan filter ulang per window)
+        index = {lo + timedelta(days=k): i for i, (lo, hi, _) in enumerate(spans) for k in range((hi - lo).days + 1)}
+        key = df["obs_date"].map(index)
+        for i, part in df[key.notna()].groupby(key[key.notna()].astype(int), sort=True):
+            lo, hi, name = spans[i]
+            for corrmet_id, classification, n in compute_classifications(part, name, resampling, alpha=exp.alpha):
+                out.append((exp.name, exp.window, exp.lag_days, exp.alpha, name, lo, hi, corrmet_id, classification, n))
+    return pd.DataFrame(out, columns=["experiment", "window", "lag_days", "alpha", "period_name", "period_start",
+                                      "period_end", "corrmet_id", "classification", "n_samples"])
@@ -0,0 +1,150 @@
+"""
+Opt-in SQL statement accounting (SQLAlchemy cursor events).
+
+    with track_sql(engine) as stats:          # engine=None => semua Engine di proses ini
+        load_all_in_one_transaction(engine, df)
+    stats.log_summary()
+    stats.assert_budget(200, shape="INSERT INTO weather_observation")
+
+Statement dikelompokkan per "shape" (SQL yang dinormalisasi: literal/parameter -> ?,
+daftar IN/VALUES dilipat) dan per stage pipeline (etl.metrics.current_stage()).
+Shape yang dieksekusi lebih dari `threshold` kali dalam satu stage ditandai sebagai
+kandidat N+1. Pipeline mengaktifkannya otomatis bila ETL_SQL_STATS=1.
+"""
+import re, time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import SQL_N_PLUS_ONE_THRESHOLD
+from .logging_util import get_logger
+from .metrics import current_stage
+
+logger = get_logger(__name__)
+
+_NO_STAGE = "-"
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_RE = re.compile(r"(?<!:):\w+|%\(\w+\)s|%s|\$\d+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.I)
+_VALUES_RE = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.I)
+
+def normalize_sql(sql: str) -> str:
+    """Bentuk kanonik statement: spasi dirapikan, literal & parameter -> ?, IN/VALUES dilipat."""
+    s = " ".join(sql.split())
+    s = _STRING_RE.sub("?", s)
+    s = _PARAM_RE.sub("?", s)
+    s = _NUMBER_RE.sub("?", s)
+    s = _IN_LIST_RE.sub("IN (...)", s)
+    s = _VALUES_RE.sub(r"VALUES \1, ...", s)
+    return s
+
+@dataclass
+class ShapeStats:
+    count: int = 0
+    rows: int = 0          # parameter set (executemany dihitung 1 statement, N rows)
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+class SqlStats:
+    def __init__(self, threshold: int | None = None):
+        self.threshold = SQL_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        self.by_stage: Dict[Tuple[str, str], ShapeStats] = defaultdict(ShapeStats)
+        self._targets: List = []
+
+    # --- event handlers -----------------------------------------------------------
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_sql_stats_t0", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_sql_stats_t0")
+        elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+        st = self.by_stage[(current_stage() or _NO_STAGE, normalize_sql(statement))]
+        st.count += 1
+        st.rows += len(parameters) if executemany and parameters is not None else 1
+        st.total_s += elapsed
+        st.max_s = max(st.max_s, elapsed)
+
+    def _error(self, exc_context):
+        # Statement gagal: after_cursor_execute tidak terpanggil, buang t0 miliknya
+        # supaya statement berikutnya di koneksi ini tidak memakai waktu mulai yang salah.
+        conn = exc_context.connection
+        starts = conn.info.get("_sql_stats_t0") if conn is not None else None
+        if starts:
+            starts.pop()
+
+    def attach(self, target=Engine) -> "SqlStats":
+        event.listen(target, "before_cursor_execute", self._before)
+        event.listen(target, "after_cursor_execute", self._after)
+        event.listen(target, "handle_error", self._error)
+        self._targets.append(target)
+        return self
+
+    def detach(self):
+        for target in self._targets:
+            event.remove(target, "before_cursor_execute", self._before)
+            event.remove(target, "after_cursor_execute", self._after)
+            event.remove(target, "handle_error", self._error)
+        self._targets.clear()
+
+    # --- queries --------------------------------------------------------------------
+    def by_shape(self) -> Dict[str, ShapeStats]:
+        out: Dict[str, ShapeStats] = defaultdict(ShapeStats)
+        for (_, shape), st in self.by_stage.items():
+            agg = out[shape]
+            agg.count += st.count; agg.rows += st.rows; agg.total_s += st.total_s
+            agg.max_s = max(agg.max_s, st.max_s)
+        return dict(out)
+
+    def count(self, shape: str | None = None, stage: str | None = None) -> int:
+        """Jumlah statement; `shape` = substring (case-insensitive) dari shape ternormalisasi."""
+        needle = shape.lower() if shape else None
+        return sum(
+            st.count for (stg, shp), st in self.by_stage.items()
+            if (stage is None or stg == stage) and (needle is None or needle in shp.lower())
+        )
+
+    @property
+    def total(self) -> int:
+        return self.count()
+
+    def top(self, n: int = 10, key: str = "count") -> List[Tuple[str, ShapeStats]]:
+        return sorted(self.by_shape().items(), key=lambda kv: getattr(kv[1], key), reverse=True)[:n]
+
+    def suspects(self) -> List[Tuple[str, str, int]]:
+        """(stage, shape, count) untuk shape yang melewati threshold dalam satu stage."""
+        return sorted(
+            ((stg, shp, st.count) for (stg, shp), st in self.by_stage.items() if st.count > self.threshold),
+            key=lambda x: -x[2],
+        )
+
+    def assert_budget(self, max_statements: int, shape: str | None = None, stage: str | None = None):
+        n = self.count(shape, stage)
+        if n > max_statements:
+            detail = "\n".join(f"  {st.count:>6}x {shp}" for shp, st in self.top(5))
+            raise AssertionError(
+                f"SQL budget exceeded: {n} statements > {max_statements}"
+                f" (shape={shape!r}, stage={stage!r})\n{detail}"
+            )
+
+    def log_summary(self, top_n: int = 5):
+        if not self.by_stage:
+            return
+        logger.info("SQL statements: %s total, %s shapes", self.total, len(self.by_shape()))
+        for label, key in (("count", "count"), ("time", "total_s")):
+            for shp, st in self.top(top_n, key):
+                logger.info("SQL top by %s: %sx %.3fs %.200s", label, st.count, st.total_s, shp)
+        for stg, shp, n in self.suspects():
+            logger.warning("Possible N+1 in stage '%s': %s executions of %.200s", stg, n, shp)
+
+@contextmanager
+def track_sql(engine: Engine | None = None, threshold: int | None = None) -> Iterator[SqlStats]:
+    stats = SqlStats(threshold).attach(engine if engine is not None else Engine)
+    try:
+        yield stats
+    finally:
+        stats.detach()
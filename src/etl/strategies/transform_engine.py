@@ -0,0 +1,116 @@
+"""
+Engine DataFrame untuk langkah transform (clean_and_rename).
+
+- PandasTransformEngine : implementasi asli di etl.transform (default)
+- PolarsTransformEngine : satu lazy query Polars (replace sentinel, parsing tanggal, filter,
+                          ffill/bfill, rename, cast numerik) yang dioptimasi & dijalankan
+                          multi-thread dalam sekali collect. Butuh `pip install airweather-etl[polars]`.
+
+Keduanya menerima & mengembalikan pandas DataFrame (index baris dipertahankan) dengan hasil
+yang sama; lihat tests/test_transform_engines.py. Pilih lewat TRANSFORM_ENGINE atau
+TransformEngineFactory.create("polars").
+"""
+from abc import ABC, abstractmethod
+from typing import Tuple
+import pandas as pd
+
+from ..config import RENAME_MAP
+from ..transform import FFILL_COLS, NUMERIC_COLS, SPECIAL_MISSING, _coerce_date_yyyy_mm_dd, clean_and_rename
+
+class TransformEngine(ABC):
+    name: str
+
+    @abstractmethod
+    def clean_and_rename(self, df_airweather: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Return (df_clean, bad_rows) seperti etl.transform.clean_and_rename."""
+        ...
+
+class PandasTransformEngine(TransformEngine):
+    name = "pandas"
+
+    def clean_and_rename(self, df_airweather: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        return clean_and_rename(df_airweather)
+
+_ROW = "__row"
+
+def _as_text(v):
+    # Kolom object campuran (angka + teks) tidak punya tipe Polars tunggal: jadikan teks.
+    # pandas hanya mengganti sentinel pada sel teks, jadi angka 8888 tidak boleh jadi "8888".
+    if v is None or isinstance(v, str) or pd.isna(v):
+        return v
+    text = str(v)
+    return str(float(v)) if text in SPECIAL_MISSING else text
+
+class PolarsTransformEngine(TransformEngine):
+    name = "polars"
+
+    def __init__(self):
+        import polars  # noqa: F401  (gagal cepat bila extra [polars] belum terpasang)
+
+    @staticmethod
+    def _date_format(dates: pd.Series) -> str | None:
+        # pandas.to_datetime menebak format dari nilai pertama yang valid lalu memakainya untuk
+        # semua baris (sisanya NaT); tiru agar baris yang ditolak sama persis.
+        # None = tidak ada tebakan: pandas mem-parse tiap nilai sendiri-sendiri
+        first = dates[dates.notna() & ~dates.isin(SPECIAL_MISSING)]
+        if not len(first):
+            return "%Y-%m-%d"
+        return pd.tseries.api.guess_datetime_format(str(first.iloc[0]))
+
+    def clean_and_rename(self, df_airweather: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        import polars as pl
+
+        index = df_airweather.index
+        src = df_airweather.reset_index(drop=True)
+        fmt = self._date_format(df_airweather["tanggal"])
+        if fmt is None:
+            # tanpa format tunggal hasil polars bisa berbeda: pakai coercion pandas untuk kolom
+            # tanggal saja (sudah dinormalisasi ke YYYY-MM-DD atau null)
+            dates = src["tanggal"]
+            src["tanggal"], _ = _coerce_date_yyyy_mm_dd(dates.where(~dates.isin(SPECIAL_MISSING)))
+            fmt = "%Y-%m-%d"
+        for c in src.columns[src.dtypes == object]:
+            src[c] = src[c].map(_as_text)
+        lf = pl.from_pandas(src, include_index=False).with_row_index(_ROW).lazy()
+        schema = lf.collect_schema()
+        text_cols = [c for c, t in schema.items() if t == pl.String]
+
+        # 0) Special missing (hanya sel teks, seperti DataFrame.replace di pandas)
+        lf = lf.with_columns(
+            pl.when(pl.col(c).is_in(list(SPECIAL_MISSING))).then(None).otherwise(pl.col(c)).alias(c)
+            for c in text_cols
+        )
+
+        # 1) Coerce tanggal (fmt ditentukan di atas)
+        parsed = pl.col("tanggal").cast(pl.String).str.strptime(pl.Datetime, fmt, strict=False)
+        lf = lf.with_columns(parsed.alias("__parsed"))
+        bad_lf = lf.filter(pl.col("__parsed").is_null()).with_columns(pl.lit(None, pl.String).alias("tanggal"))
+        good = lf.filter(pl.col("__parsed").is_not_null()).with_columns(
+            pl.col("__parsed").dt.strftime("%Y-%m-%d").alias("tanggal"))
+
+        # 2) ffill/bfill
+        good = good.with_columns(
+            pl.col(c).forward_fill().backward_fill() for c in FFILL_COLS if c in schema
+        )
+
+        # 3-5) lowercase, drop ddd_car, rename
+        names = [c for c in schema if c != _ROW]
+        lower = {c: c.lower() for c in names}
+        rename = {k.lower(): v for k, v in RENAME_MAP.items()}
+        final = {c: rename.get(lower[c], lower[c]) for c in names if lower[c] != "ddd_car"}
+        good = good.select(pl.col(_ROW), *(pl.col(c).alias(n) for c, n in final.items()))
+
+        # numeric cast (to_numeric errors="coerce")
+        good = good.with_columns(
+            pl.col(n).cast(pl.Float64, strict=False) for n in final.values() if n in NUMERIC_COLS
+        )
+
+        good_df, bad_df = pl.collect_all([good, bad_lf.select(pl.col(_ROW), *names)])
+        return self._to_pandas(good_df, index), self._to_pandas(bad_df, index)
+
+    @staticmethod
+    def _to_pandas(df, index: pd.Index) -> pd.DataFrame:
+        rows = df.get_column(_ROW).to_numpy()
+        out = df.drop(_ROW).to_pandas()
+        out.index = index[rows]
+        return out
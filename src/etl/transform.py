@@ -2,6 +2,17 @@ import pandas as pd
 import numpy as np
 from .config import RENAME_MAP
 
+SPECIAL_MISSING = {"8888","9999","-999","-9999","na","n/a","null","none",""," "}
+
+FFILL_COLS = [
+    "TN","TX","TAVG","RH_AVG","RR","SS","FF_X","DDD_X","FF_AVG",
+    "stasiun","pm25","pm10","so2","co","o3","no2","max","critical","categori"
+]
+
+NUMERIC_COLS = ["suhu_min","suhu_max","suhu_avg","kelembapan_avg","curah_hujan",
+                "durasi_penyinaran","kecepatan_angin_max","arah_angin_max","kecepatan_angin_avg",
+                "pm25","pm10","so2","co","o3","no2","max"]
+
 def _coerce_date_yyyy_mm_dd(series: pd.Series) -> tuple[pd.Series, pd.Series]:
     parsed = pd.to_datetime(series, errors="coerce", dayfirst=False)
     # produce normalized string date
@@ -9,7 +20,6 @@ def _coerce_date_yyyy_mm_dd(series: pd.Series) -> tuple[pd.Series, pd.Series]:
     return norm, parsed.isna()
 
 def normalize_special_missing(df: pd.DataFrame) -> pd.DataFrame:
-    SPECIAL_MISSING = {"8888","9999","-999","-9999","na","n/a","null","none",""," "}
     df = df.copy()
     df = df.replace(list(SPECIAL_MISSING), np.nan)
     return df
@@ -32,12 +42,8 @@ def clean_and_rename(df_airweather: pd.DataFrame) -> tuple[pd.DataFrame, pd.Data
     df = df[~bad].copy()
 
     # 2) Apply ffill/bfill to all specified columns (case-insensitive handling)
-    cols_to_ffill = [
-        "TN","TX","TAVG","RH_AVG","RR","SS","FF_X","DDD_X","FF_AVG",
-        "stasiun","pm25","pm10","so2","co","o3","no2","max","critical","categori"
-    ]
     # unify column access by exact names present
-    present = [c for c in cols_to_ffill if c in df.columns]
+    present = [c for c in FFILL_COLS if c in df.columns]
     for c in present:
         df[c] = df[c].ffill().bfill()
 
@@ -56,10 +62,7 @@ def clean_and_rename(df_airweather: pd.DataFrame) -> tuple[pd.DataFrame, pd.Data
     df = df.rename(columns=rename_keys)
 
     # Ensure numeric columns are numeric
-    num_cols = ["suhu_min","suhu_max","suhu_avg","kelembapan_avg","curah_hujan",
-                "durasi_penyinaran","kecepatan_angin_max","arah_angin_max","kecepatan_angin_avg",
-                "pm25","pm10","so2","co","o3","no2","max"]
-    for c in num_cols:
+    for c in NUMERIC_COLS:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
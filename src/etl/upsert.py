@@ -0,0 +1,130 @@
+"""
+Bulk insert-ignore / upsert per dialect, dipakai loader (etl.load) supaya SQL MySQL tidak
+di-hardcode dan loader bisa diuji/di-benchmark di SQLite serta dievaluasi di PostgreSQL.
+
+    insert_ignore(c, "weather_observation", cols, key, rows)           # key sudah ada => dilewati
+    upsert(c, "aqi_daily", cols, key, rows, update=["aqicat_id"])       # key sudah ada => kolom update ditimpa
+
+`rows` = list tuple sesuai urutan `columns` (nilai Python biasa, tanggal 'YYYY-MM-DD').
+
+- mysql     : INSERT IGNORE / ON DUPLICATE KEY UPDATE col = VALUES(col), multi-row VALUES per
+              UPSERT_BATCH_ROWS baris (satu round trip per potongan, bukan per baris)
+- sqlite    : INSERT ... ON CONFLICT (key) DO NOTHING / DO UPDATE SET col = excluded.col,
+              executemany (statement di-prepare sekali, in-process)
+- postgresql: >= PG_COPY_MIN_ROWS baris => COPY ke temp table lalu INSERT ... SELECT ...
+              ON CONFLICT; lebih kecil => multi-row VALUES ... ON CONFLICT
+
+Key di `rows` harus unik untuk upsert (PostgreSQL menolak satu statement yang menyentuh baris
+yang sama dua kali); loader sudah men-dedupe sebelum menulis. COPY berjalan di cursor DBAPI
+(psycopg2 / psycopg 3) sehingga tidak terlihat oleh etl.sql_stats.
+"""
+import csv, io, itertools
+from typing import Callable, Dict, List, Sequence, Tuple
+from sqlalchemy.engine import Connection
+
+from .config import PG_COPY_MIN_ROWS, UPSERT_BATCH_ROWS
+
+Row = Tuple
+# batas parameter bind per statement (PostgreSQL: 65535; MySQL praktis dibatasi max_allowed_packet)
+_MAX_PARAMS = 65535
+
+_stage_seq = itertools.count()
+
+def _placeholder(c: Connection) -> str:
+    style = c.dialect.paramstyle
+    if style == "qmark":
+        return "?"
+    if style in ("format", "pyformat"):
+        return "%s"
+    raise RuntimeError(f"Unsupported DBAPI paramstyle for bulk upsert: {style}")
+
+def _conflict_clause(dialect: str, key: Sequence[str], update: Sequence[str] | None) -> str:
+    if dialect == "mysql":
+        return "" if not update else "ON DUPLICATE KEY UPDATE " + ", ".join(f"{u} = VALUES({u})" for u in update)
+    target = f"ON CONFLICT ({', '.join(key)})"
+    if not update:
+        return f"{target} DO NOTHING"
+    return f"{target} DO UPDATE SET " + ", ".join(f"{u} = excluded.{u}" for u in update)
+
+def build_insert_sql(dialect: str, table: str, columns: Sequence[str], key: Sequence[str],
+                     update: Sequence[str] | None, n_rows: int = 1, placeholder: str = "%s") -> str:
+    """Statement INSERT multi-row (`n_rows` tuple VALUES) dengan semantik ignore/upsert per dialect."""
+    if dialect not in _WRITERS:
+        raise RuntimeError(f"Unsupported dialect for bulk upsert: {dialect}")
+    ignore = " IGNORE" if dialect == "mysql" and not update else ""
+    row = "(" + ", ".join([placeholder] * len(columns)) + ")"
+    return (f"INSERT{ignore} INTO {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([row] * n_rows) + " " + _conflict_clause(dialect, key, update)).rstrip()
+
+def _chunks(rows: List[Row], size: int):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _multi_row(c: Connection, table: str, columns: Sequence[str], key: Sequence[str],
+               update: Sequence[str] | None, rows: List[Row]):
+    size = max(1, min(UPSERT_BATCH_ROWS, _MAX_PARAMS // len(columns)))
+    ph = _placeholder(c)
+    for chunk in _chunks(rows, size):
+        sql = build_insert_sql(c.dialect.name, table, columns, key, update, len(chunk), ph)
+        c.exec_driver_sql(sql, tuple(v for r in chunk for v in r))
+
+def _sqlite(c: Connection, table: str, columns: Sequence[str], key: Sequence[str],
+            update: Sequence[str] | None, rows: List[Row]):
+    c.exec_driver_sql(build_insert_sql("sqlite", table, columns, key, update, 1, "?"), rows)
+
+def _copy_rows(cursor, stage: str, columns: Sequence[str], rows: List[Row]):
+    cols = ", ".join(columns)
+    if hasattr(cursor, "copy_expert"):                       # psycopg2
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)                     # None -> field kosong tanpa kutip = NULL
+        buf.seek(0)
+        cursor.copy_expert(f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+    else:                                                   # psycopg 3
+        with cursor.copy(f"COPY {stage} ({cols}) FROM STDIN") as copy:
+            for r in rows:
+                copy.write_row(r)
+
+def _postgresql(c: Connection, table: str, columns: Sequence[str], key: Sequence[str],
+                update: Sequence[str] | None, rows: List[Row]):
+    if len(rows) < PG_COPY_MIN_ROWS:
+        return _multi_row(c, table, columns, key, update, rows)
+    cols = ", ".join(columns)
+    stage = f"_stage_{table}_{next(_stage_seq)}"
+    c.exec_driver_sql(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {cols} FROM {table} WITH NO DATA")
+    cursor = c.connection.dbapi_connection.cursor()
+    try:
+        _copy_rows(cursor, stage, columns, rows)
+    finally:
+        cursor.close()
+    c.exec_driver_sql(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {stage} "
+                      + _conflict_clause("postgresql", key, update))
+    c.exec_driver_sql(f"DROP TABLE {stage}")
+
+_WRITERS: Dict[str, Callable] = {
+    "mysql": _multi_row,
+    "sqlite": _sqlite,
+    "postgresql": _postgresql,
+}
+
+def _write(c: Connection, table: str, columns: Sequence[str], key: Sequence[str],
+           update: Sequence[str] | None, rows: Sequence[Row]) -> int:
+    rows = list(rows)
+    if not rows:
+        return 0
+    writer = _WRITERS.get(c.dialect.name)
+    if writer is None:
+        raise RuntimeError(f"Unsupported dialect for bulk upsert: {c.dialect.name}")
+    writer(c, table, columns, key, update, rows)
+    return len(rows)
+
+def insert_ignore(c: Connection, table: str, columns: Sequence[str], key: Sequence[str], rows: Sequence[Row]) -> int:
+    """INSERT; baris yang key uniknya sudah ada dilewati. Return jumlah baris yang dikirim."""
+    return _write(c, table, columns, key, None, rows)
+
+def upsert(c: Connection, table: str, columns: Sequence[str], key: Sequence[str], rows: Sequence[Row],
+           update: Sequence[str] | None = None) -> int:
+    """INSERT; bila key sudah ada, kolom `update` (default: semua non-key) ditimpa nilai baru."""
+    update = list(update) if update is not None else [col for col in columns if col not in key]
+    if not update:
+        raise ValueError("upsert needs at least one non-key column to update")
+    return _write(c, table, columns, key, update, rows)
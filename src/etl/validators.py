@@ -1,7 +1,12 @@
 import os
-import pandas as pd
+from typing import TYPE_CHECKING
 from .config import REQUIRED_WEATHER_COLS, REQUIRED_ISPU_COLS
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pandas di-import di dalam fungsi: modul ini juga dipakai entry point untuk cek cepat INCOMING
+
 class ValidationError(Exception): ...
 class MissingColumnsError(ValidationError): ...
 
@@ -15,6 +20,10 @@ def ensure_files_exist(incoming_dir: str, weather_name: str, ispu_name: str):
         raise ValidationError("; ".join(errs))
     return weather_path, ispu_path
 
+def has_incoming_files(incoming_dir: str, weather_name: str, ispu_name: str) -> bool:
+    """True bila minimal salah satu file ada (file yang hilang tetap dilaporkan oleh ensure_files_exist)."""
+    return any(os.path.isfile(os.path.join(incoming_dir, f)) for f in (weather_name, ispu_name))
+
 def infer_city_from_filename(filename: str) -> str:
     # city is the last token before .csv; allow patterns like *_jakarta.csv
     base = os.path.basename(filename)
@@ -27,6 +36,7 @@ def infer_city_from_filename(filename: str) -> str:
     return city
 
 def validate_csv_columns(path: str, required_cols: list[str], allow_extra=True, sep=","):
+    import pandas as pd
     try:
         sample = pd.read_csv(path, nrows=5, sep=sep)
     except Exception as e:
@@ -37,5 +47,6 @@ def validate_csv_columns(path: str, required_cols: list[str], allow_extra=True,
         raise MissingColumnsError(f"{os.path.basename(path)} missing columns: {missing}")
     return True
 
-def read_csv_full(path: str, sep=",") -> pd.DataFrame:
+def read_csv_full(path: str, sep=",") -> "pd.DataFrame":
+    import pandas as pd
     return pd.read_csv(path, sep=sep)
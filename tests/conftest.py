@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import text
+from etl import db
+from etl.config import Paths
+from etl.logging_util import configure_logging, shutdown_logging
+from etl.migrations import upgrade
+
+WEATHER = ["suhu_min", "suhu_max", "suhu_avg", "kelembapan_avg", "curah_hujan", "durasi_penyinaran",
+           "kecepatan_angin_max", "arah_angin_max", "kecepatan_angin_avg"]
+POLLUTANTS = ["pm25", "pm10", "so2", "co", "o3", "no2"]
+
+@pytest.fixture(autouse=True)
+def _isolated_metrics(tmp_path, monkeypatch):
+    """Record RunMetrics ditulis ke tmp_path, bukan LOG/metrics.jsonl milik repo."""
+    monkeypatch.setattr("etl.metrics.METRICS_JSONL", str(tmp_path / "metrics.jsonl"))
+    monkeypatch.setattr("etl.metrics.METRICS_TEXTFILE_DIR", "")
+
+@pytest.fixture(autouse=True)
+def _isolated_logging(tmp_path, monkeypatch):
+    """File log per test di tmp_path (bukan LOG/ milik repo); tiap test mulai dengan handler baru,
+    jadi shutdown_logging() di satu test tidak membuat test berikutnya kehilangan handler."""
+    monkeypatch.setattr(Paths, "LOG_DIR", str(tmp_path / "LOG"))
+    configure_logging(force=True, console=False)
+    yield
+    shutdown_logging()
+
+@pytest.fixture
+def warehouse_url(tmp_path):
+    """SQLite warehouse hasil migrasi dengan dimensi Jakarta (DKI1, DKI2) terisi."""
+    url = f"sqlite:///{tmp_path / 'warehouse.db'}"
+    eng = db.get_engine(url)
+    upgrade(eng)
+    with eng.begin() as c:
+        c.execute(text("INSERT INTO city (city_id, name) VALUES (1, 'jakarta')"))
+        c.execute(text("INSERT INTO location (location_id, city_id, station_code) VALUES (1, 1, 'DKI1'), (2, 1, 'DKI2')"))
+        for code in WEATHER:
+            c.execute(text("INSERT INTO weather_attribute (weatherattr_code) VALUES (:c)"), {"c": code})
+        for code in POLLUTANTS:
+            c.execute(text("INSERT INTO pollutant_attribute (pollutantattr_code) VALUES (:c)"), {"c": code.upper()})
+        c.execute(text("INSERT INTO aqi_category (aqicat_name) VALUES ('BAIK'), ('SEDANG')"))
+    yield url
+    db.dispose_engines()
+
+def write_city_csvs(directory, days, stations=("DKI1", "DKI2 (Kelapa Gading)"), city="jakarta", pm25=60):
+    """Pasangan CSV mentah minimal (kolom REQUIRED_*) untuk `days` ('YYYY-MM-DD')."""
+    w = directory / f"cuaca_harian_{city}.csv"
+    i = directory / f"ispu_harian_{city}.csv"
+    w.write_text("TANGGAL,TN,TX,TAVG,RH_AVG,RR,SS,FF_X,DDD_X,FF_AVG,DDD_CAR\n"
+                 + "".join(f"{d},24,32,28,80,1.5,6,7,180,2,S\n" for d in days))
+    i.write_text("tanggal,stasiun,pm25,pm10,so2,co,o3,no2,max,critical,categori\n"
+                 + "".join(f"{d},{s},{pm25},50,20,10,30,15,60,PM25,SEDANG\n" for d in days for s in stations))
+    return str(w), str(i)
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+import pandas as pd
+from sqlalchemy import text
+from etl import db
+from etl.aggregates import rebuild
+from etl.load import load_all_in_one_transaction
+from etl.periods import month_bounds, week_bounds
+from etl.pipeline.pearson_pipeline import PearsonPipeline
+from etl.sql_stats import track_sql
+from conftest import POLLUTANTS, WEATHER
+
+def test_period_bounds_match_pearson_schedule():
+    p = PearsonPipeline()
+    d = date(2023, 12, 25)
+    while d <= date(2025, 1, 5):
+        if d.weekday() == 6:
+            assert p.get_date_range_weekly(d) == week_bounds(d)
+        if d == month_bounds(d)[1]:
+            assert p.get_date_range_monthly(d) == month_bounds(d)
+            leftover = p.get_leftover_weekly_range_for_month_end(d)
+            assert leftover is None or leftover == week_bounds(d)
+        d += timedelta(days=1)
+
+def _frame(days, base=20.0, kategori=("SEDANG", "BAIK")):
+    rows = []
+    for i, d in enumerate(days):
+        for loc, kat in zip((1, 2), kategori):
+            rows.append({"tanggal": d, "location_id": loc, **{c: base + i + loc for c in WEATHER},
+                         **{c: 10.0 for c in POLLUTANTS}, "kategori_ispu": kat, "polutan_dominan": "PM25"})
+    return pd.DataFrame(rows)
+
+def _obs(c, scope, scope_id, period_name):
+    return c.execute(text("""
+        SELECT n_obs, min_value, max_value, mean_value FROM agg_observation_period a
+        JOIN weather_attribute wa ON wa.weatherattr_id = a.attr_id
+        WHERE a.kind = 'weather' AND wa.weatherattr_code = 'suhu_min'
+          AND scope = :s AND scope_id = :i AND period_name = :p
+    """), {"s": scope, "i": scope_id, "p": period_name}).one()
+
+def _snapshot(c):
+    return (c.execute(text("SELECT scope, scope_id, period_name, period_end, kind, attr_id, n_obs, min_value, "
+                           "max_value, mean_value FROM agg_observation_period ORDER BY 1, 2, 3, 5, 6")).all(),
+            c.execute(text("SELECT scope, scope_id, period_name, aqicat_id, n_days FROM agg_aqi_period "
+                           "ORDER BY 1, 2, 3, 4")).all())
+
+def test_load_maintains_touched_periods_and_rebuild_matches(warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    # Senin 26 Feb s/d Minggu 3 Mar: satu minggu kalender, dua periode WEEK
+    days = ["2024-02-26", "2024-02-27", "2024-02-28", "2024-02-29", "2024-03-01", "2024-03-02", "2024-03-03"]
+    load_all_in_one_transaction(engine, _frame(days))
+    with engine.connect() as c:
+        assert tuple(_obs(c, "station", 1, "WEEK_2024-02-26_2024-02-29")) == (4, 21.0, 24.0, 22.5)
+        assert tuple(_obs(c, "city", 1, "WEEK_2024-03-01_2024-03-03")) == (6, 25.0, 28.0, 26.5)
+        assert tuple(_obs(c, "city", 1, "MONTH_202403")) == (6, 25.0, 28.0, 26.5)
+        aqi = c.execute(text("SELECT n_days FROM agg_aqi_period a JOIN aqi_category k ON k.aqicat_id = a.aqicat_id "
+                             "WHERE scope = 'city' AND period_name = 'MONTH_202402' ORDER BY k.aqicat_name")).scalars().all()
+        assert aqi == [4, 4]                                           # BAIK, SEDANG (hari-stasiun)
+
+    # Koreksi 1 Maret: hanya periode Maret yang berubah, max turun
+    load_all_in_one_transaction(engine, _frame(["2024-03-01"], base=0.0, kategori=("BAIK", "BAIK")))
+    with engine.connect() as c:
+        assert tuple(_obs(c, "station", 2, "MONTH_202403")) == (3, 2.0, 28.0, (2.0 + 27 + 28) / 3)
+        assert tuple(_obs(c, "station", 1, "WEEK_2024-02-26_2024-02-29")) == (4, 21.0, 24.0, 22.5)
+        before = _snapshot(c)
+        c.execute(text("DELETE FROM agg_observation_period"))
+        c.execute(text("DELETE FROM agg_aqi_period"))
+        c.commit()
+
+    report = rebuild(engine)
+    assert report.months == 2
+    with engine.connect() as c:
+        assert _snapshot(c) == before
+
+def test_redelivery_refreshes_only_touched_periods(warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    days = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(90)]   # Jan..Mar
+    load_all_in_one_transaction(engine, _frame(days))
+    with engine.begin() as c:                                  # penanda: baris yang tidak boleh dibangun ulang
+        c.execute(text("UPDATE agg_observation_period SET n_obs = 999 WHERE period_name IN "
+                       "('MONTH_202401', 'WEEK_2024-02-05_2024-02-11', 'WEEK_2024-02-19_2024-02-25')"))
+        c.execute(text("UPDATE agg_aqi_period SET n_days = 999 WHERE period_name = 'MONTH_202403'"))
+
+    df = _frame(days)
+    df.loc[(df["tanggal"] == "2024-02-14") & (df["location_id"] == 1), "suhu_min"] = -5.0
+    with track_sql(engine) as stats:
+        load_all_in_one_transaction(engine, df)
+    with engine.connect() as c:
+        marked = dict(c.execute(text("SELECT period_name, MAX(n_obs) FROM agg_observation_period "
+                                     "WHERE n_obs = 999 GROUP BY period_name")).all())
+        assert set(marked) == {"MONTH_202401", "WEEK_2024-02-05_2024-02-11", "WEEK_2024-02-19_2024-02-25"}
+        assert _obs(c, "station", 1, "WEEK_2024-02-12_2024-02-18").min_value == -5.0
+        assert _obs(c, "city", 1, "MONTH_202402").min_value == -5.0
+        assert c.execute(text("SELECT MAX(n_days) FROM agg_aqi_period")).scalar() == 999  # AQI tidak berubah
+    assert stats.count("DELETE FROM agg_aqi_period") == 0
+
+    with track_sql(engine) as stats:                           # kiriman ulang identik: tanpa refresh
+        load_all_in_one_transaction(engine, df)
+    assert stats.count("agg_observation_period") == 0
@@ -0,0 +1,61 @@
+import datetime
+import pandas as pd
+import pytest
+from etl.archive import ArchiveCatalog, new_batch_id, record_archive, sha256_file
+
+def _clean_frame():
+    return pd.DataFrame({
+        "tanggal": ["2019-02-27", "2019-03-01", "2019-03-31", "2019-04-02"],
+        "location_id": [1.0, 1.0, 2.0, 2.0],
+        "stasiun": ["DKI1", "DKI1", "DKI2", "DKI2"],
+        "pm25": [40.0, 55.0, None, 61.0],
+        "kategori_ispu": ["SEDANG", "SEDANG", "BAIK", "SEDANG"],
+    })
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ArchiveCatalog(str(tmp_path))
+
+def _raw(tmp_path, name, body="a,b\n1,2\n"):
+    p = tmp_path / name
+    p.write_text(body)
+    return str(p)
+
+def test_catalog_answers_coverage_without_opening_files(tmp_path, catalog, monkeypatch):
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    raw = [("raw_weather", _raw(tmp_path, "cuaca_harian_jakarta_1.csv"), 1),
+           ("raw_ispu", _raw(tmp_path, "ispu_harian_jakarta_1.csv", "x\n"), 1)]
+    entries = record_archive("Jakarta", raw, _clean_frame(), batch_id="b1", catalog=catalog)
+    assert {e.kind for e in entries} == {"raw_weather", "raw_ispu"}
+    assert entries[0].sha256 == sha256_file(raw[0][1])
+    assert (entries[0].date_min, entries[0].date_max) == ("2019-02-27", "2019-04-02")
+
+    assert {e.kind for e in catalog.covering("jakarta", "2019-03")} == {"raw_weather", "raw_ispu"}
+    assert catalog.covering("jakarta", "2019-05") == []
+    assert catalog.covering("bandung", "2019-03") == []
+    assert [e.path for e in catalog.batch("b1")] == ["cuaca_harian_jakarta_1.csv", "ispu_harian_jakarta_1.csv"]
+
+def test_parquet_partitions_by_city_year_month(tmp_path, catalog):
+    pytest.importorskip("pyarrow")
+    record_archive("jakarta", [], _clean_frame(), batch_id="b2", catalog=catalog)
+    march = catalog.covering("jakarta", "2019-03", kind="parquet")
+    assert [e.path for e in march] == ["parquet/city=jakarta/year=2019/month=03/part-b2.parquet"]
+    assert (march[0].date_min, march[0].date_max, march[0].rows) == ("2019-03-01", "2019-03-31", 2)
+    back = pd.read_parquet(catalog.abspath(march[0]))
+    assert back["location_id"].dtype == "int32"
+    assert back["tanggal"].tolist() == [pd.Timestamp("2019-03-01").date(), pd.Timestamp("2019-03-31").date()]
+    assert len(catalog.find("jakarta", "2019-01-01", "2019-12-31", kind="parquet")) == 3
+
+def test_raw_batches_pair_ispu_by_city_and_batch_ids_are_unique(tmp_path, catalog, monkeypatch):
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    # arsip lama: dua kota diarsip pada detik yang sama => batch_id sama
+    for city in ("bandung", "jakarta"):
+        record_archive(city, [("raw_weather", _raw(tmp_path, f"cuaca_harian_{city}_1.csv"), 1),
+                              ("raw_ispu", _raw(tmp_path, f"ispu_harian_{city}_1.csv"), 1)],
+                       _clean_frame(), batch_id="20190301_120000", catalog=catalog)
+    [(w, i)] = catalog.raw_batches("jakarta", "2019-03-01", "2019-03-31")
+    assert (w.path, i.path) == ("cuaca_harian_jakarta_1.csv", "ispu_harian_jakarta_1.csv")
+
+    t = datetime.datetime(2024, 3, 1, 12, 0, 0)
+    assert len({new_batch_id(t) for _ in range(50)}) == 50                 # unik pada waktu yang sama
+    assert new_batch_id(t + datetime.timedelta(microseconds=1)) > new_batch_id(t)   # urut waktu
@@ -0,0 +1,35 @@
+import datetime
+import numpy as np
+import pandas as pd
+from etl.batch import ObservationBatch
+
+ATTRS = {"suhu_min": 1, "suhu_max": 2, "pm25": 7}
+
+def test_from_wide_is_typed_attr_major_and_first_row_wins():
+    df = pd.DataFrame({
+        "tanggal": [datetime.date(2024, 3, 1), datetime.date(2024, 3, 1), datetime.date(2024, 3, 1), datetime.date(2024, 3, 2)],
+        "location_id": [1, 2, 1, 1],                                  # baris ke-3 = key ganda
+        "suhu_min": [24.0, None, 99.0, 25.0],
+        "suhu_max": ["31", "x", "0", 32.5],                            # object: teks numerik & sampah
+        "stasiun": ["DKI1", "DKI2", "DKI1", "DKI1"],
+    })
+    b = ObservationBatch.from_wide(df, ATTRS, ["suhu_min", "suhu_max", "kelembapan_avg"])
+    assert (b.location_id.dtype, b.date.dtype, b.attr_id.dtype, b.value.dtype) == \
+        (np.int32, np.dtype("datetime64[D]"), np.int16, np.float64)
+    assert len(b) == 6 and b.nbytes == 6 * 23
+    assert b.attr_id.tolist() == [1, 1, 1, 2, 2, 2]
+    assert b.value.tolist() == [24.0, 0.0, 25.0, 31.0, 0.0, 32.5]       # kosong => 0, dengan valid False
+    assert b.valid.tolist() == [True, False, True, True, False, True]
+    assert b.rows()[:2] == [(1, "2024-03-01", 1, 24.0), (2, "2024-03-01", 1, 0.0)]
+    assert b.scope() == {"locs": [1, 2], "start": "2024-03-01", "end": "2024-03-02"}
+    assert len(ObservationBatch.from_wide(df, ATTRS, ["pm25"])) == 0
+
+def test_keys_match_rows_read_back_from_db():
+    df = pd.DataFrame({"tanggal": pd.to_datetime(["1999-12-31", "2024-02-29"]), "location_id": [300, 7],
+                       "pm25": [1.5, 2.5]})
+    b = ObservationBatch.from_wide(df, ATTRS, ["pm25"])
+    # SQLite mengembalikan string, MySQL date; NULL di DB => valid False
+    db = ObservationBatch.from_rows([(7, "2024-02-29", 7, 2.5), (300, datetime.date(1999, 12, 31), 7, None)])
+    assert pd.Index(db.keys()).get_indexer(b.keys()).tolist() == [1, 0]
+    assert db.valid.tolist() == [True, False]
+    assert len(set(b.keys()) | set(ObservationBatch.from_rows([(300, "1999-12-31", 8, 0.0)]).keys())) == 3
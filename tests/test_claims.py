@@ -0,0 +1,112 @@
+import os, time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from etl.claims import LEASE_FILE, FileClaimer, Heartbeat
+from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+
+W, I = "cuaca_harian_jakarta.csv", "ispu_harian_jakarta.csv"
+
+@pytest.fixture
+def incoming(tmp_path):
+    d = tmp_path / "INCOMING"
+    d.mkdir()
+    (d / W).write_text("w\n")
+    (d / I).write_text("i\n")
+    return str(d)
+
+def test_exactly_one_worker_claims_a_pair(incoming):
+    claimers = [FileClaimer(incoming, worker_id=f"w{n}") for n in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        claims = [c for c in pool.map(lambda c: c.claim(W, I), claimers) if c is not None]
+    assert len(claims) == 1
+    claim = claims[0]
+    assert os.path.isfile(claim.weather_path) and os.path.isfile(claim.ispu_path)
+    assert os.path.isfile(claim.lease_path)
+    assert not os.path.exists(os.path.join(incoming, W))
+    # pecundang tidak meninggalkan direktori kosong
+    assert os.listdir(os.path.join(incoming, ".processing")) == [claim.worker_id]
+
+def test_incomplete_pair_is_left_in_incoming(incoming):
+    os.remove(os.path.join(incoming, I))
+    assert FileClaimer(incoming, worker_id="a").claim(W, I) is None
+    assert os.path.isfile(os.path.join(incoming, W))
+
+def test_stale_lease_is_reclaimed_live_one_is_not(incoming):
+    crashed = FileClaimer(incoming, worker_id="crashed", timeout_s=60)
+    claim = crashed.claim(W, I)
+    other = FileClaimer(incoming, worker_id="b", timeout_s=60)
+    assert other.reclaim_stale() == []            # heartbeat masih baru
+
+    old = time.time() - 120
+    os.utime(claim.lease_path, (old, old))
+    assert sorted(other.reclaim_stale()) == sorted([W, I])
+    assert not os.path.exists(claim.directory)
+    assert other.claim(W, I) is not None
+
+def test_heartbeat_keeps_lease_fresh(incoming):
+    claimer = FileClaimer(incoming, worker_id="a", heartbeat_s=0.01)
+    claim = claimer.claim(W, I)
+    old = time.time() - 1000
+    os.utime(claim.lease_path, (old, old))
+    with Heartbeat(claimer, claim):
+        time.sleep(0.1)
+    assert time.time() - os.path.getmtime(claim.lease_path) < 5
+
+def test_run_claimed_releases_and_moves_failed(incoming, monkeypatch):
+    seen, failed = [], []
+    def boom(self, w, i):
+        seen.append((w, i))
+        raise RuntimeError("bad csv")
+    monkeypatch.setattr(AirWeatherPipeline, "run", boom)
+    def move_failed(self, w, i):
+        failed.append((w, i))
+        os.remove(w); os.remove(i)
+    monkeypatch.setattr(AirWeatherPipeline, "move_failed", move_failed)
+    claimer = FileClaimer(incoming, worker_id="a")
+    pipeline = AirWeatherPipeline(engine=object())
+
+    with pytest.raises(RuntimeError, match="bad csv"):
+        pipeline.run_claimed(W, I, claimer)
+    assert seen == [(os.path.join(claimer.processing, "a", W), os.path.join(claimer.processing, "a", I))]
+    assert failed and os.listdir(claimer.processing) == []
+    # tidak ada lagi yang bisa diklaim
+    assert pipeline.run_claimed(W, I, claimer) is False
+
+def test_release_returns_unprocessed_files(incoming):
+    claimer = FileClaimer(incoming, worker_id="a")
+    claim = claimer.claim(W, I)
+    claimer.release(claim)
+    assert sorted(f for f in os.listdir(incoming) if f != ".processing") == [W, I]
+    assert LEASE_FILE not in os.listdir(incoming)
+
+def test_idle_runner_reclaims_stale_lease(tmp_path, monkeypatch):
+    import argparse, importlib.util
+    from etl.config import Paths
+    incoming = tmp_path / "INCOMING"
+    incoming.mkdir()
+    (incoming / W).write_text("w\n")
+    (incoming / I).write_text("i\n")
+    monkeypatch.setattr(Paths, "INCOMING", str(incoming))
+    claim = FileClaimer(str(incoming), worker_id="crashed", timeout_s=60).claim(W, I)
+    old = time.time() - 3600                            # > LEASE_TIMEOUT_S default
+    os.utime(claim.lease_path, (old, old))
+    assert not {W, I} & set(os.listdir(incoming))      # INCOMING kosong, pasangan tertahan di lease
+
+    seen = []
+    monkeypatch.setattr(AirWeatherPipeline, "__init__", lambda self: None)
+    monkeypatch.setattr(AirWeatherPipeline, "run_claimed", lambda self, w, i: seen.append((w, i)))
+    spec = importlib.util.spec_from_file_location(
+        "schedule_runner", os.path.join(os.path.dirname(__file__), "..", "scripts", "schedule_runner.py"))
+    runner = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(runner)
+    monkeypatch.setenv("WEATHER_CSV", W)
+    monkeypatch.setenv("ISPU_CSV", I)
+    runner.run(argparse.Namespace(today="2024-01-10", granularity="city", workers=None))
+    assert seen == [(W, I)]
+    assert not os.path.exists(claim.directory)
+
+def test_own_worker_id_live_lease_is_not_reclaimed(incoming):
+    # container lain dengan ETL_WORKER_ID sama: lease yang masih hidup tidak boleh direbut
+    claim = FileClaimer(incoming, worker_id="etl-node-1", timeout_s=60).claim(W, I)
+    assert FileClaimer(incoming, worker_id="etl-node-1", timeout_s=60).reclaim_stale() == []
+    assert os.path.isfile(claim.weather_path)
@@ -0,0 +1,14 @@
+import os, subprocess, sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def test_idle_schedule_tick_skips_heavy_imports(tmp_path):
+    env = {**os.environ, "WEATHER_CSV": "__none__.csv", "ISPU_CSV": "__none__.csv", "ETL_LOG_DIR": str(tmp_path)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.join(ROOT, "scripts", "schedule_runner.py"), "--today", "2024-01-10"],
+        capture_output=True, text=True, env=env, cwd=ROOT,
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert "Nothing to do on 2024-01-10" in proc.stderr
+    for heavy in ("pandas", "scipy", "sqlalchemy"):
+        assert f"| {heavy}\n" not in proc.stderr
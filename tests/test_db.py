@@ -0,0 +1,116 @@
+import pytest
+from sqlalchemy import text
+from etl import db
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'airweather.db'}"
+    yield url
+    db.dispose_engines()
+
+def test_engine_registry_returns_one_engine_per_url(sqlite_url):
+    e1 = db.get_engine(sqlite_url)
+    e2 = db.get_engine(sqlite_url)
+    assert e1 is e2
+    assert db.get_session_factory(sqlite_url) is db.get_session_factory(sqlite_url)
+    with db.get_session(sqlite_url) as s:
+        assert s.get_bind() is e1
+
+def test_pool_options_and_metrics(sqlite_url):
+    engine = db.get_engine(sqlite_url, pool_size=2, max_overflow=0)
+    with engine.connect() as c:
+        c.execute(text("SELECT 1"))
+        snap = db.pool_metrics(sqlite_url)
+        assert snap["checked_out"] == 1
+    snap = db.pool_metrics(sqlite_url)
+    assert snap["pool_size"] == 2
+    assert snap["checkouts"] == 1 and snap["checkins"] == 1
+    assert snap["wait_total_s"] >= 0.0
+
+def test_in_memory_sqlite_is_supported():
+    engine = db.get_engine("sqlite://")
+    assert db.fetch_scalar(engine, "SELECT 1", {}) == 1
+    db.dispose_engines()
+
+def test_stream_rows_and_partitions(sqlite_url):
+    engine = db.get_engine(sqlite_url)
+    with engine.begin() as c:
+        c.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v REAL)"))
+        c.execute(text("INSERT INTO t (id, v) VALUES (:id, :v)"), [{"id": i, "v": i / 2} for i in range(25)])
+    rows = list(db.stream_rows(engine, "SELECT id, v FROM t ORDER BY id", {}, yield_per=4))
+    assert [r[0] for r in rows] == list(range(25))
+    parts = list(db.stream_partitions(engine, "SELECT id FROM t ORDER BY id", {}, size=10))
+    assert [len(p) for p in parts] == [10, 10, 5]
+    with db.get_session(sqlite_url) as s:
+        assert len(list(db.stream_rows(s, "SELECT id FROM t WHERE id < :n", {"n": 3}))) == 3
+
+# -----------------------------
+# read replica routing (two SQLite files stand in for primary/replica)
+# -----------------------------
+
+@pytest.fixture
+def primary_and_replica(tmp_path, monkeypatch):
+    primary = f"sqlite:///{tmp_path / 'primary.db'}"
+    replica = f"sqlite:///{tmp_path / 'replica.db'}"
+    for url, name in ((primary, "primary"), (replica, "replica")):
+        with db.get_engine(url).begin() as c:
+            c.execute(text("CREATE TABLE whoami (name TEXT)"))
+            c.execute(text("INSERT INTO whoami VALUES (:n)"), {"n": name})
+    monkeypatch.setattr(db, "DATABASE_URL", primary)
+    yield primary, replica
+    db.configure_replica(None, primary)
+    db.dispose_engines()
+
+def test_reads_go_to_fresh_replica_and_writes_stay_on_primary(primary_and_replica):
+    primary, replica = primary_and_replica
+    db.configure_replica(replica, primary, probe=lambda conn: 1.0, max_lag_s=30)
+    engine = db.get_engine(primary)
+    assert db.get_read_engine(engine) is db.get_engine(replica)
+    assert db.fetch_scalar(engine, "SELECT name FROM whoami", {}) == "replica"
+    # read-your-writes path
+    assert db.fetch_scalar(engine, "SELECT name FROM whoami", {}, primary=True) == "primary"
+    assert db.replica_status(primary)["fresh"] is True
+
+def test_lagging_or_broken_replica_falls_back_to_primary(primary_and_replica):
+    primary, replica = primary_and_replica
+    engine = db.get_engine(primary)
+    db.configure_replica(replica, primary, probe=lambda conn: 120.0, max_lag_s=30)
+    assert db.fetch_scalar(engine, "SELECT name FROM whoami", {}) == "primary"
+
+    def broken(conn):
+        raise RuntimeError("replication stopped")
+    db.configure_replica(replica, primary, probe=broken)
+    assert db.get_read_engine(engine) is engine
+    db.configure_replica(replica, primary, probe=lambda conn: None)
+    assert db.get_read_engine(engine) is engine
+
+def test_lag_check_is_cached_for_interval(primary_and_replica):
+    primary, replica = primary_and_replica
+    calls = []
+    def probe(conn):
+        calls.append(1)
+        return 0.0
+    db.configure_replica(replica, primary, probe=probe, check_interval_s=60)
+    for _ in range(5):
+        db.get_read_engine(db.get_engine(primary))
+    assert len(calls) == 1
+
+def test_pearson_pipeline_reads_from_replica(primary_and_replica):
+    from etl.pipeline.pearson_pipeline import PearsonPipeline
+    primary, replica = primary_and_replica
+    db.configure_replica(replica, primary, probe=lambda conn: 0.0)
+    p = PearsonPipeline()
+    assert p.read_db.execute(text("SELECT name FROM whoami")).scalar() == "replica"
+    assert p.db.execute(text("SELECT name FROM whoami")).scalar() == "primary"
+
+def test_pearson_pipeline_rechecks_replica_lag_per_fetch(primary_and_replica):
+    from etl.pipeline.pearson_pipeline import PearsonPipeline
+    primary, replica = primary_and_replica
+    lag = [0.0]
+    db.configure_replica(replica, primary, probe=lambda conn: lag[0], max_lag_s=30, check_interval_s=0)
+    p = PearsonPipeline()
+    assert p.read_db.execute(text("SELECT name FROM whoami")).scalar() == "replica"
+    lag[0] = 120.0                                          # replica tertinggal di tengah run
+    assert p.read_db.execute(text("SELECT name FROM whoami")).scalar() == "primary"
+    lag[0] = 1.0
+    assert p.read_db.execute(text("SELECT name FROM whoami")).scalar() == "replica"
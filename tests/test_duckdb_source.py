@@ -0,0 +1,96 @@
+import os
+from datetime import date
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from etl import db
+from etl.archive import ArchiveCatalog
+from etl.config import Paths
+from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+from etl.pipeline.pearson_pipeline import PearsonPipeline
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+from etl.duckdb_source import DuckDBPairSource, load_metrics, metrics_from_db, save_metrics  # noqa: E402
+from etl.research import Experiment, run_experiments  # noqa: E402
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    for name in ("INCOMING", "ARCHIVED", "FAILED", "QUARANTINE"):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(Paths, name, str(tmp_path / name))
+    return tmp_path
+
+def _deliver(directory, days, shift=0):
+    """pm25 mengikuti TAVG; DKI9 tidak terdaftar; satu pm25 kosong (=> 0 di DB)."""
+    w = directory / "cuaca_harian_jakarta.csv"
+    i = directory / "ispu_harian_jakarta.csv"
+    w.write_text("TANGGAL,TN,TX,TAVG,RH_AVG,RR,SS,FF_X,DDD_X,FF_AVG,DDD_CAR\n" + "".join(
+        f"{d},{22 + k % 3},{31 + k % 4},{26 + (k * 7) % 5},{70 + (k * 3) % 20},{k % 6},{4 + k % 5},7,180,{1 + k % 3},S\n"
+        for k, d in enumerate(days)))
+    rows = []
+    for k, d in enumerate(days):
+        for j, s in enumerate(("DKI1", "DKI2 (Kelapa Gading)", "DKI9")):
+            pm25 = "" if (k, j) == (3, 1) else 40 + 8 * ((k * 7) % 5) + 5 * j + k % 3 + shift
+            rows.append(f"{d},{s},{pm25},{50 + k},20,10,{30 + (k * 5) % 9},15,60,PM25,SEDANG\n")
+    i.write_text("tanggal,stasiun,pm25,pm10,so2,co,o3,no2,max,critical,categori\n" + "".join(rows))
+    return w.name, i.name
+
+def test_archive_pairs_match_warehouse(dirs, warehouse_url, monkeypatch):
+    engine = db.get_engine(warehouse_url)
+    with engine.begin() as c:
+        c.execute(text("INSERT INTO location (location_id, city_id, station_code) VALUES (6, 1, 'CITY_AGG_JKT')"))
+        c.execute(text("INSERT INTO correlation_metrics (weather_x, pollutant_y) VALUES (3, 1), (4, 5), (1, 2)"))
+    pipeline = AirWeatherPipeline(engine, incremental=False)
+    days = [f"2024-03-{d:02d}" for d in range(1, 21)]
+
+    # Batch lama tanpa Parquet (hanya CSV mentah), lalu koreksi sebagian hari dengan Parquet
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    pipeline.run(*_deliver(dirs / "INCOMING", days))
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", True)
+    pipeline.run(*_deliver(dirs / "INCOMING", days[10:], shift=9))
+    kinds = sorted(e.kind for e in ArchiveCatalog().find("jakarta", "2024-03-01", "2024-03-31"))
+    assert kinds == ["parquet", "raw_ispu", "raw_ispu", "raw_weather", "raw_weather"]
+
+    metrics = metrics_from_db(engine)
+    save_metrics(metrics, str(dirs / "metrics.json"))
+    assert load_metrics(str(dirs / "metrics.json")) == metrics
+    source = DuckDBPairSource("jakarta", metrics, station_map={"DKI1": 1, "DKI2": 2})
+    warehouse = PearsonPipeline(db_session=Session(engine))
+    offline = PearsonPipeline(source=source)
+
+    for start, end, name in ((date(2024, 3, 1), date(2024, 3, 31), "MONTH_202403"),
+                             (date(2024, 3, 11), date(2024, 3, 17), "WEEK_2024-03-11_2024-03-17")):
+        expected = [(m, str(d)[:10], wx, py) for m, d, wx, py in warehouse.fetch_pairs(start, end)]
+        got = [(m, d.isoformat(), wx, py) for m, d, wx, py in offline.fetch_pairs(start, end)]
+        assert [r[:2] for r in got] == [r[:2] for r in expected]
+        assert [r[2:] for r in got] == pytest.approx([r[2:] for r in expected])
+        results = offline.compute_range(start, end, name)
+        assert results == warehouse.compute_range(start, end, name)
+        assert {c for _, c, _ in results} - {"INCONCLUSIVE"}
+    source.close()
+
+    # hari tanpa arsip => kosong
+    assert DuckDBPairSource("jakarta", metrics).fetch_pairs(date(2023, 1, 1), date(2023, 1, 31)) == []
+
+def test_run_experiments_windows_and_lag():
+    class Pairs:
+        def fetch_pairs(self, start, end, city_id=None):
+            self.requested = (start, end)
+            return [(1, date(2024, 3, d), float(d % 5), float((d - 1) % 5)) for d in range(1, 32)]
+
+    src = Pairs()
+    exps = [Experiment("MONTH"), Experiment("MONTH", lag_days=1), Experiment("10D", alpha=0.05)]
+    df = run_experiments(src, date(2024, 3, 1), date(2024, 3, 31), exps)
+    assert src.requested == (date(2024, 3, 1), date(2024, 4, 1))              # fetch sekali + lag terbesar
+    month = df[df["experiment"] == "MONTH/lag0/alpha=default"]
+    lagged = df[df["experiment"] == "MONTH/lag1/alpha=default"]
+    assert month["period_name"].tolist() == ["MONTH_202403"]
+    # wx(d) vs py(d+1) identik => korelasi sempurna; 31 Mar tidak punya pasangan lag
+    assert (lagged["classification"].tolist(), lagged["n_samples"].tolist()) == (["STABLE"], [30])
+    # blok terakhir (31 Mar, 1 titik) dilewati compute_classifications
+    assert df[df["window"] == "10D"]["period_name"].tolist() == [
+        "10D_2024-03-01_2024-03-10", "10D_2024-03-11_2024-03-20", "10D_2024-03-21_2024-03-30"]
+    with pytest.raises(ValueError):
+        Experiment("FORTNIGHT")
@@ -0,0 +1,90 @@
+import pandas as pd
+from etl.extract import commit_state, load_state, merge_outer_by_date, read_incremental
+from etl.transform import clean_and_rename
+
+W_HEADER = "TANGGAL,TN,TX,TAVG,RH_AVG,RR,SS,FF_X,DDD_X,FF_AVG,DDD_CAR\n"
+I_HEADER = "tanggal,stasiun,pm25,pm10,so2,co,o3,no2,max,critical,categori\n"
+
+def _weather(day, tn="24"):
+    return f"2024-03-{day:02d},{tn},32,28,80,1.5,6,7,180,2,S\n"
+
+def _ispu(day, pm25="60"):
+    return "".join(f"2024-03-{day:02d},{s},{pm25 if s == 'DKI1' else 50},50,20,10,30,15,60,PM25,SEDANG\n"
+                   for s in ("DKI1", "DKI2"))
+
+def _clean(w, i):
+    return clean_and_rename(merge_outer_by_date(w, i))[0]
+
+def test_tail_read_matches_full_read(tmp_path):
+    state_dir = str(tmp_path / "state")
+    w, i = tmp_path / "cuaca_harian_jakarta.csv", tmp_path / "ispu_harian_jakarta.csv"
+    w.write_text(W_HEADER + "".join(_weather(d, tn=str(20 + d)) for d in range(1, 6)))
+    i.write_text(I_HEADER + "".join(_ispu(d, pm25=str(40 + d)) for d in range(1, 6)))
+    first = [read_incremental(str(p), col, state_dir) for p, col in ((w, "TANGGAL"), (i, "tanggal"))]
+    assert [r.mode for r in first] == ["full", "full"]
+    for r in first:
+        commit_state(r.pending, state_dir)
+    assert load_state(w.name, state_dir).last_tanggal == "2024-03-05"
+
+    # Append: hari 6 punya nilai kosong/sentinel yang harus di-ffill dari hari 5
+    with open(w, "a") as f:
+        f.write(_weather(6, tn="") + _weather(7, tn="27"))
+    with open(i, "a") as f:
+        f.write(_ispu(6, pm25="") + _ispu(7, pm25="47"))
+    rw = read_incremental(str(w), "TANGGAL", state_dir)
+    ri = read_incremental(str(i), "tanggal", state_dir)
+    assert (rw.mode, rw.cutoff, len(rw.frame)) == ("tail", "2024-03-05", 1 + 2)
+    assert len(ri.frame) == 2 + 4
+
+    inc = _clean(rw.frame, ri.frame)
+    inc = inc[inc["tanggal"] > rw.cutoff].reset_index(drop=True)
+    full = _clean(pd.read_csv(w), pd.read_csv(i))
+    full = full[full["tanggal"] > "2024-03-05"].reset_index(drop=True)
+    pd.testing.assert_frame_equal(inc, full, check_dtype=False)
+    assert inc.loc[inc["tanggal"] == "2024-03-06", "suhu_min"].tolist() == [25.0, 25.0]
+
+def test_rewritten_prefix_falls_back_to_full_read(tmp_path):
+    state_dir = str(tmp_path / "state")
+    w = tmp_path / "cuaca_harian_jakarta.csv"
+    w.write_text(W_HEADER + _weather(1) + _weather(2))
+    commit_state(read_incremental(str(w), "TANGGAL", state_dir).pending, state_dir)
+
+    w.write_text(W_HEADER + _weather(1, tn="19") + _weather(2) + _weather(3))   # koreksi hari 1
+    res = read_incremental(str(w), "TANGGAL", state_dir)
+    assert (res.mode, res.cutoff, len(res.frame)) == ("full", None, 3)
+
+def test_partial_last_line_waits_for_next_delivery(tmp_path):
+    state_dir = str(tmp_path / "state")
+    w = tmp_path / "cuaca_harian_jakarta.csv"
+    w.write_text(W_HEADER + _weather(1))
+    commit_state(read_incremental(str(w), "TANGGAL", state_dir).pending, state_dir)
+    with open(w, "a") as f:
+        f.write(_weather(2) + "2024-03-03,2")                  # baris 3 belum selesai ditulis
+    res = read_incremental(str(w), "TANGGAL", state_dir)
+    assert res.frame["TANGGAL"].tolist() == ["2024-03-01", "2024-03-02"]
+    commit_state(res.pending, state_dir)
+    with open(w, "a") as f:
+        f.write("4,32,28,80,1.5,6,7,180,2,S\n")
+    assert read_incremental(str(w), "TANGGAL", state_dir).frame["TANGGAL"].tolist() == ["2024-03-02", "2024-03-03"]
+
+def test_archive_catalog_records_full_raw_coverage_in_incremental_mode(tmp_path, warehouse_url, monkeypatch):
+    from etl import db
+    from etl.archive import ArchiveCatalog
+    from etl.config import Paths
+    from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+    for name in ("INCOMING", "ARCHIVED", "FAILED", "QUARANTINE", "STATE"):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(Paths, name, str(tmp_path / name))
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    pipeline = AirWeatherPipeline(db.get_engine(warehouse_url), incremental=True)
+    w, i = tmp_path / "INCOMING" / "cuaca_harian_jakarta.csv", tmp_path / "INCOMING" / "ispu_harian_jakarta.csv"
+    for days in (range(1, 4), range(1, 6)):          # kiriman kumulatif: file yang sama tumbuh
+        w.write_text(W_HEADER + "".join(_weather(d) for d in days))
+        i.write_text(I_HEADER + "".join(_ispu(d) for d in days))
+        pipeline.run(w.name, i.name)
+    assert pipeline.last_metrics.info["read_mode"] == "tail"
+
+    raw = ArchiveCatalog().find("jakarta", "2024-03-01", "2024-03-31", kind="raw_weather")
+    assert sorted((e.date_min, e.date_max) for e in raw) == [("2024-03-01", "2024-03-03"), ("2024-03-01", "2024-03-05")]
+    # kiriman kedua mencakup 1 Maret walau hanya hari 4-5 yang dibaca & dimuat
+    assert len(ArchiveCatalog().find("jakarta", "2024-03-01", "2024-03-01", kind="raw_ispu")) == 2
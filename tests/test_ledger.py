@@ -0,0 +1,79 @@
+import os
+import pytest
+from sqlalchemy import text
+from etl import db
+from etl.archive import sha256_file
+from etl.config import Paths
+from etl.ledger import DUPLICATE, FAILED, LOADED, FileLedger
+from etl.pipeline.airweather_pipeline import DUPLICATES_DIR, AirWeatherPipeline
+from conftest import write_city_csvs
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    for name in ("INCOMING", "ARCHIVED", "FAILED", "QUARANTINE"):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(Paths, name, str(tmp_path / name))
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    return tmp_path
+
+def _deliver(dirs, days, pm25=60):
+    w, i = write_city_csvs(dirs / "INCOMING", days, pm25=pm25)
+    return os.path.basename(w), os.path.basename(i), sha256_file(w), sha256_file(i)
+
+def test_identical_redelivery_is_archived_without_parsing(dirs, warehouse_url, monkeypatch):
+    engine = db.get_engine(warehouse_url)
+    ledger = FileLedger(engine)
+    pipeline = AirWeatherPipeline(engine)
+    days = ["2024-03-01", "2024-03-02"]
+
+    w, i, hw, hi = _deliver(dirs, days)
+    pipeline.run(w, i)
+    [loaded] = ledger.entries(hw)
+    assert (loaded.status, loaded.kind, loaded.city, loaded.rows_in, loaded.rows_loaded) == \
+        (LOADED, "raw_weather", "jakarta", 2, 4)
+    assert loaded.duration_s is not None and loaded.run_id
+
+    # Kiriman ulang identik: tidak ada parsing sama sekali
+    def no_parse(*a, **k):
+        raise AssertionError("duplicate delivery must not be parsed")
+    monkeypatch.setattr(AirWeatherPipeline, "prepare", no_parse)
+    _deliver(dirs, days)
+    pipeline.run(w, i)
+    assert [e.status for e in ledger.entries(hw)] == [LOADED, DUPLICATE]
+    assert [e.status for e in ledger.entries(hi)] == [LOADED, DUPLICATE]
+    assert [s.name for s in pipeline.last_metrics.stages] == ["dedupe", "archive"]
+    assert len(os.listdir(dirs / "ARCHIVED" / DUPLICATES_DIR)) == 2
+    assert not os.listdir(dirs / "INCOMING")
+
+def test_changed_file_is_processed(dirs, warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    pipeline = AirWeatherPipeline(engine)
+    w, i, _, _ = _deliver(dirs, ["2024-03-01"])
+    pipeline.run(w, i)
+    # cuaca sama, ISPU dikoreksi => pasangan tetap diproses
+    _, _, _, hi2 = _deliver(dirs, ["2024-03-01"], pm25=75)
+    pipeline.run(w, i)
+    assert [e.status for e in FileLedger(engine).entries(hi2)] == [LOADED]
+    assert pipeline.last_metrics.info["load"]["pollutant"]["updated"] == 2
+    with engine.connect() as c:
+        assert c.execute(text("SELECT COUNT(*) FROM etl_file_ledger WHERE status = 'loaded'")).scalar() == 4
+
+def test_failed_run_is_recorded_and_retried(dirs, warehouse_url, monkeypatch):
+    engine = db.get_engine(warehouse_url)
+    pipeline = AirWeatherPipeline(engine)
+    real_load, calls = AirWeatherPipeline.load, []
+    def load_fails_once(self, df, metrics, chunk_rows=None):
+        calls.append(len(df))
+        if len(calls) == 1:
+            raise RuntimeError("db down")
+        return real_load(self, df, metrics, chunk_rows)
+    monkeypatch.setattr(AirWeatherPipeline, "load", load_fails_once)
+    w, i, hw, hi = _deliver(dirs, ["2024-03-01"])
+    with pytest.raises(RuntimeError, match="db down"):
+        pipeline.run(w, i)
+    [failed] = FileLedger(engine).entries(hw)
+    assert (failed.status, failed.city, failed.rows_loaded) == (FAILED, "jakarta", None)
+    assert failed.duration_s is not None
+    # gagal != dimuat: kiriman berikutnya diproses penuh, bukan diarsip sebagai duplikat
+    pipeline.run(w, i)
+    assert [e.status for e in FileLedger(engine).entries(hi)] == [FAILED, LOADED]
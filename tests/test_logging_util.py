@@ -0,0 +1,50 @@
+import json, logging
+import pytest
+from etl import logging_util
+from etl.logging_util import configure_logging, get_logger, log_context, shutdown_logging
+from etl.metrics import RunMetrics
+
+@pytest.fixture
+def logdir(tmp_path):
+    path = configure_logging(str(tmp_path / "run"), force=True, console=False, fmt="json")
+    yield tmp_path / "run", path
+    shutdown_logging()
+
+def _records(path):
+    shutdown_logging()  # stop listener => queue di-flush ke file
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_single_file_with_context_fields(logdir):
+    tmp_path, path = logdir
+    log_a, log_b = get_logger("etl.a"), get_logger("airweather.b")
+    run = RunMetrics("airweather")
+    with log_context(city="jakarta"):
+        with run.stage("load"):
+            log_a.info("rows=%s", 3)
+        log_b.warning("done")
+    log_a.info("outside")
+
+    recs = _records(path)
+    assert [p.name for p in tmp_path.iterdir()] == [path.rsplit("/", 1)[-1]]
+    assert recs[0] | {"ts": None} == {
+        "ts": None, "level": "INFO", "logger": "etl.a", "run_id": logging_util.run_id(),
+        "city": "jakarta", "stage": "load", "msg": "rows=3",
+    }
+    assert (recs[1]["city"], recs[1]["stage"]) == ("jakarta", None)
+    assert (recs[2]["city"], recs[2]["stage"]) == (None, None)
+    assert run.run_id == logging_util.run_id()
+
+def test_get_logger_does_not_add_handlers(logdir):
+    root = logging.getLogger()
+    before = list(root.handlers)
+    for _ in range(3):
+        get_logger("etl.repeat")
+    assert root.handlers == before
+    assert not logging.getLogger("etl.repeat").handlers
+
+def test_logging_reconfigures_after_shutdown(tmp_path):
+    shutdown_logging()
+    get_logger("etl.after_shutdown").info("still logged")
+    assert logging_util._queue_handler in logging.getLogger().handlers
+    assert logging_util.logfile().startswith(str(tmp_path))
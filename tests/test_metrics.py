@@ -0,0 +1,64 @@
+import json
+from contextlib import contextmanager
+import pytest
+from etl import metrics as m
+
+def test_stage_records_duration_rows_and_current_stage():
+    run = m.RunMetrics("airweather", city="jakarta")
+    assert m.current_stage() is None
+    with run.stage("transform", rows_in=10) as st:
+        assert m.current_stage() == "transform"
+        st.rows_out = 8
+    assert m.current_stage() is None
+    rec = run.finish().to_record()
+    assert rec["pipeline"] == "airweather" and rec["labels"] == {"city": "jakarta"}
+    (stage,) = rec["stages"]
+    assert stage["stage"] == "transform" and stage["rows_in"] == 10 and stage["rows_out"] == 8
+    assert stage["duration_s"] >= 0.0
+
+def test_failed_stage_is_still_recorded():
+    run = m.RunMetrics("pearson")
+    with pytest.raises(ValueError):
+        with run.stage("fetch"):
+            raise ValueError("boom")
+    assert [s.name for s in run.stages] == ["fetch"]
+
+def test_emit_writes_jsonl_and_prometheus_textfile(tmp_path):
+    run = m.RunMetrics("pearson", granularity="city", period="week")
+    run.info["period_name"] = "WEEK_2024-09-01_2024-09-07"
+    with run.stage("write", rows_in=3) as st:
+        st.rows_out = 3
+    jsonl = tmp_path / "metrics.jsonl"
+    run.emit(jsonl_path=str(jsonl), textfile_dir=str(tmp_path / "prom"))
+    rec = json.loads(jsonl.read_text().splitlines()[-1])
+    assert rec["status"] == "ok" and rec["period_name"].startswith("WEEK_")
+    prom = (tmp_path / "prom" / "airweather_pearson_city_week.prom").read_text()
+    assert 'airweather_stage_duration_seconds{pipeline="pearson",granularity="city",period="week",stage="write"}' in prom
+    assert 'airweather_stage_rows{pipeline="pearson",granularity="city",period="week",stage="write",direction="out"} 3' in prom
+    assert 'airweather_run_success{pipeline="pearson",granularity="city",period="week"} 1' in prom
+
+def test_emit_safely_does_not_mask_run_exception(tmp_path, caplog):
+    run = m.RunMetrics("airweather")
+    (tmp_path / "ro").write_text("")                        # file, bukan direktori => makedirs gagal
+    with pytest.raises(KeyError):
+        try:
+            raise KeyError("run failed")
+        finally:
+            assert run.emit_safely(jsonl_path=str(tmp_path / "ro" / "metrics.jsonl")) is None
+    assert "Failed to emit run metrics" in caplog.text
+
+def test_stage_hooks_wrap_every_stage():
+    seen = []
+    @contextmanager
+    def hook(pipeline, stage):
+        seen.append(("enter", pipeline, stage))
+        yield
+        seen.append(("exit", pipeline, stage))
+    m.register_stage_hook(hook)
+    try:
+        run = m.RunMetrics("airweather")
+        with run.stage("load"):
+            pass
+    finally:
+        m.unregister_stage_hook(hook)
+    assert seen == [("enter", "airweather", "load"), ("exit", "airweather", "load")]
@@ -0,0 +1,43 @@
+import pytest
+from sqlalchemy import inspect
+from etl import db
+from etl.migrations import MIGRATIONS, current_version, pending, upgrade
+from etl.query_plans import check_plans
+
+@pytest.fixture
+def engine(tmp_path):
+    yield db.get_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    db.dispose_engines()
+
+def test_upgrade_is_versioned_and_idempotent(engine):
+    assert current_version(engine) == 0
+    assert upgrade(engine) == [m.version for m in MIGRATIONS]
+    assert upgrade(engine) == []
+    assert pending(engine) == []
+    tables = set(inspect(engine).get_table_names())
+    assert {"weather_observation", "pollutant_observation", "aqi_daily", "correlation_result"} <= tables
+
+def test_resolve_index_skipped_when_unique_key_covers_it(engine):
+    upgrade(engine)
+    names = {ix["name"] for ix in inspect(engine).get_indexes("pollutant_observation")}
+    assert "ix_po_attr_date" in names
+    assert "ix_po_loc_date_attr" not in names
+
+def test_check_plans_flags_full_scans_until_indexes_exist(engine):
+    upgrade(engine, target=1)
+    failing = {r.name for r in check_plans(engine) if not r.ok}
+    assert "fetch_pairs" in failing
+    upgrade(engine)
+    results = check_plans(engine)
+    assert all(r.ok for r in results), [(r.name, r.full_scans) for r in results]
+
+def test_mysql_full_index_scan_counts_unless_covering_and_bounded():
+    from etl.query_plans import INDEX_SCAN_MAX_ROWS, _mysql_full_scan
+    aliases = {"wo": "weather_observation"}
+    row = lambda **kw: {"table": "wo", "type": "index", "key": "ix_wo_attr_date", "rows": 100, **kw}
+    assert not _mysql_full_scan(row(), aliases)
+    assert _mysql_full_scan(row(type="ALL", key=None), aliases)
+    assert _mysql_full_scan(row(key="PRIMARY"), aliases)
+    assert _mysql_full_scan(row(rows=INDEX_SCAN_MAX_ROWS + 1), aliases)
+    assert not _mysql_full_scan(row(type="ref"), aliases)
+    assert not _mysql_full_scan(row(table="location", key="PRIMARY"), aliases)
@@ -0,0 +1,63 @@
+from datetime import date
+import pytest
+from etl.partitioning import (
+    PARTITIONED_TABLES, PartitioningError, convert_statements, expected_partitions,
+    maintenance_statements, partition_bounds, pruning_checks,
+)
+from etl.pipeline.pearson_pipeline import FETCH_PAIRS_SQL
+
+WO = PARTITIONED_TABLES["weather_observation"]
+
+def test_partition_bounds_month_and_year():
+    assert partition_bounds(date(2024, 11, 15), date(2025, 1, 3), "month") == [
+        ("p202411", date(2024, 12, 1)), ("p202412", date(2025, 1, 1)), ("p202501", date(2025, 2, 1)),
+    ]
+    assert partition_bounds(date(2014, 1, 1), date(2015, 6, 1), "year") == [
+        ("p2014", date(2015, 1, 1)), ("p2015", date(2016, 1, 1)),
+    ]
+
+def test_convert_statements_extend_pk_and_add_catch_all():
+    pk, part = convert_statements(WO, date(2024, 1, 1), date(2024, 2, 1))
+    assert "ADD PRIMARY KEY (weatherobs_id, weatherobs_date)" in pk
+    assert "PARTITION BY RANGE COLUMNS(weatherobs_date)" in part
+    assert "PARTITION p202401 VALUES LESS THAN ('2024-02-01')" in part
+    assert part.rstrip().endswith("PARTITION pmax VALUES LESS THAN (MAXVALUE)\n)")
+
+def _existing(*names):
+    return [(n, "") for n in names] + [("pmax", "MAXVALUE")]
+
+def test_maintenance_precreates_future_partitions():
+    stmts = maintenance_statements(WO, _existing("p202409", "p202410"), today=date(2024, 10, 20), ahead=2)
+    assert len(stmts) == 1
+    assert "REORGANIZE PARTITION pmax INTO" in stmts[0]
+    assert "p202411" in stmts[0] and "p202412" in stmts[0] and "p202501" not in stmts[0]
+
+def test_maintenance_archive_and_drop_old_partitions():
+    parts = _existing("p202407", "p202408", "p202409", "p202410")
+    drop = maintenance_statements(WO, parts, today=date(2024, 10, 20), ahead=0, retain=2, mode="drop")
+    assert drop == ["ALTER TABLE weather_observation DROP PARTITION p202407",
+                    "ALTER TABLE weather_observation DROP PARTITION p202408"]
+    archive = maintenance_statements(WO, parts, today=date(2024, 10, 20), ahead=0, retain=3, mode="archive")
+    assert "ALTER TABLE weather_observation EXCHANGE PARTITION p202407 WITH TABLE weather_observation_p202407" in archive
+    assert archive[-1] == "ALTER TABLE weather_observation DROP PARTITION p202407"
+
+def test_maintenance_requires_partitioned_table():
+    with pytest.raises(PartitioningError):
+        maintenance_statements(WO, [], today=date(2024, 1, 1))
+
+def test_expected_partitions_for_range():
+    parts = _existing("p2019", "p2020", "p2021")
+    assert expected_partitions(parts, date(2020, 3, 1), date(2020, 3, 31)) == ["p2020"]
+    assert expected_partitions(parts, date(2020, 12, 30), date(2021, 1, 2)) == ["p2020", "p2021"]
+
+def test_pruning_checks_map_aliases_of_hot_query():
+    expected = {"weather_observation": ["p202403"], "pollutant_observation": ["p202403"]}
+    rows = [{"table": "cm", "partitions": None},
+            {"table": "<derived2>", "partitions": None},
+            {"table": "weather_observation", "partitions": "p202403"},       # UNION di derived table
+            {"table": "wo", "partitions": "p202403"},
+            {"table": "lw", "partitions": None},
+            {"table": "po", "partitions": "p202401,p202402,p202403"}]        # join tanpa pruning
+    checks = pruning_checks("fetch_pairs", FETCH_PAIRS_SQL, rows, expected)
+    assert [(c.table, c.ok) for c in checks] == [("weather_observation", True), ("wo", True), ("po", False)]
+    assert not pruning_checks("x", FETCH_PAIRS_SQL, [{"table": "wo", "partitions": None}], expected)[0].ok
@@ -0,0 +1,26 @@
+import pstats, tracemalloc
+from etl.metrics import RunMetrics
+from etl.profiling import profiling
+
+def test_profiling_wraps_each_stage(tmp_path):
+    run = RunMetrics("airweather")
+    with profiling(str(tmp_path), top_n=5, echo=False) as prof:
+        with run.stage("extract"):
+            data = [list(range(100)) for _ in range(200)]
+        with run.stage("transform"):
+            sum(map(sum, data))
+    assert not tracemalloc.is_tracing()
+    assert [(s.pipeline, s.stage) for s in prof.stages] == [("airweather", "extract"), ("airweather", "transform")]
+    extract = prof.stages[0]
+    assert extract.peak_bytes > 0 and extract.top_allocations
+    pstats.Stats(extract.prof_path)  # file .prof valid
+    assert (tmp_path / "01_airweather_extract.prof").exists()
+    assert "airweather.extract" in (tmp_path / "allocations.txt").read_text()
+    assert "airweather.transform" in prof.summary_table()
+
+def test_stages_outside_profiling_are_not_recorded(tmp_path):
+    with profiling(str(tmp_path), echo=False) as prof:
+        pass
+    with RunMetrics("pearson").stage("fetch"):
+        pass
+    assert prof.stages == []
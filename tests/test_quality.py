@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from etl import db
+from etl.config import Paths
+from etl.pipeline.airweather_pipeline import AirWeatherPipeline
+from etl.quality import REASON_COL, DEFAULT_RULES, apply_rules, range_rule, write_quarantine
+from conftest import write_city_csvs
+
+def _frame():
+    return pd.DataFrame({
+        "tanggal": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+        "stasiun": ["DKI1", "DKI1", "DKI9", "DKI2"],
+        "location_id": [1.0, 1.0, np.nan, 2.0],
+        "kelembapan_avg": [80.0, 130.0, 75.0, np.nan],
+        "suhu_min": [24.0, 25.0, 24.0, 33.0],
+        "suhu_max": [32.0, 31.0, 31.0, 30.0],
+        "arah_angin_max": [180.0, 400.0, 90.0, 90.0],
+        "pm25": [40.0, -5.0, 60.0, 55.0],
+    })
+
+def test_rejects_rows_with_reason_codes_and_keeps_good_rows():
+    good, rejected, report = apply_rules(_frame())
+    assert good["tanggal"].tolist() == ["2024-01-01"]
+    assert dict(zip(rejected["tanggal"], rejected[REASON_COL])) == {
+        "2024-01-02": "rh_range;wind_dir_range;pm25_range",
+        "2024-01-03": "unknown_station",
+        "2024-01-04": "temp_min_gt_max",
+    }
+    assert report.rows_in == 4 and report.rows_rejected == 3 and report.rows_ok == 1
+    assert report.violations["rh_range"] == 1 and report.violations["temp_range"] == 0
+    assert "so2_range" not in report.violations       # kolom tidak ada => aturan dilewati
+
+def test_missing_values_are_not_range_violations():
+    df = pd.DataFrame({"kelembapan_avg": [np.nan, 50.0]})
+    good, rejected, _ = apply_rules(df, [range_rule("kelembapan_avg", 0, 100, code="rh_range")])
+    assert len(good) == 2 and rejected.empty
+
+def test_large_frame_is_vectorized(tmp_path):
+    n = 500_000
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"location_id": np.ones(n), "kelembapan_avg": rng.uniform(0, 101, n),
+                       "pm25": rng.uniform(-1, 300, n)})
+    good, rejected, report = apply_rules(df, DEFAULT_RULES)
+    assert len(good) + len(rejected) == n
+    assert report.violations["rh_range"] == int((df["kelembapan_avg"] > 100).sum())
+    path = write_quarantine(rejected.head(3), "Jakarta", "b1", directory=str(tmp_path))
+    assert path.endswith("quarantine_jakarta_b1.csv")
+    assert pd.read_csv(path)[REASON_COL].notna().all()
+
+@pytest.fixture
+def dirs(tmp_path, monkeypatch):
+    for name in ("INCOMING", "ARCHIVED", "FAILED", "QUARANTINE"):
+        (tmp_path / name).mkdir()
+        monkeypatch.setattr(Paths, name, str(tmp_path / name))
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    return tmp_path
+
+def _quarantined(dirs):
+    [name] = os.listdir(dirs / "QUARANTINE")
+    return pd.read_csv(dirs / "QUARANTINE" / name)
+
+def test_pipeline_quarantines_unregistered_station(dirs, warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    w, i = write_city_csvs(dirs / "INCOMING", ["2024-03-01", "2024-03-02"], stations=("DKI1", "DKI9"))
+    AirWeatherPipeline(engine).run(os.path.basename(w), os.path.basename(i))
+    q = _quarantined(dirs)
+    assert set(q["stasiun"]) == {"DKI9"} and set(q[REASON_COL]) == {"unknown_station"}
+    with engine.connect() as c:
+        assert c.execute(text("SELECT DISTINCT location_id FROM aqi_daily")).scalars().all() == [1]
+
+def test_quarantine_written_before_load(dirs, warehouse_url, monkeypatch):
+    def failing_load(self, df, metrics, chunk_rows=None):
+        raise RuntimeError("db down")
+    monkeypatch.setattr(AirWeatherPipeline, "load", failing_load)
+    w, i = write_city_csvs(dirs / "INCOMING", ["2024-03-01"], stations=("DKI1", "DKI9"))
+    with pytest.raises(RuntimeError, match="db down"):
+        AirWeatherPipeline(db.get_engine(warehouse_url)).run(os.path.basename(w), os.path.basename(i))
+    assert list(_quarantined(dirs)["stasiun"]) == ["DKI9"]
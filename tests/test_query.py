@@ -0,0 +1,159 @@
+import datetime, json, shutil, threading, time, urllib.error, urllib.request
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from etl import db, query
+from etl.load import load_all_in_one_transaction
+from etl.query import QueryCache, aqi_daily, city_daily_series, latest_correlations
+from etl.query_server import make_server
+from etl.sql_stats import track_sql
+from conftest import POLLUTANTS, WEATHER
+
+D = datetime.date
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(query, "CACHE", QueryCache())
+
+def _frame(days, pm25=(60, 40)):
+    rows = []
+    for d in days:
+        for loc, v in zip((1, 2), pm25):
+            rows.append({"tanggal": d, "location_id": loc, **{c: 1.0 for c in WEATHER},
+                         **{c: 10.0 for c in POLLUTANTS}, "pm25": float(v),
+                         "kategori_ispu": "SEDANG", "polutan_dominan": "PM25"})
+    return pd.DataFrame(rows)
+
+def test_series_is_cached_and_invalidated_by_overlapping_loads(warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    load_all_in_one_transaction(engine, _frame(["2024-03-01", "2024-03-02"]))
+    args = ("jakarta", "pm25", D(2024, 3, 1), D(2024, 3, 2))
+
+    first = city_daily_series(*args, engine=engine)
+    assert [(v.date, v.value, v.stations) for v in first] == [(D(2024, 3, 1), 50.0, 2), (D(2024, 3, 2), 50.0, 2)]
+    with track_sql(engine) as stats:
+        assert city_daily_series(*args, engine=engine) == first
+    assert stats.total == 0
+
+    # Rentang lain / data identik: entri tetap
+    load_all_in_one_transaction(engine, _frame(["2024-04-01"]))
+    load_all_in_one_transaction(engine, _frame(["2024-03-02"]))
+    assert query.CACHE.stats()["invalidated"] == 0
+
+    load_all_in_one_transaction(engine, _frame(["2024-03-02"], pm25=(80, 40)))
+    assert [v.value for v in city_daily_series(*args, engine=engine)] == [50.0, 60.0]
+    aqi = aqi_daily("Jakarta", D(2024, 3, 1), D(2024, 3, 1), engine=engine)
+    assert [(a.station_code, a.category, a.dominant_pollutant) for a in aqi] == \
+        [("DKI1", "SEDANG", "PM25"), ("DKI2", "SEDANG", "PM25")]
+
+    with pytest.raises(ValueError):
+        city_daily_series("jakarta", "no_such_attr", D(2024, 3, 1), D(2024, 3, 2), engine=engine)
+
+def test_latest_correlations_picks_latest_period_and_run(warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    with engine.begin() as c:
+        c.execute(text("INSERT INTO location (location_id, city_id, station_code) VALUES (6, 1, 'CITY_AGG_JKT')"))
+        c.execute(text("INSERT INTO correlation_metrics (corrmet_id, weather_x, pollutant_y) VALUES (1, 1, 1)"))
+        c.execute(text("INSERT INTO correlation_flag (corrflag_id, corrflag_desc) VALUES (1, 'STRONG'), (2, 'WEAK')"))
+        for period, proc, flag in (("WEEK_2024-03-04_2024-03-10", "2024-03-10", 1),
+                                   ("WEEK_2024-03-11_2024-03-17", "2024-03-17", 1),
+                                   ("WEEK_2024-03-11_2024-03-17", "2024-03-18", 2),   # dihitung ulang
+                                   ("MONTH_202403", "2024-03-31", 1)):
+            c.execute(text("INSERT INTO correlation_result (location_id, corrmet_id, period_name, processing_date, "
+                           "val_result, n_samples) VALUES (6, 1, :p, :d, :f, 7)"), {"p": period, "d": proc, "f": flag})
+    [flag] = latest_correlations("jakarta", "week", engine=engine)
+    assert (flag.period_name, flag.flag, flag.weather_attr, flag.pollutant_attr, flag.processing_date) == \
+        ("WEEK_2024-03-11_2024-03-17", "WEAK", "suhu_min", "PM25", D(2024, 3, 18))
+    [old] = latest_correlations("jakarta", "WEEK", "WEEK_2024-03-04_2024-03-10", engine=engine)
+    assert old.flag == "STRONG"
+
+    # hasil korelasi tidak terikat rentang => selalu dibuang; lookup city_id tetap
+    assert query.invalidate(["correlation_result"], D(2024, 3, 11), D(2024, 3, 17)) == 2
+    assert query.CACHE.stats()["size"] == 1
+
+def test_cache_lru_ttl_and_shared_invalidation_log(tmp_path, monkeypatch):
+    now = [0.0]
+    log = tmp_path / "invalidations.jsonl"
+    cache = QueryCache(maxsize=2, ttl_s=10, invalidation_log=str(log), clock=lambda: now[0])
+    calls = []
+    def get(key, start=None, end=None):
+        return cache.get_or_load(key, lambda primary: calls.append(key) or key, ["aqi_daily"], start, end)
+
+    get("a", D(2024, 1, 1), D(2024, 1, 31)); get("b"); get("a"); get("c")     # "b" paling lama dipakai
+    assert calls == ["a", "b", "c"] and cache.stats()["evictions"] == 1
+    now[0] = 11
+    get("a", D(2024, 1, 1), D(2024, 1, 31))
+    assert calls[-1] == "a"                                                  # TTL habis => load ulang
+
+    # proses ETL lain menulis invalidasi ke file bersama
+    monkeypatch.setattr(query, "QUERY_INVALIDATION_LOG", str(log))
+    query.invalidate(["aqi_daily"], "2024-02-01", "2024-02-29")
+    get("a")
+    assert calls[-1] == "a" and len(calls) == 4                              # tidak beririsan
+    query.invalidate(["aqi_daily"], "2024-01-31", "2024-02-01")
+    with open(log, "a") as f:
+        f.write('{"tables": ["aqi_daily"]')                                  # baris belum lengkap
+    get("a")
+    assert len(calls) == 5
+
+def test_first_load_after_invalidation_reads_primary(warehouse_url, tmp_path):
+    engine = db.get_engine(warehouse_url)
+    load_all_in_one_transaction(engine, _frame(["2024-03-01"]))
+    replica = f"sqlite:///{tmp_path / 'replica.db'}"
+    shutil.copy(tmp_path / "warehouse.db", tmp_path / "replica.db")        # replica berhenti di sini
+    db.configure_replica(replica, warehouse_url, probe=lambda conn: 0.0)   # ... tapi mengaku segar
+    try:
+        args = ("jakarta", "pm25", D(2024, 3, 1), D(2024, 3, 1))
+        assert [v.value for v in city_daily_series(*args, engine=engine)] == [50.0]
+        load_all_in_one_transaction(engine, _frame(["2024-03-01"], pm25=(80, 40)))
+        before = query.CACHE.stats()["primary_loads"]
+        assert [v.value for v in city_daily_series(*args, engine=engine)] == [60.0]
+        assert [v.value for v in city_daily_series("jakarta", "pm25", D(2024, 4, 1), D(2024, 4, 2),
+                                                   engine=engine)] == []       # tidak beririsan => replica
+        assert query.CACHE.stats()["primary_loads"] == before + 1
+    finally:
+        db.configure_replica(None, warehouse_url)
+
+def test_primary_window_expires():
+    now = [0.0]
+    cache = QueryCache(ttl_s=100, clock=lambda: now[0], primary_window_s=30)
+    seen = []
+    def get(key):
+        return cache.get_or_load(key, lambda primary: seen.append(primary), ["aqi_daily"], D(2024, 1, 1), D(2024, 1, 1))
+    cache.invalidate(["aqi_daily"], D(2024, 1, 1), D(2024, 1, 1))
+    get("a"); get("a")
+    now[0] = 31
+    get("b")
+    assert seen == [True, False]                              # hit kedua tidak me-load; "b" setelah jendela
+
+def test_invalidation_log_is_compacted(tmp_path, monkeypatch):
+    log = tmp_path / "invalidations.jsonl"
+    old = json.dumps({"tables": ["aqi_daily"], "start": None, "end": None, "ts": time.time() - 3600}) + "\n"
+    log.write_text(old * 50)
+    monkeypatch.setattr(query, "QUERY_INVALIDATION_LOG", str(log))
+    monkeypatch.setattr(query, "QUERY_INVALIDATION_LOG_MAX_BYTES", 1000)
+    cache = QueryCache(ttl_s=300, invalidation_log=str(log))
+    calls = []
+    cache.get_or_load("a", lambda primary: calls.append(1), ["aqi_daily"], D(2024, 5, 1), D(2024, 5, 1))
+    query.invalidate(["aqi_daily"], "2024-05-01", "2024-05-01")
+    assert len(log.read_text().splitlines()) == 1             # hanya entri dalam TTL
+    cache.get_or_load("a", lambda primary: calls.append(1), ["aqi_daily"], D(2024, 5, 1), D(2024, 5, 1))
+    assert len(calls) == 2 and cache.stats()["invalidated"] == 1
+
+def test_http_endpoint(warehouse_url):
+    engine = db.get_engine(warehouse_url)
+    load_all_in_one_transaction(engine, _frame(["2024-03-01"]))
+    server = make_server("127.0.0.1", 0, engine)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/v1/series?city=jakarta&attribute=suhu_min&start=2024-03-01&end=2024-03-31") as r:
+            assert json.load(r) == [{"date": "2024-03-01", "value": 1.0, "stations": 2}]
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"{base}/v1/aqi?city=jakarta&start=2024-03-31&end=2024-03-01")
+        assert err.value.code == 400 and "before start" in json.load(err.value)["error"]
+        with urllib.request.urlopen(f"{base}/v1/cache") as r:
+            assert json.load(r)["misses"] >= 1
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,75 @@
+import os, shutil
+from pathlib import Path
+from datetime import date
+import pandas as pd
+from sqlalchemy import text
+from etl import db
+from etl.archive import ArchiveCatalog, record_archive, sha256_file
+from etl.replay import _overlap_groups, replay, select_batches
+from conftest import write_city_csvs
+
+def _archive_batch(root, batch_id, month, day_nums=(1, 2, 3), pm25=60):
+    days = [f"2024-{month:02d}-{d:02d}" for d in day_nums]
+    src = Path(root) / "src"
+    src.mkdir(exist_ok=True)
+    w = os.path.join(root, f"cuaca_harian_jakarta_{batch_id}.csv")
+    i = os.path.join(root, f"ispu_harian_jakarta_{batch_id}.csv")
+    for s, dst in zip(write_city_csvs(src, days, pm25=pm25), (w, i)):
+        shutil.move(s, dst)
+    clean = pd.DataFrame({"tanggal": days})
+    record_archive("jakarta", [("raw_weather", w, len(days)), ("raw_ispu", i, 2 * len(days))], clean,
+                   batch_id=batch_id, catalog=ArchiveCatalog(root))
+    return w, i
+
+def test_replay_reloads_range_without_touching_archive(tmp_path, warehouse_url, monkeypatch):
+    url = warehouse_url
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    root = str(tmp_path / "archive")
+    os.makedirs(root)
+    files = [*_archive_batch(root, "b1", 1), *_archive_batch(root, "b2", 2), *_archive_batch(root, "b3", 3)]
+    before = {p: sha256_file(p) for p in files}
+    catalog = ArchiveCatalog(root)
+
+    assert [b for b, _, _ in select_batches(catalog, "jakarta", date(2024, 1, 2), date(2024, 2, 28))] == ["b1", "b2"]
+
+    report = replay("Jakarta", date(2024, 1, 2), date(2024, 2, 28), url=url, catalog=catalog, chunk_rows=1)
+    # b1: 2 hari x 2 stasiun, b2: 3 hari x 2 stasiun
+    assert [(b.batch_id, b.rows) for b in report.batches] == [("b1", 4), ("b2", 6)]
+    assert report.rows == 10 and report.rows_per_s > 0
+    with db.get_engine(url).connect() as c:
+        n = c.execute(text("SELECT COUNT(*) FROM aqi_daily")).scalar()
+    assert n == 10
+
+    # Arsip dibaca di tempat: tidak dipindah, tidak berubah, katalog tidak bertambah
+    assert {p: sha256_file(p) for p in files} == before
+    assert len(catalog.find("jakarta", date(2024, 1, 1), date(2024, 12, 31))) == 6
+
+    # Replay ulang idempotent
+    replay("jakarta", date(2024, 1, 2), date(2024, 2, 28), url=url, catalog=catalog)
+    with db.get_engine(url).connect() as c:
+        assert c.execute(text("SELECT COUNT(*) FROM aqi_daily")).scalar() == 10
+
+def test_parallel_replay_keeps_latest_batch_for_overlapping_dates(tmp_path, warehouse_url, monkeypatch):
+    monkeypatch.setattr("etl.archive.ARCHIVE_PARQUET", False)
+    root = str(tmp_path / "archive")
+    os.makedirs(root)
+    # b1 (lama) dan b2 (koreksi) beririsan 2-3 Jan; b3 lepas => kelompok paralel sendiri
+    _archive_batch(root, "b1", 1, (2, 3, 4), pm25=60)
+    _archive_batch(root, "b2", 1, (1, 2, 3), pm25=75)
+    _archive_batch(root, "b3", 3, pm25=90)
+    pairs = ArchiveCatalog(root).raw_batches("jakarta", date(2024, 1, 1), date(2024, 3, 31))
+    groups = _overlap_groups(pairs, date(2024, 1, 1), date(2024, 3, 31))
+    assert [[w.batch_id for w, _ in g] for g in groups] == [["b1", "b2"], ["b3"]]
+    report = replay("jakarta", date(2024, 1, 1), date(2024, 3, 31), workers=2,
+                    url=warehouse_url, catalog=ArchiveCatalog(root))
+    assert report.workers == 2
+    assert [b.batch_id for b in report.batches] == ["b1", "b2", "b3"]
+    with db.get_engine(warehouse_url).connect() as c:
+        pm25 = dict(c.execute(text(
+            "SELECT po.pollobs_date, MAX(po.pollobs_value) FROM pollutant_observation po "
+            "JOIN pollutant_attribute pa ON pa.pollutantattr_id = po.pollutantattr_id "
+            "WHERE pa.pollutantattr_code = 'PM25' GROUP BY po.pollobs_date")).all())
+    assert {str(d)[:10]: v for d, v in pm25.items()} == {
+        "2024-01-01": 75, "2024-01-02": 75, "2024-01-03": 75, "2024-01-04": 60,
+        "2024-03-01": 90, "2024-03-02": 90, "2024-03-03": 90,
+    }
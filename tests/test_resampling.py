@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.stats import pearsonr, spearmanr
+from etl.resampling import ResamplingConfig, rank_rows, pearson_rows, resample_correlations
+
+def _series():
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=7)
+    return {
+        1: (x, 2.0 * x + rng.normal(scale=0.05, size=7)),  # almost perfect
+        2: (x, rng.normal(size=7)),                          # noise
+        3: (rng.normal(size=30), rng.normal(size=30)),       # different n => own batch
+    }
+
+def test_rank_rows_averages_ties():
+    r = rank_rows(np.array([[3.0, 1.0, 3.0, 2.0]]))
+    assert r.tolist() == [[3.5, 1.0, 3.5, 2.0]]
+
+def test_observed_values_match_scipy():
+    series = _series()
+    out = resample_correlations(series, ResamplingConfig(n_permutations=50, n_bootstrap=50, seed=1))
+    for k, (x, y) in series.items():
+        assert np.isclose(out[k].pearson_r, pearsonr(x, y)[0])
+        assert np.isclose(out[k].spearman_rho, spearmanr(x, y)[0])
+
+def test_seed_is_reproducible_and_memory_cap_does_not_change_results():
+    series = _series()
+    a = resample_correlations(series, ResamplingConfig(n_permutations=300, n_bootstrap=300, seed=42))
+    b = resample_correlations(series, ResamplingConfig(n_permutations=300, n_bootstrap=300, seed=42,
+                                                       max_batch_bytes=4096))
+    assert a == b
+
+def test_strong_correlation_is_significant_and_ci_excludes_zero():
+    out = resample_correlations(_series(), ResamplingConfig(n_permutations=2000, n_bootstrap=1000, seed=7))
+    strong, noise = out[1], out[2]
+    # 7 points => at most 1/5040 permutations as extreme as the identity
+    assert strong.p_p < 0.01 and strong.ci_p[0] > 0
+    assert noise.p_p > strong.p_p
+
+def test_pearson_rows_zero_variance_is_nan():
+    r = pearson_rows(np.array([[1.0, 1.0, 1.0]]), np.array([[1.0, 2.0, 3.0]]))
+    assert np.isnan(r[0])
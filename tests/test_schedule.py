@@ -1,43 +1,47 @@
 import sys, types
 # ---- Lightweight stubs to avoid heavy deps ----
-sqlalchemy = types.ModuleType("sqlalchemy")
-def _text(x): return x
-class _Engine: pass
-sqlalchemy.text = _text
-sqlalchemy.create_engine = lambda *a, **k: _Engine()
-sqlalchemy.engine = types.ModuleType("sqlalchemy.engine")
-sqlalchemy.engine.Engine = _Engine
-sqlalchemy.orm = types.ModuleType("sqlalchemy.orm")
-class Session: pass
-sqlalchemy.orm.Session = Session
-def _sessionmaker(**kw):
-    def _factory(*a, **k):
-        class _S:
-            def __enter__(self): return self
-            def __exit__(self, *a): return False
-            def execute(self, *a, **k):
-                class R:
-                    def scalar(self): return 1
-                    def mappings(self):
-                        class M:
-                            def first(self): return {}
-                            def all(self): return []
-                        return M()
-                return R()
-        return _S()
-    return _factory
-sqlalchemy.orm.sessionmaker = _sessionmaker
-sys.modules['sqlalchemy'] = sqlalchemy
-sys.modules['sqlalchemy.engine'] = sqlalchemy.engine
-sys.modules['sqlalchemy.orm'] = sqlalchemy.orm
-
-scipy = types.ModuleType("scipy")
-stats = types.ModuleType("scipy.stats")
-stats.pearsonr = lambda x, y: (0.0, 1.0)
-stats.spearmanr = lambda x, y: (0.0, 1.0)
-scipy.stats = stats
-sys.modules['scipy'] = scipy
-sys.modules['scipy.stats'] = stats
+# (only when the real packages are not installed)
+try:
+    import sqlalchemy.orm, scipy.stats  # noqa: F401
+except ImportError:
+    sqlalchemy = types.ModuleType("sqlalchemy")
+    def _text(x): return x
+    class _Engine: pass
+    sqlalchemy.text = _text
+    sqlalchemy.create_engine = lambda *a, **k: _Engine()
+    sqlalchemy.engine = types.ModuleType("sqlalchemy.engine")
+    sqlalchemy.engine.Engine = _Engine
+    sqlalchemy.orm = types.ModuleType("sqlalchemy.orm")
+    class Session: pass
+    sqlalchemy.orm.Session = Session
+    def _sessionmaker(**kw):
+        def _factory(*a, **k):
+            class _S:
+                def __enter__(self): return self
+                def __exit__(self, *a): return False
+                def execute(self, *a, **k):
+                    class R:
+                        def scalar(self): return 1
+                        def mappings(self):
+                            class M:
+                                def first(self): return {}
+                                def all(self): return []
+                            return M()
+                    return R()
+            return _S()
+        return _factory
+    sqlalchemy.orm.sessionmaker = _sessionmaker
+    sys.modules['sqlalchemy'] = sqlalchemy
+    sys.modules['sqlalchemy.engine'] = sqlalchemy.engine
+    sys.modules['sqlalchemy.orm'] = sqlalchemy.orm
+
+    scipy = types.ModuleType("scipy")
+    stats = types.ModuleType("scipy.stats")
+    stats.pearsonr = lambda x, y: (0.0, 1.0)
+    stats.spearmanr = lambda x, y: (0.0, 1.0)
+    scipy.stats = stats
+    sys.modules['scipy'] = scipy
+    sys.modules['scipy.stats'] = stats
 # -----------------------------------------------
 
 import pytest
@@ -306,3 +310,85 @@ def test_fetch_pairs_calls_execute_with_bounds(monkeypatch):
     # the pipeline passes city_id implicitly (default)
     assert 'city_id' in captured['params']
     assert captured['params']['city_id'] == DEFAULT_CITY_ID
+
+def test_process_range_resampling_mode(monkeypatch):
+    import numpy as np
+    from etl.resampling import ResamplingConfig
+    p = PearsonPipeline(resampling=ResamplingConfig(n_permutations=500, n_bootstrap=500, seed=3))
+    fdb = FakeDB()
+    p.db = fdb
+    xs = np.arange(1.0, 8.0)
+    rows = [(1, date(2024, 9, i + 1), float(x), float(3 * x + 1)) for i, x in enumerate(xs)]
+    rows += [(2, date(2024, 9, i + 1), float(x), 5.0) for i, x in enumerate(xs)]  # zero variance
+    monkeypatch.setattr(p, "fetch_pairs", fp_rows(rows))
+    # parametric path must not be used in resampling mode
+    import etl.pipeline.pearson_pipeline as mod
+    monkeypatch.setattr(mod, "pearsonr", lambda x, y: pytest.fail("pearsonr called"))
+    inserted = p._process_range(date(2024, 9, 1), date(2024, 9, 7), "WEEK_2024-09-01_2024-09-07", date(2024, 9, 8))
+    assert inserted == 2
+    descs = {params["corr"]: params["desc"] for _, params in fdb.exec_calls}
+    assert descs == {1: "STABLE", 2: "INCONCLUSIVE"}
+
+def test_classify_inconclusive_when_both_cis_span_zero():
+    p = PearsonPipeline()
+    assert p.classify(0.8, 0.78, 30, "MONTH_202401", ci_p=(-0.1, 0.9), ci_s=(-0.2, 0.9)) == "INCONCLUSIVE"
+    assert p.classify(0.8, 0.78, 30, "MONTH_202401", ci_p=(0.4, 0.9), ci_s=(-0.2, 0.9)) == "STABLE"
+
+@pytest.mark.skipif("fork" not in __import__("multiprocessing").get_all_start_methods(), reason="needs fork")
+def test_process_range_by_station_writes_each_location(monkeypatch):
+    import functools, multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    import etl.pipeline.pearson_pipeline as mod
+    # pearsonr/spearmanr di-monkeypatch di proses ini: worker harus fork (bukan spawn/forkserver,
+    # default baru di Python 3.14) supaya ikut mewarisi patch-nya
+    monkeypatch.setattr(mod, "ProcessPoolExecutor",
+                        functools.partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context("fork")))
+    p = PearsonPipeline(granularity="station", max_workers=2)
+    fdb = FakeDB()
+    p.db = fdb
+    rows = []
+    for loc in (1, 2, 3):
+        for i in range(7):
+            rows.append((10, loc, date(2024, 9, i + 1), float(i), float(2 * i + loc)))
+    monkeypatch.setattr(p, "fetch_pairs_by_station", fp_rows(rows))
+    monkeypatch.setattr(mod, "pearsonr",  lambda x, y: (0.85, 0.0))
+    monkeypatch.setattr(mod, "spearmanr", lambda x, y: (0.83, 0.0))
+    inserted = p._process_range(date(2024, 9, 1), date(2024, 9, 7), "WEEK_2024-09-01_2024-09-07", date(2024, 9, 8))
+    assert inserted == 3
+    assert fdb.commits == 1
+    written = sorted((params["loc"], params["corr"], params["desc"]) for _, params in fdb.exec_calls)
+    assert written == [(1, 10, "STABLE"), (2, 10, "STABLE"), (3, 10, "STABLE")]
+
+def test_map_bounded_keeps_in_flight_tasks_bounded():
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from etl.pipeline.pearson_pipeline import _map_bounded
+    done, peak = [], []
+    def tasks():
+        for i in range(12):
+            peak.append(i - len(done))   # task sudah diambil tapi belum selesai
+            yield i
+    def work(i):
+        time.sleep(0.005)
+        done.append(i)
+        return i * i
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        out = _map_bounded(pool, work, tasks(), max_in_flight=3)
+    assert out == [i * i for i in range(12)]
+    assert max(peak) <= 3
+
+def test_unknown_granularity_rejected():
+    with pytest.raises(ValueError):
+        PearsonPipeline(granularity="district")
+
+def test_process_range_records_stage_metrics(monkeypatch):
+    p = PearsonPipeline()
+    p.db = FakeDB()
+    rows = [(1, date(2024, 9, d), float(d), float(d * d)) for d in range(1, 8)]
+    monkeypatch.setattr(p, "fetch_pairs", fp_rows(rows))
+    p._process_range(date(2024, 9, 1), date(2024, 9, 7), "WEEK_2024-09-01_2024-09-07", date(2024, 9, 8))
+    rec = p.last_metrics.to_record()
+    assert rec["status"] == "ok" and rec["labels"]["period"] == "week"
+    assert [(s["stage"], s["rows_in"], s["rows_out"]) for s in rec["stages"]] == [
+        ("fetch", None, 7), ("compute", 7, 1), ("write", 1, 1),
+    ]
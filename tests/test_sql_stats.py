@@ -0,0 +1,135 @@
+from datetime import date
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from etl import db
+from etl.load import insert_aqi_daily, insert_weather_and_pollutants, load_all_in_one_transaction
+from etl.metrics import RunMetrics
+from etl.migrations import upgrade
+from etl.pipeline.pearson_pipeline import PearsonPipeline
+from etl.sql_stats import normalize_sql, track_sql
+
+WEATHER = ["suhu_min", "suhu_max", "suhu_avg", "kelembapan_avg", "curah_hujan", "durasi_penyinaran",
+           "kecepatan_angin_max", "arah_angin_max", "kecepatan_angin_avg"]
+POLLUTANTS = ["pm25", "pm10", "so2", "co", "o3", "no2"]
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = db.get_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+    upgrade(eng)
+    with eng.begin() as c:
+        c.execute(text("INSERT INTO city (city_id, name) VALUES (1, 'jakarta')"))
+        c.execute(text("INSERT INTO location (location_id, city_id, station_code) VALUES (1, 1, 'DKI1'), (2, 1, 'DKI2')"))
+        for code in WEATHER:
+            c.execute(text("INSERT INTO weather_attribute (weatherattr_code) VALUES (:c)"), {"c": code})
+        for code in POLLUTANTS:
+            c.execute(text("INSERT INTO pollutant_attribute (pollutantattr_code) VALUES (:c)"), {"c": code.upper()})
+        c.execute(text("INSERT INTO aqi_category (aqicat_name) VALUES ('BAIK'), ('SEDANG')"))
+    yield eng
+    db.dispose_engines()
+
+def _frame(days: int = 5) -> pd.DataFrame:
+    rows = []
+    for d in range(1, days + 1):
+        for loc in (1, 2):
+            row = {"tanggal": date(2024, 9, d), "location_id": loc, "kategori_ispu": "SEDANG", "polutan_dominan": "PM25"}
+            row.update({c: float(d + i) for i, c in enumerate(WEATHER + POLLUTANTS)})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+def test_normalize_sql_collapses_literals_and_lists():
+    a = normalize_sql("SELECT *  FROM t WHERE id IN (1, 2, 3) AND name = 'x'")
+    b = normalize_sql("select * from t where id in (:a, :b) and name = :n")
+    assert a == "SELECT * FROM t WHERE id IN (...) AND name = ?"
+    assert a.lower() == b.lower()
+    assert normalize_sql("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == "INSERT INTO t (a, b) VALUES (?, ?), ..."
+
+def test_flags_repeated_shape_within_stage(engine):
+    run = RunMetrics("test")
+    with track_sql(engine, threshold=3) as stats:
+        with run.stage("lookup"), engine.connect() as c:
+            for i in range(5):
+                c.execute(text("SELECT location_id FROM location WHERE location_id = :i"), {"i": i})
+        with engine.connect() as c:
+            c.execute(text("SELECT 1"))
+    assert stats.count("FROM location", stage="lookup") == 5
+    assert [(stg, n) for stg, _, n in stats.suspects()] == [("lookup", 5)]
+    with pytest.raises(AssertionError, match="SQL budget exceeded"):
+        stats.assert_budget(4, shape="FROM location")
+
+def test_failed_statement_does_not_leave_timer_on_connection(engine):
+    from sqlalchemy.exc import OperationalError
+    with track_sql(engine) as stats, engine.connect() as c:
+        with pytest.raises(OperationalError):
+            c.execute(text("SELECT * FROM no_such_table"))
+        assert c.connection.info.get("_sql_stats_t0") == []
+        c.execute(text("SELECT 1"))
+        assert c.connection.info["_sql_stats_t0"] == []
+    assert stats.count("SELECT ?") == 1
+
+# Loader: lookup atribut + satu SELECT nilai lama + satu bulk insert/upsert per tabel (etl.upsert,
+# SQLite native: executemany ON CONFLICT), tidak tumbuh per baris.
+# Ringkasan periode (etl.aggregates) menambah jumlah statement tetap per load:
+# observasi = lokasi kota + SELECT fakta per jenis + DELETE + INSERT; AQI = SELECT + DELETE + INSERT.
+AGG_OBS, AGG_AQI = 1 + 2 + 2, 1 + 3
+
+def test_insert_weather_and_pollutants_statement_budget(engine):
+    df = _frame()
+    with track_sql(engine) as stats:
+        insert_weather_and_pollutants(engine, df)
+    for table, key in (("weather_observation", "weatherobs_date, weatherattr_id"),
+                       ("pollutant_observation", "pollobs_date, pollutantattr_id")):
+        assert stats.count(f"INSERT INTO {table}") == 1
+        assert stats.count(f"ON CONFLICT (location_id, {key}) DO NOTHING") == 1
+    stats.assert_budget(1, shape="INSERT INTO agg_observation_period")
+    stats.assert_budget(6 + AGG_OBS)
+
+def test_insert_aqi_daily_statement_budget(engine):
+    df = _frame()
+    insert_weather_and_pollutants(engine, df)
+    with track_sql(engine) as stats:
+        insert_aqi_daily(engine, df)
+    # lookup atribut & kategori + pollobs_id dominan + aqi_daily lama + upsert
+    stats.assert_budget(5 + AGG_AQI)
+    with engine.connect() as c:
+        assert c.execute(text("SELECT COUNT(*) FROM aqi_daily WHERE dominant_pollobs_id IS NOT NULL")).scalar() == len(df)
+
+def test_redelivery_writes_only_changed_values(engine):
+    first = load_all_in_one_transaction(engine, _frame())
+    assert first.as_dict()["weather"] == {"inserted": 90, "updated": 0, "unchanged": 0}
+
+    df = _frame(6)                                            # hari ke-6 = baru
+    df.loc[0, "suhu_min"] += 1e-9                             # di bawah toleransi
+    df.loc[1, "pm25"] += 5.0                                  # koreksi nilai
+    df.loc[2, "kategori_ispu"] = "BAIK"
+    with track_sql(engine) as stats:
+        report = load_all_in_one_transaction(engine, df)
+    assert report.as_dict() == {
+        "weather": {"inserted": 18, "updated": 0, "unchanged": 90},
+        "pollutant": {"inserted": 12, "updated": 1, "unchanged": 59},
+        "aqi": {"inserted": 2, "updated": 1, "unchanged": 9},
+    }
+    # bulk: biaya statement tidak tumbuh dengan ukuran file; nilai berubah di-upsert, bukan UPDATE per baris
+    assert stats.count("UPDATE ") == stats.count("DO UPDATE SET") == 2          # pm25 + aqi_daily (baru & berubah)
+    assert stats.count("DO UPDATE SET pollobs_value = excluded.pollobs_value") == 1
+    assert stats.count("INSERT INTO aqi_daily") == 1
+    stats.assert_budget(1, shape="DELETE FROM agg_observation_period")
+    stats.assert_budget(12 + AGG_OBS + AGG_AQI - 1)       # lokasi kota dicari sekali
+    with engine.connect() as c:
+        assert c.execute(text("SELECT pollobs_value FROM pollutant_observation po JOIN pollutant_attribute pa "
+                              "ON pa.pollutantattr_id = po.pollutantattr_id WHERE pa.pollutantattr_code = 'PM25' "
+                              "AND location_id = 2 AND pollobs_date = '2024-09-01'")).scalar() == 1.0 + 9 + 5.0
+
+def test_pearson_pipeline_statement_budget(engine):
+    insert_weather_and_pollutants(engine, _frame(7))
+    with engine.begin() as c:
+        c.execute(text("INSERT INTO correlation_metrics (weather_x, pollutant_y) VALUES (1, 1), (2, 2)"))
+        c.execute(text("INSERT INTO correlation_flag (corrflag_desc) VALUES ('STABLE'), ('INCONCLUSIVE'), "
+                       "('UNRELIABLE'), ('CONSISTENT_WEAKER'), ('NONLINEAR_OR_OUTLIERS')"))
+    p = PearsonPipeline(db_session=Session(engine))
+    with track_sql(engine) as stats:
+        inserted = p._process_range(date(2024, 9, 1), date(2024, 9, 7), "WEEK_2024-09-01_2024-09-07", date(2024, 9, 8))
+    assert inserted == 2
+    assert stats.count("FROM correlation_metrics", stage="fetch") == 1
+    stats.assert_budget(inserted, shape="INSERT INTO correlation_result", stage="write")
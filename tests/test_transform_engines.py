@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from etl.factories.transform_factory import TransformEngineFactory
+
+pytest.importorskip("polars")
+
+def _dirty_merged() -> pd.DataFrame:
+    # Meniru hasil merge_outer_by_date: sentinel teks, sel kosong, tanggal rusak, kolom campuran
+    return pd.DataFrame({
+        "tanggal": ["2024-01-01", "2024-01-02", "31/02/2024", "2024-01-04", "", "2024-01-06", "2024-02-30"],
+        "TN": ["24", "8888", "25", "", "26", "n/a", "27"],
+        "TX": [32.0, 33.0, None, 34.0, 35.0, 9999.0, 31.0],
+        "TAVG": [28, 29, 30, 31, 32, 33, 34],
+        "RH_AVG": ["80", "na", "82", "83", " ", "85", "86"],
+        "RR": [0.0, 1.2, None, 3.0, 4.0, 5.0, 6.0],
+        "SS": [5.0, 6.0, 7.0, None, None, 8.0, 9.0],
+        "FF_X": [10, 12, 14, 16, 18, 20, 22],
+        "DDD_X": [180, 190, 200, 210, 220, 230, 240],
+        "FF_AVG": [5.5, 5.7, 5.9, 6.1, 6.3, 6.5, 6.7],
+        "DDD_CAR": ["S", "SW", "W", "null", "N", "E", "C"],
+        "stasiun": [None, "DKI1", "DKI1", "DKI2", "DKI2", "none", "DKI3"],
+        "pm25": [15, "8888", 17, 8888, 19, 20, "x"],         # object campuran angka + teks
+        "pm10": [40.0, 42.0, 44.0, 46.0, 48.0, 50.0, 52.0],
+        "so2": [2, 2, 2, 2, 2, 2, 2],
+        "co": [0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1],
+        "o3": [10, 11, 12, 13, 14, 15, 16],
+        "no2": [7, 8, 9, 10, 11, 12, 13],
+        "max": [50, 55, 60, 65, 70, 75, 80],
+        "critical": ["PM25", "PM10", None, "PM25", "O3", "PM25", "PM10"],
+        "categori": ["SEDANG", "SEDANG", "BAIK", None, "BAIK", "SEDANG", "BAIK"],
+    }, index=range(10, 17))
+
+def test_polars_engine_matches_pandas():
+    df = _dirty_merged()
+    clean_pd, bad_pd = TransformEngineFactory.create("pandas").clean_and_rename(df)
+    clean_pl, bad_pl = TransformEngineFactory.create("polars").clean_and_rename(df)
+    assert len(clean_pd) == 4 and len(bad_pd) == 3
+    pd.testing.assert_frame_equal(clean_pl, clean_pd, check_dtype=False)
+    # bad rows hanya dilog; kolom campuran kembali sebagai teks di polars
+    pd.testing.assert_index_equal(bad_pl.index, bad_pd.index)
+    assert list(bad_pl.columns) == list(bad_pd.columns) and bad_pl["tanggal"].isna().all()
+    assert clean_pl.loc[11, "suhu_min"] == 24.0                    # sentinel -> ffill
+    assert clean_pl.loc[10, "stasiun"] == "DKI1"                   # bfill di baris pertama
+    assert clean_pl.loc[15, "pm25"] == 20 and clean_pl.loc[13, "pm25"] == 8888   # angka 8888 bukan sentinel teks
+    assert "ddd_car" not in clean_pl.columns
+    # input tidak dimodifikasi
+    pd.testing.assert_frame_equal(df, _dirty_merged())
+
+def test_date_format_follows_first_value():
+    # pandas menebak format dari nilai pertama; baris ISO lainnya jadi NaT — polars harus sama
+    df = _dirty_merged().assign(tanggal=["05/01/2024", "2024-01-02", "06/01/2024", "x", "07/01/2024", "", "2024-01-03"])
+    clean_pd, bad_pd = TransformEngineFactory.create("pandas").clean_and_rename(df)
+    clean_pl, bad_pl = TransformEngineFactory.create("polars").clean_and_rename(df)
+    pd.testing.assert_frame_equal(clean_pl, clean_pd, check_dtype=False)
+    assert list(bad_pl.index) == list(bad_pd.index)
+
+def test_unguessable_first_date_parses_per_value_like_pandas():
+    # "not-a-date" (datagen BAD_DATES) => pandas tidak menebak format dan mem-parse per nilai
+    df = _dirty_merged().iloc[:4].assign(tanggal=["not-a-date", "2024-01-02", "02/01/2024", "2024-01-04"])
+    clean_pd, bad_pd = TransformEngineFactory.create("pandas").clean_and_rename(df)
+    clean_pl, bad_pl = TransformEngineFactory.create("polars").clean_and_rename(df)
+    assert len(clean_pd) == 3
+    pd.testing.assert_frame_equal(clean_pl, clean_pd, check_dtype=False)
+    assert list(bad_pl.index) == list(bad_pd.index) == [10]
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        TransformEngineFactory.create("spark")
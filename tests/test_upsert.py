@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from etl import db, upsert
+from etl.sql_stats import track_sql
+from etl.upsert import build_insert_sql, insert_ignore
+
+COLS, KEY = ["k1", "k2", "val", "note"], ["k1", "k2"]
+
+@pytest.fixture
+def engine(tmp_path):
+    eng = db.get_engine(f"sqlite:///{tmp_path / 'upsert.db'}")
+    with eng.begin() as c:
+        c.execute(text("CREATE TABLE t (k1 INTEGER, k2 TEXT, val REAL, note TEXT, CONSTRAINT uq_t UNIQUE (k1, k2))"))
+    yield eng
+    db.dispose_engines()
+
+def _table(engine):
+    with engine.connect() as c:
+        return c.execute(text("SELECT k1, k2, val, note FROM t ORDER BY k1, k2")).all()
+
+def test_insert_ignore_and_upsert_semantics(engine):
+    with engine.begin() as c:
+        assert insert_ignore(c, "t", COLS, KEY, [(1, "a", 1.0, "x"), (2, "a", 2.0, None)]) == 2
+        insert_ignore(c, "t", COLS, KEY, [(1, "a", 9.0, "y"), (3, "a", 3.0, "z")])          # key lama dilewati
+        upsert.upsert(c, "t", COLS, KEY, [(2, "a", 20.0, "new"), (4, "a", 4.0, None)], update=["val"])
+        assert insert_ignore(c, "t", COLS, KEY, []) == 0
+    assert _table(engine) == [(1, "a", 1.0, "x"), (2, "a", 20.0, None), (3, "a", 3.0, "z"), (4, "a", 4.0, None)]
+    with engine.begin() as c:
+        upsert.upsert(c, "t", COLS, KEY, [(1, "a", 10.0, "all")])                          # default: semua non-key
+        with pytest.raises(ValueError):
+            upsert.upsert(c, "t", KEY, KEY, [(1, "a")])
+    assert _table(engine)[0] == (1, "a", 10.0, "all")
+
+def test_multi_row_path_is_chunked(engine, monkeypatch):
+    # jalur MySQL/PostgreSQL (multi-row VALUES) dijalankan di SQLite, 2 baris per statement
+    monkeypatch.setitem(upsert._WRITERS, "sqlite", upsert._multi_row)
+    monkeypatch.setattr(upsert, "UPSERT_BATCH_ROWS", 2)
+    rows = [(i, "b", float(i), None) for i in range(5)]
+    with track_sql(engine) as stats, engine.begin() as c:
+        insert_ignore(c, "t", COLS, KEY, rows)
+        upsert.upsert(c, "t", COLS, KEY, [(i, "b", -1.0, "u") for i in range(3)], update=["val", "note"])
+    assert stats.count("INSERT INTO t") == 3 + 2
+    assert [r[2] for r in _table(engine)] == [-1.0, -1.0, -1.0, 3.0, 4.0]
+
+def test_dialect_sql():
+    assert build_insert_sql("mysql", "t", COLS, KEY, None, 2) == \
+        "INSERT IGNORE INTO t (k1, k2, val, note) VALUES (%s, %s, %s, %s), (%s, %s, %s, %s)"
+    assert build_insert_sql("mysql", "t", COLS, KEY, ["val"]).endswith("ON DUPLICATE KEY UPDATE val = VALUES(val)")
+    assert build_insert_sql("postgresql", "t", COLS, KEY, None).endswith("ON CONFLICT (k1, k2) DO NOTHING")
+    assert build_insert_sql("postgresql", "t", COLS, KEY, ["val", "note"]).endswith(
+        "ON CONFLICT (k1, k2) DO UPDATE SET val = excluded.val, note = excluded.note")
+    with pytest.raises(RuntimeError):
+        build_insert_sql("oracle", "t", COLS, KEY, None)
+
+def test_copy_rows_psycopg2_csv():
+    class Cursor:
+        def copy_expert(self, sql, f):
+            self.sql, self.data = sql, f.read()
+    cur = Cursor()
+    upsert._copy_rows(cur, "_stage_t_0", COLS, [(1, "2024-01-01", 1.5, None), (2, "x,y", 0.0, "q")])
+    assert cur.sql == "COPY _stage_t_0 (k1, k2, val, note) FROM STDIN WITH (FORMAT csv)"
+    assert cur.data.splitlines() == ["1,2024-01-01,1.5,", '2,"x,y",0.0,q']